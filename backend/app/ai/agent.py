@@ -1,10 +1,12 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import asyncio
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from bson import ObjectId
 from .client import LLMClient
-from .tools import tools_registry, get_tool_definitions, execute_save_budget_entries
+from .tools import tools_registry, read_only_tools, get_tool_definitions, execute_save_budget_entries
 from .schemas import (
     AIChatRequest, AIChatResponse, AIChatMessage,
     PendingAction, ProposedEntry,
@@ -13,45 +15,83 @@ from .logging import ai_logger
 from app.database import database
 
 MAX_TOOL_ITERATIONS = 10  # Safety limit for the ReAct loop
+MAX_CONCURRENT_TOOL_CALLS = 4  # Read-only tool calls from one turn run at most this many at a time
+
+SYSTEM_PROMPT_PATH = Path(__file__).parent / "system_prompt.txt"
+
+# The system prompt is a static block followed by this section, the only part
+# filled in per request. Keeping everything before it byte-identical across
+# users and days lets the provider cache the prompt prefix.
+CONTEXT_HEADING = "CURRENT CONTEXT:"
+
+USER_NAMES_CACHE_SECONDS = 300  # How long user display names are cached in-process
+USER_NAMES_CACHE_SIZE = 1024
+
+# (loaded_at, (user1_name, user2_name)) by user ID
+_user_names_cache: Dict[str, Tuple[float, Tuple[str, str]]] = {}
+
+
+def _split_system_prompt(template: str) -> Tuple[str, str]:
+    """Split the prompt template into its static prefix and the context template."""
+    prefix, heading, context = template.partition(CONTEXT_HEADING)
+    if not heading or "{" in prefix:
+        raise ValueError(f"System prompt must end with a {CONTEXT_HEADING} section holding every placeholder")
+    return prefix, heading + context
+
+
+def invalidate_user_names(user_id: str) -> None:
+    """Forget a user's cached names, after they change them."""
+    _user_names_cache.pop(user_id, None)
+
+
+async def _get_user_names(user_id: str) -> Tuple[str, str]:
+    """The user's and their partner's display names, from the in-process cache."""
+    cached = _user_names_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] <= USER_NAMES_CACHE_SECONDS:
+        return cached[1]
+
+    user_doc = await database["users"].find_one(
+        {"_id": ObjectId(user_id)}, {"full_name": 1, "partner_name": 1}
+    )
+    names = (
+        (user_doc or {}).get("full_name") or "User 1",
+        (user_doc or {}).get("partner_name") or "Partner",
+    )
+    if len(_user_names_cache) >= USER_NAMES_CACHE_SIZE:
+        _user_names_cache.clear()
+    _user_names_cache[user_id] = (time.monotonic(), names)
+    return names
 
 
 class AIAgent:
     def __init__(self):
         self.client = LLMClient()
         self.available_tools = get_tool_definitions()
-        self.system_prompt_path = Path(__file__).parent / "system_prompt.txt"
-
-    async def _load_system_prompt(self, user_id: str = "") -> str:
-        """Load and format the system prompt with current date context and user names"""
         try:
-            with open(self.system_prompt_path, 'r') as f:
-                prompt_template = f.read()
-
-            current_date = datetime.now().strftime("%B %d, %Y")
-            current_month = datetime.now().strftime("%Y-%m")
-
-            # Look up user names from the database
-            user1_name = "User 1"
-            user2_name = "Partner"
-            if user_id and user_id != "test_user":
-                try:
-                    users_collection = database["users"]
-                    user_doc = await users_collection.find_one({"_id": ObjectId(user_id)})
-                    if user_doc:
-                        user1_name = user_doc.get("full_name") or user1_name
-                        user2_name = user_doc.get("partner_name") or user2_name
-                except Exception as e:
-                    ai_logger.warning(f"Could not look up user names: {e}")
-
-            return prompt_template.format(
-                current_date=current_date,
-                current_month=current_month,
-                user1_name=user1_name,
-                user2_name=user2_name,
-            )
-        except Exception as e:
+            self.prompt_prefix, self.prompt_context = _split_system_prompt(SYSTEM_PROMPT_PATH.read_text())
+        except (OSError, ValueError) as e:
             ai_logger.error(f"Error loading system prompt: {e}")
-            return f"You are a helpful financial assistant. Today's date is {datetime.now().strftime('%B %d, %Y')}."
+            self.prompt_prefix, self.prompt_context = None, None
+
+    async def _load_system_prompt(self, user_id: str = "") -> str:
+        """The system prompt, with current date context and user names filled in"""
+        now = datetime.now()
+        if self.prompt_prefix is None:
+            return f"You are a helpful financial assistant. Today's date is {now.strftime('%B %d, %Y')}."
+
+        user1_name, user2_name = "User 1", "Partner"
+        if user_id and user_id != "test_user":
+            try:
+                user1_name, user2_name = await _get_user_names(user_id)
+            except Exception as e:
+                ai_logger.warning(f"Could not look up user names: {e}")
+
+        return self.prompt_prefix + self.prompt_context.format(
+            current_date=now.strftime("%B %d, %Y"),
+            current_month=now.strftime("%Y-%m"),
+            user1_name=user1_name,
+            user2_name=user2_name,
+        )
 
     async def process_request(self, request: AIChatRequest, user_id: str) -> AIChatResponse:
         """
@@ -64,6 +104,34 @@ class AIAgent:
         4. Special case: if tool is 'propose_budget_entries' and returns action='confirm',
            we pause the loop and return a PendingAction to the frontend for confirmation.
         """
+        try:
+            async for event in self._run(request, user_id, stream=False):
+                if event["type"] == "done":
+                    return event["response"]
+        except Exception as e:
+            ai_logger.error(f"Error in agent processing: {str(e)}")
+            raise e
+
+    async def stream_request(self, request: AIChatRequest, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        The ReAct loop of process_request, reported as it happens.
+
+        Completions are streamed from the LLM. Yields events:
+        - {"type": "token", "content"}: a piece of assistant text
+        - {"type": "tool_call_start", "id", "name", "arguments"}
+        - {"type": "tool_call_end", "id", "name", "ok"}
+        - {"type": "pending_action", "pending_action"}: entries awaiting confirmation
+        - {"type": "done", "response"}: the AIChatResponse process_request would return
+
+        Tokens are streamed for every completion, including any text the
+        model writes before asking for tools; the final message is the one
+        in the done event.
+        """
+        async for event in self._run(request, user_id, stream=True):
+            yield event
+
+    async def _run(self, request: AIChatRequest, user_id: str, stream: bool) -> AsyncIterator[Dict[str, Any]]:
+        """The agent loop behind process_request and stream_request, as events."""
         messages = [msg.model_dump(exclude_none=True) for msg in request.messages]
 
         # Insert system message if not present
@@ -76,130 +144,212 @@ class AIAgent:
 
         # Handle confirmation of a pending action
         if request.confirm_action is not None:
-            return await self._handle_confirmation(request, user_id, messages)
-
-        try:
-            all_tool_calls_log: List[Dict[str, Any]] = []
-
-            for iteration in range(MAX_TOOL_ITERATIONS):
-                ai_logger.info(f"ReAct loop iteration {iteration + 1}/{MAX_TOOL_ITERATIONS}")
-
-                # Call LLM
-                ai_message = await self.client.chat(
-                    messages=messages,
-                    tools=self.available_tools if self.available_tools else None
-                )
-
-                # No tool calls → final text response
-                if not ai_message.tool_calls:
-                    response_text = ai_message.content
-                    return AIChatResponse(
-                        message=AIChatMessage(role="assistant", content=response_text),
-                        tool_calls=all_tool_calls_log,
-                    )
-
-                # Has tool calls → execute them
-                messages.append(ai_message)
-
-                for tool_call in ai_message.tool_calls:
-                    function_name = tool_call.function.name
-                    arguments = json.loads(tool_call.function.arguments)
-
-                    all_tool_calls_log.append({
-                        "name": function_name,
-                        "arguments": arguments,
-                        "id": tool_call.id,
-                    })
-
-                    if request.dry_run:
-                        messages.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": "Dry run: Tool execution skipped.",
-                        })
-                        continue
-
-                    if function_name not in tools_registry:
+            yield {"type": "done", "response": await self._handle_confirmation(request, user_id, messages)}
+            return
+
+        all_tool_calls_log: List[Dict[str, Any]] = []
+
+        for iteration in range(MAX_TOOL_ITERATIONS):
+            ai_logger.info(f"ReAct loop iteration {iteration + 1}/{MAX_TOOL_ITERATIONS}")
+
+            # Call LLM
+            ai_message = None
+            async for event in self._complete(messages, self.available_tools or None, stream):
+                if event["type"] == "message":
+                    ai_message = event["message"]
+                else:
+                    yield event
+
+            # No tool calls → final text response
+            if not ai_message.tool_calls:
+                yield {"type": "done", "response": AIChatResponse(
+                    message=AIChatMessage(role="assistant", content=ai_message.content),
+                    tool_calls=all_tool_calls_log,
+                )}
+                return
+
+            # Has tool calls → execute them
+            messages.append(ai_message)
+
+            # Consecutive read-only calls are batched and run concurrently;
+            # any other call waits for them, so it sees the same state it
+            # would have sequentially, and then runs on its own
+            pending_reads: List[Tuple[Any, str, Dict[str, Any]]] = []
+            for tool_call in ai_message.tool_calls:
+                function_name = tool_call.function.name
+                arguments = json.loads(tool_call.function.arguments)
+
+                all_tool_calls_log.append({
+                    "name": function_name,
+                    "arguments": arguments,
+                    "id": tool_call.id,
+                })
+
+                if request.dry_run:
+                    messages.append(self._tool_message(
+                        tool_call, function_name, "Dry run: Tool execution skipped."
+                    ))
+                    continue
+
+                if function_name in read_only_tools:
+                    pending_reads.append((tool_call, function_name, arguments))
+                    continue
+
+                async for event in self._run_read_only(pending_reads, user_id, messages):
+                    yield event
+                pending_reads = []
+
+                yield self._tool_event("tool_call_start", tool_call, function_name, arguments=arguments)
+                content = await self._execute_tool(function_name, arguments, user_id)
+                messages.append(self._tool_message(tool_call, function_name, content))
+                yield self._tool_event("tool_call_end", tool_call, function_name, content=content)
+
+                # Check if this is a proposal that needs confirmation
+                if function_name == "propose_budget_entries":
+                    try:
+                        result_data = json.loads(content) if isinstance(content, str) else content
+                    except (json.JSONDecodeError, TypeError):
+                        result_data = {}
+
+                    if result_data.get("ok") and result_data.get("action") == "confirm":
+                        # Pause the loop — return proposal to user for confirmation
+                        proposal_data = result_data.get("data", {})
+                        entries = proposal_data.get("entries", [])
+                        summary = proposal_data.get("summary", "")
+
+                        pending = PendingAction(
+                            action_type="save_budget_entries",
+                            entries=[ProposedEntry(**e) for e in entries],
+                            summary=summary,
+                            preview_id=proposal_data.get("preview_id"),
+                        )
+                        yield {"type": "pending_action", "pending_action": pending}
+
+                        # Get a final summary message from the LLM
+                        # Use a user message as a hint — Mistral doesn't allow
+                        # system messages after tool messages
                         messages.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": json.dumps({"ok": False, "error": f"Unknown tool: {function_name}"}),
+                            "role": "user",
+                            "content": "[SYSTEM NOTE: The entries have been validated. Present the summary clearly to the user and ask them to confirm or cancel. Do NOT call any more tools.]",
                         })
-                        continue
+                        # No tools — force text response
+                        async for event in self._complete(messages, None, stream):
+                            if event["type"] == "message":
+                                final_msg = event["message"]
+                            else:
+                                yield event
+
+                        yield {"type": "done", "response": AIChatResponse(
+                            message=AIChatMessage(role="assistant", content=final_msg.content),
+                            tool_calls=all_tool_calls_log,
+                            pending_action=pending,
+                        )}
+                        return
+
+            async for event in self._run_read_only(pending_reads, user_id, messages):
+                yield event
+
+        # If we've exhausted iterations, return whatever we have
+        ai_logger.warning(f"ReAct loop hit max iterations ({MAX_TOOL_ITERATIONS})")
+        # Append a user hint so we don't end on a tool message (Mistral rejects that)
+        messages.append({
+            "role": "user",
+            "content": "[SYSTEM NOTE: You've used the maximum number of tool calls. Please summarize what you've found so far and respond to the user. Do NOT call any more tools.]",
+        })
+        async for event in self._complete(messages, None, stream):
+            if event["type"] == "message":
+                final_msg = event["message"]
+            else:
+                yield event
+        yield {"type": "done", "response": AIChatResponse(
+            message=AIChatMessage(role="assistant", content=final_msg.content),
+            tool_calls=all_tool_calls_log,
+            warnings=[f"Processing stopped after {MAX_TOOL_ITERATIONS} steps"],
+        )}
+
+    async def _complete(
+        self,
+        messages: List[Any],
+        tools: Optional[List[Dict[str, Any]]],
+        stream: bool,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """One LLM completion: token events when streaming, then the message event."""
+        if stream:
+            async for event in self.client.chat_stream(messages=messages, tools=tools):
+                yield event
+        else:
+            yield {"type": "message", "message": await self.client.chat(messages=messages, tools=tools)}
 
-                    # Execute the tool
-                    tool_func = tools_registry[function_name]
-                    ai_logger.info(f"Executing tool: {function_name} with args: {arguments}")
-                    try:
-                        result = await tool_func(user_id=user_id, **arguments)
-                        content = json.dumps(result) if isinstance(result, dict) else str(result)
-                    except Exception as e:
-                        ai_logger.error(f"Tool execution error: {e}")
-                        content = json.dumps({"ok": False, "error": str(e)})
-
-                    messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": content,
-                    })
-
-                    # Check if this is a proposal that needs confirmation
-                    if function_name == "propose_budget_entries":
-                        try:
-                            result_data = json.loads(content) if isinstance(content, str) else content
-                        except (json.JSONDecodeError, TypeError):
-                            result_data = {}
-
-                        if result_data.get("ok") and result_data.get("action") == "confirm":
-                            # Pause the loop — return proposal to user for confirmation
-                            proposal_data = result_data.get("data", {})
-                            entries = proposal_data.get("entries", [])
-                            summary = proposal_data.get("summary", "")
-
-                            pending = PendingAction(
-                                action_type="save_budget_entries",
-                                entries=[ProposedEntry(**e) for e in entries],
-                                summary=summary,
-                            )
-
-                            # Get a final summary message from the LLM
-                            # Use a user message as a hint — Mistral doesn't allow
-                            # system messages after tool messages
-                            messages.append({
-                                "role": "user",
-                                "content": "[SYSTEM NOTE: The entries have been validated. Present the summary clearly to the user and ask them to confirm or cancel. Do NOT call any more tools.]",
-                            })
-                            final_msg = await self.client.chat(
-                                messages=messages,
-                                tools=None,  # No tools — force text response
-                            )
-
-                            return AIChatResponse(
-                                message=AIChatMessage(role="assistant", content=final_msg.content),
-                                tool_calls=all_tool_calls_log,
-                                pending_action=pending,
-                            )
-
-            # If we've exhausted iterations, return whatever we have
-            ai_logger.warning(f"ReAct loop hit max iterations ({MAX_TOOL_ITERATIONS})")
-            # Append a user hint so we don't end on a tool message (Mistral rejects that)
-            messages.append({
-                "role": "user",
-                "content": "[SYSTEM NOTE: You've used the maximum number of tool calls. Please summarize what you've found so far and respond to the user. Do NOT call any more tools.]",
-            })
-            final_msg = await self.client.chat(messages=messages, tools=None)
-            return AIChatResponse(
-                message=AIChatMessage(role="assistant", content=final_msg.content),
-                tool_calls=all_tool_calls_log,
-                warnings=[f"Processing stopped after {MAX_TOOL_ITERATIONS} steps"],
-            )
+    async def _execute_tool(self, function_name: str, arguments: Dict[str, Any], user_id: str) -> str:
+        """Run one tool call and return the content of its tool message."""
+        if function_name not in tools_registry:
+            return json.dumps({"ok": False, "error": f"Unknown tool: {function_name}"})
 
+        tool_func = tools_registry[function_name]
+        ai_logger.info(f"Executing tool: {function_name} with args: {arguments}")
+        try:
+            result = await tool_func(user_id=user_id, **arguments)
+            return json.dumps(result) if isinstance(result, dict) else str(result)
         except Exception as e:
-            ai_logger.error(f"Error in agent processing: {str(e)}")
-            raise e
+            ai_logger.error(f"Tool execution error: {e}")
+            return json.dumps({"ok": False, "error": str(e)})
+
+    async def _run_read_only(
+        self,
+        calls: List[Tuple[Any, str, Dict[str, Any]]],
+        user_id: str,
+        messages: List[Any],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run read-only tool calls concurrently, at most MAX_CONCURRENT_TOOL_CALLS at a time.
+
+        Their tool messages are appended in call order, so the transcript is
+        the same as with sequential execution. Yields start events for every
+        call, then end events in call order.
+        """
+        if not calls:
+            return
+
+        for tool_call, function_name, arguments in calls:
+            yield self._tool_event("tool_call_start", tool_call, function_name, arguments=arguments)
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+
+        async def run(function_name: str, arguments: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self._execute_tool(function_name, arguments, user_id)
+
+        contents = await asyncio.gather(*(run(name, arguments) for _, name, arguments in calls))
+        for (tool_call, function_name, _), content in zip(calls, contents):
+            messages.append(self._tool_message(tool_call, function_name, content))
+            yield self._tool_event("tool_call_end", tool_call, function_name, content=content)
+
+    @staticmethod
+    def _tool_event(
+        event_type: str,
+        tool_call: Any,
+        function_name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        content: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        event = {"type": event_type, "id": tool_call.id, "name": function_name}
+        if event_type == "tool_call_start":
+            event["arguments"] = arguments
+        else:
+            try:
+                event["ok"] = bool(json.loads(content).get("ok"))
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                event["ok"] = False
+        return event
+
+    @staticmethod
+    def _tool_message(tool_call: Any, function_name: str, content: str) -> Dict[str, Any]:
+        return {
+            "tool_call_id": tool_call.id,
+            "role": "tool",
+            "name": function_name,
+            "content": content,
+        }
 
     async def _handle_confirmation(
         self,
@@ -234,6 +384,9 @@ class AIAgent:
                 for item in saved_items:
                     lines.append(f"  ✅ {item['name']} — {item['amount']:,.0f} kr. ({item['category_name']})")
                 detail = "\n".join(lines)
+                skipped_count = result["data"].get("skipped_count", 0)
+                if skipped_count:
+                    detail += f"\n\n{skipped_count} entries were already in your budget from an earlier import and were skipped."
 
                 return AIChatResponse(
                     message=AIChatMessage(
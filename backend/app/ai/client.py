@@ -1,5 +1,7 @@
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, AsyncIterator, Optional
 from mistralai import Mistral
+from mistralai.models import AssistantMessage, FunctionCall, ToolCall
 from .config import ai_config
 
 class LLMClient:
@@ -11,7 +13,8 @@ class LLMClient:
         self, 
         messages: List[Dict[str, str]], 
         tools: Optional[List[Dict[str, Any]]] = None,
-        tool_choice: str = "auto"
+        tool_choice: str = "auto",
+        response_format: Optional[Dict[str, Any]] = None,
     ) -> Any:
         try:
             params = {
@@ -21,6 +24,8 @@ class LLMClient:
             if tools:
                 params["tools"] = tools
                 params["tool_choice"] = tool_choice
+            if response_format:
+                params["response_format"] = response_format
 
             response = await self.client.chat.complete_async(**params)
             return response.choices[0].message
@@ -28,3 +33,81 @@ class LLMClient:
             # Handle API errors
             raise e
 
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: str = "auto"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a completion.
+
+        Yields {"type": "token", "content": str} for each piece of assistant
+        text as it arrives, then one {"type": "message", "message": ...}
+        with the assembled AssistantMessage, tool calls included, in the same
+        shape chat() returns.
+        """
+        params = {
+            "model": self.model,
+            "messages": messages,
+        }
+        if tools:
+            params["tools"] = tools
+            params["tool_choice"] = tool_choice
+
+        content_parts: List[str] = []
+        # Tool calls in arrival order. Fragments are matched by id; Mistral
+        # sends each call whole with its own id, and parallel calls in one
+        # chunk may all report index 0. A fragment without an id continues
+        # the latest call at its index, so arguments may arrive in pieces.
+        tool_calls: List[Dict[str, Any]] = []
+        calls_by_id: Dict[str, Dict[str, Any]] = {}
+        latest_by_index: Dict[Any, Dict[str, Any]] = {}
+
+        stream = await self.client.chat.stream_async(**params)
+        async for event in stream:
+            if not event.data.choices:
+                continue
+            delta = event.data.choices[0].delta
+
+            text = self._delta_text(delta.content)
+            if text:
+                content_parts.append(text)
+                yield {"type": "token", "content": text}
+
+            for call in delta.tool_calls or []:
+                call_id = call.id if call.id and call.id != "null" else None
+                pending = calls_by_id.get(call_id) if call_id else latest_by_index.get(call.index)
+                if pending is None:
+                    pending = {"id": call_id, "name": "", "arguments": ""}
+                    tool_calls.append(pending)
+                    if call_id:
+                        calls_by_id[call_id] = pending
+                latest_by_index[call.index] = pending
+                if call.function.name:
+                    pending["name"] = call.function.name
+                arguments = call.function.arguments
+                pending["arguments"] += arguments if isinstance(arguments, str) else json.dumps(arguments)
+
+        yield {
+            "type": "message",
+            "message": AssistantMessage(
+                content="".join(content_parts) or None,
+                tool_calls=[
+                    ToolCall(
+                        id=call["id"] or f"call_{index}",
+                        function=FunctionCall(name=call["name"], arguments=call["arguments"] or "{}"),
+                    )
+                    for index, call in enumerate(tool_calls)
+                ] or None,
+            ),
+        }
+
+    @staticmethod
+    def _delta_text(content: Any) -> str:
+        """Text of a streamed delta, which is a string or a list of content chunks."""
+        if not content:
+            return ""
+        if isinstance(content, str):
+            return content
+        return "".join(getattr(chunk, "text", "") or "" for chunk in content)
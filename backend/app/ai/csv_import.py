@@ -0,0 +1,362 @@
+"""
+CSV uploads to the AI assistant.
+
+The statement is parsed and matched against the user's history with the same
+code the import page uses, before any LLM call. Rows with a confident
+historical suggestion are categorized from that. The merchants left over are
+looked up in the user's categorization cache, and only the ones never seen
+before go to the model: once per distinct merchant, as compact numbered lines
+in batches of MERCHANT_BATCH_SIZE, answered through a JSON schema that only
+admits the user's category IDs. Each answer is fanned back out to all of
+the merchant's rows, and the resulting entries become a stored proposal the
+user confirms like any other.
+"""
+import asyncio
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.bank_profile_service import BankProfileService
+from app.services.import_service import ImportService
+from app.services.merchant_category_cache_service import MerchantCategoryCacheService
+from app.services.merchant_index_service import MerchantIndexService
+from .client import LLMClient
+from .logging import ai_logger
+from .schemas import AIChatMessage, AIChatResponse, PendingAction, ProposedEntry
+from .tools import propose_budget_entries
+
+# History suggestions at or above this confidence are used without the model
+CONFIDENT_SUGGESTION = 0.8
+
+# Distinct merchants per categorization request
+MERCHANT_BATCH_SIZE = 40
+
+# Categorization requests in flight at once
+MAX_CONCURRENT_BATCHES = 4
+
+OWNER_SLOTS = ("user1", "user2", "shared")
+
+CATEGORIZE_INSTRUCTIONS = (
+    "You categorize bank statement merchants for a Danish household budget.\n"
+    "Categories, one per line as id|name|type:\n{categories}\n\n"
+    "Each merchant line is n|description|income or expense|transactions|total kr.\n"
+    "Give one assignment per line: its n, the category_id (null if no category fits) "
+    "and the owner_slot. Income categories are for income lines only. "
+    "Salary words (Løn, Lønoverførsel, Månedsløn, Lønudbetaling, SU) are income. "
+    'Rent and utilities are "shared"; use "user1" when unsure.'
+)
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _response_format(category_ids: List[str]) -> Dict[str, Any]:
+    """Structured output schema for a batch; category_id may only be one of the user's."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "merchant_categories",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "assignments": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "n": {"type": "integer"},
+                                "category_id": {"enum": [*category_ids, None]},
+                                "owner_slot": {"enum": list(OWNER_SLOTS)},
+                            },
+                            "required": ["n", "category_id", "owner_slot"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["assignments"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def _merchant_key(description: str) -> str:
+    return MerchantIndexService.normalize_description(description) or description.strip().lower()
+
+
+def group_unresolved(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deduplicate rows without a confident suggestion by normalized merchant.
+
+    Income and expenses of the same merchant stay separate, since they map
+    to different category types.
+
+    Returns:
+        One dict per merchant with key, description (first seen), is_income,
+        count, total and the rows it covers, in first-seen order
+    """
+    merchants: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+    for row in rows:
+        is_income = row["amount"] > 0
+        key = (_merchant_key(row["description"]), is_income)
+        merchant = merchants.get(key)
+        if merchant is None:
+            merchant = merchants[key] = {
+                "key": key[0],
+                "description": row["description"],
+                "is_income": is_income,
+                "count": 0,
+                "total": 0.0,
+                "rows": [],
+            }
+        merchant["count"] += 1
+        merchant["total"] += abs(row["amount"])
+        merchant["rows"].append(row)
+    return list(merchants.values())
+
+
+def _merchant_lines(merchants: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"{n}|{merchant['description']}|{'income' if merchant['is_income'] else 'expense'}"
+        f"|{merchant['count']}|{merchant['total']:.0f}"
+        for n, merchant in enumerate(merchants, start=1)
+    )
+
+
+def _parse_assignments(content: Optional[str], count: int, categories: Dict[str, Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+    """Read the model's {"assignments": [{n, category_id, owner_slot}]} reply, dropping anything invalid."""
+    match = JSON_OBJECT.search(content or "")
+    if not match:
+        return {}
+    try:
+        reply = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    items = reply.get("assignments") if isinstance(reply, dict) else None
+    if not isinstance(items, list):
+        return {}
+
+    assignments = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        n = item.get("n")
+        if not isinstance(n, int) or not 1 <= n <= count:
+            continue
+        category_id = item.get("category_id")
+        if category_id not in categories:
+            continue
+        owner_slot = item.get("owner_slot")
+        assignments[n - 1] = {
+            "category_id": category_id,
+            "owner_slot": owner_slot if owner_slot in OWNER_SLOTS else "user1",
+        }
+    return assignments
+
+
+async def _ask_model(
+    client: LLMClient,
+    merchants: List[Dict[str, Any]],
+    categories: List[Dict[str, Any]],
+) -> Tuple[List[Optional[Dict[str, str]]], int]:
+    """
+    Ask the model for a category and owner per merchant, in batches.
+
+    Returns:
+        (assignments aligned with merchants, None where the model gave no
+        valid category; number of requests made)
+    """
+    by_id = {category["id"]: category for category in categories}
+    instructions = CATEGORIZE_INSTRUCTIONS.format(
+        categories="\n".join(f"{c['id']}|{c['name']}|{c['type']}" for c in categories)
+    )
+    response_format = _response_format(list(by_id))
+    batches = [
+        merchants[start:start + MERCHANT_BATCH_SIZE]
+        for start in range(0, len(merchants), MERCHANT_BATCH_SIZE)
+    ]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+    async def categorize(batch: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+        async with semaphore:
+            try:
+                reply = await client.chat(
+                    messages=[
+                        {"role": "system", "content": instructions},
+                        {"role": "user", "content": _merchant_lines(batch)},
+                    ],
+                    response_format=response_format,
+                )
+            except Exception as e:
+                ai_logger.error(f"Merchant categorization failed: {e}")
+                return {}
+            return _parse_assignments(reply.content, len(batch), by_id)
+
+    results = await asyncio.gather(*(categorize(batch) for batch in batches))
+    assignments: List[Optional[Dict[str, str]]] = []
+    for batch, result in zip(batches, results):
+        assignments.extend(result.get(index) for index in range(len(batch)))
+    return assignments, len(batches)
+
+
+async def categorize_merchants(
+    client: LLMClient,
+    user_id: str,
+    merchants: List[Dict[str, Any]],
+    categories: List[Dict[str, Any]],
+) -> Tuple[List[Optional[Dict[str, str]]], Dict[str, int]]:
+    """
+    A category and owner per merchant: from the user's cache, else from the model.
+
+    New decisions from the model are cached for the next statement.
+
+    Returns:
+        (assignments aligned with merchants, None where no category was
+        found; {"cached": merchants answered from the cache,
+        "asked": merchants sent to the model, "requests": model calls})
+    """
+    cached = await MerchantCategoryCacheService.lookup(
+        user_id,
+        ((merchant["key"], merchant["is_income"]) for merchant in merchants),
+        (category["id"] for category in categories),
+    )
+    assignments = [cached.get((merchant["key"], merchant["is_income"])) for merchant in merchants]
+    to_ask = [index for index, assignment in enumerate(assignments) if assignment is None]
+
+    requests = 0
+    if to_ask and categories:
+        answers, requests = await _ask_model(client, [merchants[index] for index in to_ask], categories)
+        decisions = []
+        for index, answer in zip(to_ask, answers):
+            if answer is None:
+                continue
+            assignments[index] = answer
+            decisions.append({
+                "merchant_key": merchants[index]["key"],
+                "is_income": merchants[index]["is_income"],
+                "description": merchants[index]["description"],
+                **answer,
+            })
+        await MerchantCategoryCacheService.store(user_id, decisions)
+
+    return assignments, {"cached": len(cached), "asked": len(to_ask), "requests": requests}
+
+
+def _entry(row: Dict[str, Any], category_id: str, owner_slot: str, month: str) -> Dict[str, Any]:
+    return {
+        "name": row["description"],
+        "category_id": category_id,
+        "amount": row["abs_amount"],
+        "owner_slot": owner_slot,
+        "month": month,
+        "fingerprint": row.get("fingerprint"),
+    }
+
+
+async def process_csv_upload(client: LLMClient, user_id: str, csv_text: str) -> AIChatResponse:
+    """
+    Turn an uploaded statement into a budget proposal for confirmation.
+
+    Raises:
+        ValueError: If the CSV cannot be parsed
+    """
+    month = datetime.now().strftime("%Y-%m")
+    profile = await BankProfileService.match(user_id, csv_text.lstrip().split("\n", 1)[0])
+    parsed = ImportService.parse_csv(csv_text, profile)
+    rows = await ImportService.apply_historical_suggestions(user_id, parsed["rows"])
+    rows = await ImportService.flag_imported_rows(user_id, rows)
+
+    already_imported = sum(1 for row in rows if row["already_imported"])
+    rows = [row for row in rows if not row["already_imported"] and row["abs_amount"] > 0]
+
+    entries: List[Dict[str, Any]] = []
+    unresolved: List[Dict[str, Any]] = []
+    for row in rows:
+        if row.get("category_id") and (row.get("suggestion_confidence") or 0) >= CONFIDENT_SUGGESTION:
+            entries.append(_entry(row, row["category_id"], row["owner_slot"], month))
+        else:
+            unresolved.append(row)
+    from_history = len(entries)
+
+    merchants = group_unresolved(unresolved)
+    stats = {"cached": 0, "asked": 0, "requests": 0}
+    uncategorized = 0
+    if merchants:
+        categories = await ImportService.get_user_categories(user_id)
+        assignments, stats = await categorize_merchants(client, user_id, merchants, categories)
+        for merchant, assignment in zip(merchants, assignments):
+            if assignment is None:
+                uncategorized += merchant["count"]
+                continue
+            entries.extend(
+                _entry(row, assignment["category_id"], assignment["owner_slot"], month)
+                for row in merchant["rows"]
+            )
+
+    tool_calls = [
+        {
+            "name": "parse_csv_data",
+            "arguments": {"rows": parsed["count"], "profile": parsed["profile"]},
+            "id": "pre_parse",
+        },
+        {
+            "name": "categorize_merchants",
+            "arguments": {"merchants": len(merchants), **stats},
+            "id": "categorize",
+        },
+    ]
+    ai_logger.info(
+        f"CSV upload: {parsed['count']} rows, {from_history} from history, "
+        f"{len(merchants)} merchants, {stats['cached']} cached, "
+        f"{stats['asked']} sent to the model in {stats['requests']} requests"
+    )
+
+    notes = []
+    if from_history:
+        notes.append(f"{from_history} matched your earlier budgets")
+    if len(entries) > from_history:
+        notes.append(f"{len(entries) - from_history} were categorized by merchant")
+    if uncategorized:
+        notes.append(f"{uncategorized} couldn't be matched to a category and were left out")
+    if already_imported:
+        notes.append(f"{already_imported} were already imported and were skipped")
+    overview = f"I read {parsed['count']} transactions from your statement"
+    overview += f": {', '.join(notes)}." if notes else "."
+
+    if not entries:
+        return AIChatResponse(
+            message=AIChatMessage(role="assistant", content=f"{overview} There is nothing to add to your budget."),
+            tool_calls=tool_calls,
+        )
+
+    proposal = await propose_budget_entries(user_id, entries=entries)
+    if not proposal.get("ok"):
+        return AIChatResponse(
+            message=AIChatMessage(
+                role="assistant",
+                content=f"{overview} I couldn't prepare the entries: {proposal.get('error', 'Unknown error')}.",
+            ),
+            tool_calls=tool_calls,
+            warnings=proposal.get("warnings", []),
+        )
+
+    data = proposal["data"]
+    return AIChatResponse(
+        message=AIChatMessage(
+            role="assistant",
+            content=(
+                f"{overview}\n\n{data['summary']}\n\n"
+                "Please check who each entry belongs to, change anything that looks wrong, "
+                "and confirm to save them."
+            ),
+        ),
+        tool_calls=tool_calls,
+        pending_action=PendingAction(
+            action_type="save_budget_entries",
+            entries=[ProposedEntry(**entry) for entry in data["entries"]],
+            summary=data["summary"],
+            preview_id=data["preview_id"],
+        ),
+        warnings=proposal.get("warnings", []),
+    )
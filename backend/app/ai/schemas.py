@@ -27,12 +27,26 @@ class ProposedEntry(BaseModel):
     month: str = Field(..., description="Budget month YYYY-MM")
     source: Literal["ai"] = Field(default="ai", description="Entry source")
     needs_review: bool = Field(default=True, description="Whether the row still needs inline review")
+    fingerprint: Optional[str] = Field(default=None, description="Bank row fingerprint, for statement imports")
 
 class PendingAction(BaseModel):
     """Action waiting for user confirmation"""
     action_type: str = Field(..., description="Type: 'save_budget_entries'")
     entries: List[ProposedEntry] = []
     summary: str = Field("", description="Human-readable summary of what will be saved")
+    preview_id: Optional[str] = Field(None, description="Server-side copy of the entries, for /api/ai/confirm")
+
+class ProposalOverride(BaseModel):
+    """A change to one proposed entry, by its index in pending_action.entries"""
+    index: int = Field(..., ge=0)
+    category_id: Optional[str] = None
+    owner_slot: Optional[Literal["user1", "user2", "shared"]] = None
+    include: Optional[bool] = None
+
+class AIConfirmRequest(BaseModel):
+    """Confirm a stored proposal, sending only the entries the user changed"""
+    preview_id: str
+    overrides: List[ProposalOverride] = []
 
 class AIChatResponse(BaseModel):
     message: AIChatMessage
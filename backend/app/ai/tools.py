@@ -2,21 +2,38 @@ from typing import List, Dict, Any, Callable, Optional
 from functools import wraps
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from app.database import budget_line_items_collection, budgets_collection, categories_collection, goals_collection
+from app.services.bank_profile_service import BankProfileService
+from app.services.dashboard_service import DashboardService
+from app.services.data_version_service import DataVersionService
+from app.services.import_job_service import ImportJobService
+from app.services.import_service import DUPLICATE_KEY_ERROR, ImportService
+from app.services.merchant_index_service import MerchantIndexService
+from app.services.rollup_service import RollupService
 from .schemas import CreateTransactionArgs, ListTransactionsArgs, DeleteTransactionArgs, GetDashboardStatsArgs
 import json
-import csv
-import io
 import re
 import uuid
 
 # Registry to store available tools
 tools_registry: Dict[str, Callable] = {}
 
-def register_tool(name: str):
-    """Decorator to register a function as an AI tool."""
+# Tools that only read; the agent may run these concurrently within a turn
+read_only_tools: set = set()
+
+def register_tool(name: str, read_only: bool = False):
+    """
+    Decorator to register a function as an AI tool.
+
+    read_only marks tools with no side effects. Anything that writes (even
+    a stored preview) must leave it False so it runs in call order.
+    """
     def decorator(func: Callable):
         tools_registry[name] = func
+        if read_only:
+            read_only_tools.add(name)
         @wraps(func)
         async def wrapper(*args, **kwargs):
             return await func(*args, **kwargs)
@@ -411,19 +428,20 @@ async def _find_goal_for_user(user_id: str, goal_name: str) -> Optional[Dict[str
 
     return None
 
-@register_tool("get_budget_summary")
+@register_tool("get_budget_summary", read_only=True)
 async def get_budget_summary(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get budget summary for a specific month"""
     try:
         month = kwargs.get("month", datetime.now().strftime("%Y-%m"))
         
-        # Find budget for the month
-        budget = await budgets_collection.find_one({
+        # Month totals are pre-aggregated in the month's rollup document
+        rollup = await RollupService.get_month_rollup(user_id, month)
+        budget_exists = rollup is not None or await budgets_collection.find_one({
             "month": month,
             "user_id": user_id
-        })
+        }) is not None
         
-        if not budget:
+        if not budget_exists:
             return {
                 "ok": True,
                 "data": {
@@ -437,30 +455,10 @@ async def get_budget_summary(user_id: str, **kwargs) -> Dict[str, Any]:
                 }
             }
         
-        budget_id = budget["_id"]
-        
-        total_income = 0
-        total_expenses = 0
-        total_savings = 0
-        
-        # Get budget line items
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
-            
-            if category:
-                category_type = category.get("type")
-                amount = item.get("amount", 0)
-                owner_slot = item.get("owner_slot", "")
-                
-                if category_type == "income":
-                    total_income += amount
-                elif category_type == "expense":
-                    total_expenses += amount
-                elif category_type == "savings":
-                    if owner_slot == "shared":
-                        total_savings += amount
-                elif category_type == "fun":
-                    total_savings += amount
+        totals = DashboardService._summarize_totals((rollup or {}).get("totals", {}))
+        total_income = totals["total_income"]
+        total_expenses = totals["total_expenses"]
+        total_savings = totals["total_savings"]
         
         net_income = total_income - total_expenses
         
@@ -479,36 +477,69 @@ async def get_budget_summary(user_id: str, **kwargs) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e), "code": "BUDGET_SUMMARY_ERROR"}
 
-@register_tool("get_income_breakdown")
+async def _month_items_by_type(user_id: str, month: str, category_types: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get a month's line items of the given category types with category names.
+
+    Filters on the line items' category_type, then resolves names with one
+    $in query. Returns None when the month has no budget.
+    """
+    budget = await budgets_collection.find_one({
+        "month": month,
+        "user_id": user_id
+    })
+    if not budget:
+        return None
+
+    items = await budget_line_items_collection.find({
+        "user_id": user_id,
+        "budget_id": budget["_id"],
+        "category_type": {"$in": category_types},
+    }).to_list(length=None)
+
+    category_ids = list({item["category_id"] for item in items})
+    category_names = {}
+    if category_ids:
+        cursor = categories_collection.find({"_id": {"$in": category_ids}}, {"name": 1})
+        async for category in cursor:
+            category_names[category["_id"]] = category.get("name", "Unknown")
+
+    return [
+        {
+            "name": item.get("name", "Unnamed"),
+            "category": category_names[item["category_id"]],
+            "category_type": item["category_type"],
+            "amount": item.get("amount", 0),
+            "owner": item.get("owner_slot", "unknown"),
+        }
+        # Items whose category was deleted are skipped
+        for item in items
+        if item["category_id"] in category_names
+    ]
+
+@register_tool("get_income_breakdown", read_only=True)
 async def get_income_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get detailed income breakdown by category"""
     try:
         month = kwargs.get("month", datetime.now().strftime("%Y-%m"))
         
-        budget = await budgets_collection.find_one({
-            "month": month,
-            "user_id": user_id
-        })
+        items = await _month_items_by_type(user_id, month, ["income"])
         
-        if not budget:
+        if items is None:
             return {"ok": True, "data": {"month": month, "currency": "DKK", "income_items": [], "total": 0}}
         
-        budget_id = budget["_id"]
         income_items = []
         total = 0
         
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
-            
-            if category and category.get("type") == "income":
-                amount = item.get("amount", 0)
-                income_items.append({
-                    "name": item.get("name", "Unnamed"),
-                    "category": category.get("name", "Unknown"),
-                    "amount": amount,
-                    "owner": item.get("owner_slot", "unknown")
-                })
-                total += amount
+        for item in items:
+            amount = item["amount"]
+            income_items.append({
+                "name": item["name"],
+                "category": item["category"],
+                "amount": amount,
+                "owner": item["owner"]
+            })
+            total += amount
         
         return {
             "ok": True,
@@ -522,36 +553,29 @@ async def get_income_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e), "code": "INCOME_BREAKDOWN_ERROR"}
 
-@register_tool("get_expense_breakdown")
+@register_tool("get_expense_breakdown", read_only=True)
 async def get_expense_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get detailed expense breakdown by category"""
     try:
         month = kwargs.get("month", datetime.now().strftime("%Y-%m"))
         
-        budget = await budgets_collection.find_one({
-            "month": month,
-            "user_id": user_id
-        })
+        items = await _month_items_by_type(user_id, month, ["expense"])
         
-        if not budget:
+        if items is None:
             return {"ok": True, "data": {"month": month, "currency": "DKK", "expense_items": [], "total": 0}}
         
-        budget_id = budget["_id"]
         expense_items = []
         total = 0
         
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
-            
-            if category and category.get("type") == "expense":
-                amount = item.get("amount", 0)
-                expense_items.append({
-                    "name": item.get("name", "Unnamed"),
-                    "category": category.get("name", "Unknown"),
-                    "amount": amount,
-                    "owner": item.get("owner_slot", "unknown")
-                })
-                total += amount
+        for item in items:
+            amount = item["amount"]
+            expense_items.append({
+                "name": item["name"],
+                "category": item["category"],
+                "amount": amount,
+                "owner": item["owner"]
+            })
+            total += amount
         
         return {
             "ok": True,
@@ -565,43 +589,36 @@ async def get_expense_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e), "code": "EXPENSE_BREAKDOWN_ERROR"}
 
-@register_tool("get_savings_breakdown")
+@register_tool("get_savings_breakdown", read_only=True)
 async def get_savings_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get detailed savings and fun breakdown"""
     try:
         month = kwargs.get("month", datetime.now().strftime("%Y-%m"))
         
-        budget = await budgets_collection.find_one({
-            "month": month,
-            "user_id": user_id
-        })
+        items = await _month_items_by_type(user_id, month, ["savings", "fun"])
         
-        if not budget:
+        if items is None:
             return {"ok": True, "data": {"month": month, "currency": "DKK", "savings_items": [], "fun_items": [], "total": 0}}
         
-        budget_id = budget["_id"]
         savings_items = []
         fun_items = []
         total = 0
         
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
+        for item in items:
+            amount = item["amount"]
+            item_data = {
+                "name": item["name"],
+                "category": item["category"],
+                "amount": amount,
+                "owner": item["owner"]
+            }
             
-            if category:
-                amount = item.get("amount", 0)
-                item_data = {
-                    "name": item.get("name", "Unnamed"),
-                    "category": category.get("name", "Unknown"),
-                    "amount": amount,
-                    "owner": item.get("owner_slot", "unknown")
-                }
-                
-                if category.get("type") == "savings" and item.get("owner_slot") == "shared":
-                    savings_items.append(item_data)
-                    total += amount
-                elif category.get("type") == "fun":
-                    fun_items.append(item_data)
-                    total += amount
+            if item["category_type"] == "savings" and item["owner"] == "shared":
+                savings_items.append(item_data)
+                total += amount
+            elif item["category_type"] == "fun":
+                fun_items.append(item_data)
+                total += amount
         
         return {
             "ok": True,
@@ -616,68 +633,15 @@ async def get_savings_breakdown(user_id: str, **kwargs) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e), "code": "SAVINGS_BREAKDOWN_ERROR"}
 
-@register_tool("get_lifetime_savings")
+@register_tool("get_lifetime_savings", read_only=True)
 async def get_lifetime_savings(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get lifetime savings across all budgets"""
     try:
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            {
-                "$lookup": {
-                    "from": "budget_line_items",
-                    "localField": "_id",
-                    "foreignField": "budget_id",
-                    "as": "items"
-                }
-            },
-            {"$unwind": "$items"},
-            {
-                "$lookup": {
-                    "from": "categories",
-                    "localField": "items.category_id",
-                    "foreignField": "_id",
-                    "as": "category"
-                }
-            },
-            {"$unwind": "$category"},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_shared_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$and": [
-                                    {"$eq": ["$category.type", "savings"]},
-                                    {"$eq": ["$items.owner_slot", "shared"]}
-                                ]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    },
-                    "total_fun_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$category.type", "fun"]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    }
-                }
-            }
-        ]
-        
-        result = await budgets_collection.aggregate(pipeline).to_list(length=1)
+        lifetime = await RollupService.get_lifetime_savings(user_id)
         
-        if result:
-            shared_savings = result[0].get("total_shared_savings", 0)
-            fun_savings = result[0].get("total_fun_savings", 0)
-            total_savings = shared_savings + fun_savings
-        else:
-            shared_savings = 0
-            fun_savings = 0
-            total_savings = 0
+        shared_savings = lifetime["shared"]
+        fun_savings = lifetime["fun"]
+        total_savings = shared_savings + fun_savings
         
         return {
             "ok": True,
@@ -692,7 +656,7 @@ async def get_lifetime_savings(user_id: str, **kwargs) -> Dict[str, Any]:
         return {"ok": False, "error": str(e), "code": "LIFETIME_SAVINGS_ERROR"}
 
 
-@register_tool("get_goals_summary")
+@register_tool("get_goals_summary", read_only=True)
 async def get_goals_summary(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get all goals with progress and current month savings rate"""
     try:
@@ -703,108 +667,15 @@ async def get_goals_summary(user_id: str, **kwargs) -> Dict[str, Any]:
         all_goals = await goals_cursor.to_list(length=100)
 
         # 2. Calculate lifetime savings (shared + fun) to determine goal progress
-        lifetime_pipeline = [
-            {"$match": {"user_id": user_id}},
-            {
-                "$lookup": {
-                    "from": "budget_line_items",
-                    "localField": "_id",
-                    "foreignField": "budget_id",
-                    "as": "items"
-                }
-            },
-            {"$unwind": "$items"},
-            {
-                "$lookup": {
-                    "from": "categories",
-                    "localField": "items.category_id",
-                    "foreignField": "_id",
-                    "as": "category"
-                }
-            },
-            {"$unwind": "$category"},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_shared_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$and": [
-                                    {"$eq": ["$category.type", "savings"]},
-                                    {"$eq": ["$items.owner_slot", "shared"]}
-                                ]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    },
-                    "total_fun_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$category.type", "fun"]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    }
-                }
-            }
-        ]
-        lifetime_result = await budgets_collection.aggregate(lifetime_pipeline).to_list(length=1)
-        lifetime_shared = lifetime_result[0]["total_shared_savings"] if lifetime_result else 0
-        lifetime_fun = lifetime_result[0]["total_fun_savings"] if lifetime_result else 0
+        lifetime = await RollupService.get_lifetime_savings(user_id)
+        lifetime_shared = lifetime["shared"]
+        lifetime_fun = lifetime["fun"]
 
         # 3. Get THIS MONTH's savings to compute monthly savings rate
-        monthly_pipeline = [
-            {"$match": {"user_id": user_id, "month": month}},
-            {
-                "$lookup": {
-                    "from": "budget_line_items",
-                    "localField": "_id",
-                    "foreignField": "budget_id",
-                    "as": "items"
-                }
-            },
-            {"$unwind": "$items"},
-            {
-                "$lookup": {
-                    "from": "categories",
-                    "localField": "items.category_id",
-                    "foreignField": "_id",
-                    "as": "category"
-                }
-            },
-            {"$unwind": "$category"},
-            {
-                "$group": {
-                    "_id": None,
-                    "monthly_shared_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$and": [
-                                    {"$eq": ["$category.type", "savings"]},
-                                    {"$eq": ["$items.owner_slot", "shared"]}
-                                ]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    },
-                    "monthly_fun_savings": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$category.type", "fun"]},
-                                "$items.amount",
-                                0
-                            ]
-                        }
-                    }
-                }
-            }
-        ]
-        monthly_result = await budgets_collection.aggregate(monthly_pipeline).to_list(length=1)
-        monthly_shared = monthly_result[0]["monthly_shared_savings"] if monthly_result else 0
-        monthly_fun = monthly_result[0]["monthly_fun_savings"] if monthly_result else 0
+        monthly_rollup = await RollupService.get_month_rollup(user_id, month)
+        monthly_totals = (monthly_rollup or {}).get("totals", {})
+        monthly_shared = monthly_totals.get("savings", {}).get("shared", 0)
+        monthly_fun = sum(monthly_totals.get("fun", {}).values())
 
         # 4. Distribute lifetime savings hierarchically across goals (same logic as frontend)
         def distribute_savings(goal_list: list, available: float) -> list:
@@ -899,6 +770,7 @@ async def create_goal(user_id: str, **kwargs) -> Dict[str, Any]:
         }
 
         await goals_collection.insert_one(new_goal)
+        await DataVersionService.bump(user_id)
 
         return {
             "ok": True,
@@ -967,6 +839,7 @@ async def update_goal(user_id: str, **kwargs) -> Dict[str, Any]:
         )
         if not updated_goal:
             return {"ok": False, "error": "Goal not found", "code": "UPDATE_GOAL_NOT_FOUND"}
+        await DataVersionService.bump(user_id)
 
         return {
             "ok": True,
@@ -1002,6 +875,7 @@ async def delete_goal(user_id: str, **kwargs) -> Dict[str, Any]:
         result = await goals_collection.delete_one({"_id": goal["_id"], "user_id": user_id})
         if result.deleted_count == 0:
             return {"ok": False, "error": "Goal not found", "code": "DELETE_GOAL_NOT_FOUND"}
+        await DataVersionService.bump(user_id)
 
         return {
             "ok": True,
@@ -1015,7 +889,7 @@ async def delete_goal(user_id: str, **kwargs) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e), "code": "DELETE_GOAL_ERROR"}
 
-@register_tool("get_user_categories")
+@register_tool("get_user_categories", read_only=True)
 async def get_user_categories(user_id: str, **kwargs) -> Dict[str, Any]:
     """Get all categories for the user, optionally filtered by type"""
     try:
@@ -1062,17 +936,24 @@ async def propose_budget_entries(user_id: str, **kwargs) -> Dict[str, Any]:
         validated = []
         warnings = []
 
+        # Verify categories exist and belong to the user, in one query
+        category_ids = {
+            ObjectId(entry["category_id"])
+            for entry in entries
+            if ObjectId.is_valid(entry.get("category_id", ""))
+        }
+        categories = {}
+        if category_ids:
+            cursor = categories_collection.find({"_id": {"$in": list(category_ids)}, "user_id": user_id})
+            categories = {str(category["_id"]): category async for category in cursor}
+
         for i, entry in enumerate(entries):
             category_id_str = entry.get("category_id", "")
             if not ObjectId.is_valid(category_id_str):
                 warnings.append(f"Entry {i + 1}: Invalid category_id '{category_id_str}'")
                 continue
 
-            # Verify category exists and belongs to user
-            category = await categories_collection.find_one({
-                "_id": ObjectId(category_id_str),
-                "user_id": user_id,
-            })
+            category = categories.get(str(ObjectId(category_id_str)))
             if not category:
                 warnings.append(f"Entry {i + 1}: Category '{entry.get('category_name', category_id_str)}' not found for this user")
                 continue
@@ -1098,6 +979,7 @@ async def propose_budget_entries(user_id: str, **kwargs) -> Dict[str, Any]:
                 "month": month,
                 "source": "ai",
                 "needs_review": True,
+                **({"fingerprint": entry["fingerprint"]} if entry.get("fingerprint") else {}),
             })
 
         if not validated:
@@ -1114,10 +996,14 @@ async def propose_budget_entries(user_id: str, **kwargs) -> Dict[str, Any]:
             lines.append(f"  • {e['name']} → {e['category_name']} ({e['category_type']}): {e['amount']:,.0f} kr. [{e['owner_slot']}]")
         summary = f"I'd like to save {len(validated)} budget entries for a total of {total:,.0f} kr.:\n" + "\n".join(lines)
 
+        # Kept server-side so the confirm only needs to send the preview ID
+        preview_id = await ImportJobService.store_preview(user_id, validated, kind="ai_proposal")
+
         return {
             "ok": True,
             "action": "confirm",
             "data": {
+                "preview_id": preview_id,
                 "entries": validated,
                 "summary": summary,
                 "total": total,
@@ -1129,7 +1015,7 @@ async def propose_budget_entries(user_id: str, **kwargs) -> Dict[str, Any]:
         return {"ok": False, "error": str(e), "code": "PROPOSE_ENTRIES_ERROR"}
 
 
-@register_tool("parse_csv_data")
+@register_tool("parse_csv_data", read_only=True)
 async def parse_csv_data(user_id: str, **kwargs) -> Dict[str, Any]:
     """Parse CSV content and return structured rows"""
     try:
@@ -1137,91 +1023,31 @@ async def parse_csv_data(user_id: str, **kwargs) -> Dict[str, Any]:
         if not csv_content.strip():
             return {"ok": False, "error": "Empty CSV content"}
 
-        # Try to detect delimiter
-        first_line = csv_content.strip().split("\n")[0]
-        delimiter = ";"
-        if "\t" in first_line:
-            delimiter = "\t"
-        elif "," in first_line and ";" not in first_line:
-            delimiter = ","
-
-        reader = csv.reader(io.StringIO(csv_content.strip()), delimiter=delimiter)
-        rows = list(reader)
-
-        if len(rows) < 2:
-            return {"ok": False, "error": "CSV has fewer than 2 rows (need header + data)"}
-
-        header = [h.strip().lower() for h in rows[0]]
-        data_rows = rows[1:]
-
-        # Try to identify columns
-        date_col = None
-        desc_col = None
-        amount_col = None
-
-        date_keywords = ["date", "dato", "transaction date", "booking date", "bogført"]
-        desc_keywords = ["description", "text", "beskrivelse", "merchant", "tekst", "modtager"]
-        amount_keywords = ["amount", "beløb", "sum", "value", "kr"]
-
-        for i, h in enumerate(header):
-            for kw in date_keywords:
-                if kw in h:
-                    date_col = i
-                    break
-            for kw in desc_keywords:
-                if kw in h:
-                    desc_col = i
-                    break
-            for kw in amount_keywords:
-                if kw in h:
-                    amount_col = i
-                    break
-
-        # Fallback: assume first 3 columns are date, desc, amount
-        if date_col is None and len(header) >= 1:
-            date_col = 0
-        if desc_col is None and len(header) >= 2:
-            desc_col = 1
-        if amount_col is None and len(header) >= 3:
-            amount_col = 2
-
-        parsed = []
-        for row in data_rows:
-            if len(row) <= max(date_col or 0, desc_col or 0, amount_col or 0):
-                continue  # skip incomplete rows
-
-            date_val = row[date_col].strip() if date_col is not None else ""
-            desc_val = row[desc_col].strip() if desc_col is not None else ""
-            amount_str = row[amount_col].strip() if amount_col is not None else "0"
-
-            # Parse amount: handle Danish format (1.234,56) and negative signs
-            amount_str = amount_str.replace(" ", "").replace("kr.", "").replace("kr", "").strip()
-            # Convert Danish format: 1.234,56 → 1234.56
-            if "," in amount_str and "." in amount_str:
-                amount_str = amount_str.replace(".", "").replace(",", ".")
-            elif "," in amount_str:
-                amount_str = amount_str.replace(",", ".")
-
-            try:
-                amount = float(amount_str)
-            except ValueError:
-                amount = 0.0
-
-            if desc_val or amount != 0:
-                parsed.append({
-                    "date": date_val,
-                    "description": desc_val,
-                    "amount": amount,
-                    "is_income": amount > 0,
-                })
+        # Same parser as the import page, including saved bank formats
+        header_line = csv_content.lstrip().split("\n", 1)[0]
+        profile = await BankProfileService.match(user_id, header_line)
+        try:
+            result = ImportService.parse_csv(csv_content, profile)
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
 
+        parsed = [
+            {
+                "date": row["date"],
+                "description": row["description"],
+                "amount": row["amount"],
+                "is_income": row["amount"] > 0,
+            }
+            for row in result["rows"]
+        ]
         return {
             "ok": True,
             "data": {
                 "rows": parsed,
                 "count": len(parsed),
-                "detected_header": header,
-                "delimiter": delimiter,
+                "detected_header": result["header"],
+                "delimiter": result["delimiter"],
+                "columns": result["columns"],
             }
         }
     except Exception as e:
@@ -1232,65 +1058,137 @@ async def execute_save_budget_entries(user_id: str, entries: list) -> Dict[str,
     """
     Actually save validated budget entries to the database.
     This is called after user confirmation — NOT by the LLM directly.
+
+    Line items are written with one unordered insert_many. Rollups, the
+    merchant index and the data version are updated for whatever was
+    inserted even if a later step fails, and a failed result still reports
+    saved_count so the caller knows whether anything was written. Entries
+    from an uploaded statement carry the bank row's fingerprint; rows whose
+    fingerprint is already stored are skipped and counted, as in
+    ImportService.confirm_import.
     """
+    inserted_items = []
+    budget_months = {}
     try:
         saved = []
         errors = []
 
+        # Category types are copied onto each line item
+        category_ids = {
+            ObjectId(entry["category_id"])
+            for entry in entries
+            if ObjectId.is_valid(entry.get("category_id", ""))
+        }
+        category_types = {}
+        category_names = {}
+        if category_ids:
+            cursor = categories_collection.find(
+                {"_id": {"$in": list(category_ids)}, "user_id": user_id},
+                {"type": 1, "name": 1},
+            )
+            async for category in cursor:
+                category_types[str(category["_id"])] = category.get("type")
+                category_names[str(category["_id"])] = category.get("name")
+
+        # Rows imported before, or repeated within this request, are skipped
+        imported = await ImportService.imported_fingerprints(
+            user_id, (entry.get("fingerprint") for entry in entries)
+        )
+        skipped_count = 0
+
+        now = datetime.now(timezone.utc)
+        budget_ids = {}
+        pending = []
         for entry in entries:
-            month = entry.get("month", datetime.now(timezone.utc).strftime("%Y-%m"))
+            fingerprint = entry.get("fingerprint")
+            if fingerprint:
+                if fingerprint in imported:
+                    skipped_count += 1
+                    continue
+                imported.add(fingerprint)
+
+            month = entry.get("month", now.strftime("%Y-%m"))
             category_id_str = entry.get("category_id", "")
-
-            # Ensure budget exists for this month (auto-create if needed)
-            budget = await budgets_collection.find_one({
-                "user_id": user_id,
-                "month": month,
-            })
-            if not budget:
-                now = datetime.now(timezone.utc)
-                result = await budgets_collection.insert_one({
-                    "user_id": user_id,
-                    "month": month,
-                    "created_at": now,
-                    "updated_at": now,
-                })
-                budget = await budgets_collection.find_one({"_id": result.inserted_id})
-
-            if not budget:
-                errors.append(f"Failed to create/find budget for {month}")
+            if not ObjectId.is_valid(category_id_str) or category_id_str not in category_types:
+                errors.append(f"Category not found for '{entry.get('name', 'Unnamed')}'")
                 continue
 
-            budget_id = budget["_id"]
-
-            # Create line item
-            now = datetime.now(timezone.utc)
-            line_item_doc = {
+            # Ensure budget exists for this month (auto-create if needed)
+            if month not in budget_ids:
+                budget = await budgets_collection.find_one_and_update(
+                    {"user_id": user_id, "month": month},
+                    {"$setOnInsert": {"created_at": now, "updated_at": now}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                budget_ids[month] = budget["_id"]
+            budget_id = budget_ids[month]
+
+            pending.append((entry, {
+                "_id": ObjectId(),
                 "user_id": user_id,
                 "budget_id": budget_id,
                 "name": entry.get("name", "Unnamed"),
                 "category_id": ObjectId(category_id_str),
+                "category_type": category_types[category_id_str],
                 "amount": entry.get("amount", 0),
                 "owner_slot": entry.get("owner_slot", "user1"),
+                **({"fingerprint": fingerprint} if fingerprint else {}),
                 "created_at": now,
                 "updated_at": now,
-            }
-
-            result = await budget_line_items_collection.insert_one(line_item_doc)
-            saved.append({
-                "id": str(result.inserted_id),
-                "name": entry.get("name"),
-                "amount": entry.get("amount"),
-                "category_name": entry.get("category_name"),
-            })
+            }))
+
+        try:
+            failed = {}
+            if pending:
+                try:
+                    await budget_line_items_collection.insert_many(
+                        [line_item_doc for _, line_item_doc in pending],
+                        ordered=False,
+                    )
+                except BulkWriteError as e:
+                    # Unordered inserts keep going; only the reported rows are missing
+                    for error in e.details["writeErrors"]:
+                        if error.get("code") == DUPLICATE_KEY_ERROR:
+                            # Imported concurrently by another request
+                            failed[error["index"]] = None
+                        else:
+                            failed[error["index"]] = error.get("errmsg", "write failed")
+
+            for index, (entry, line_item_doc) in enumerate(pending):
+                if index in failed and failed[index] is None:
+                    skipped_count += 1
+                    continue
+                if index in failed:
+                    errors.append(f"Error saving '{line_item_doc['name']}': {failed[index]}")
+                    continue
+                inserted_items.append(line_item_doc)
+                budget_months[line_item_doc["budget_id"]] = entry.get("month", now.strftime("%Y-%m"))
+                saved.append({
+                    "id": str(line_item_doc["_id"]),
+                    "name": entry.get("name"),
+                    "amount": entry.get("amount"),
+                    "category_name": category_names.get(str(line_item_doc["category_id"]), entry.get("category_name")),
+                })
+        finally:
+            if inserted_items:
+                await RollupService.apply_changes(
+                    user_id,
+                    added=inserted_items,
+                    budget_months=budget_months,
+                )
+                await MerchantIndexService.apply_changes(user_id, added=inserted_items)
+                await DataVersionService.bump(user_id)
 
         return {
             "ok": True,
             "data": {
                 "saved_count": len(saved),
                 "error_count": len(errors),
+                "skipped_count": skipped_count,
                 "saved": saved,
                 "errors": errors,
             }
         }
     except Exception as e:
-        return {"ok": False, "error": str(e), "code": "SAVE_ENTRIES_ERROR"}
+        return {"ok": False, "error": str(e), "code": "SAVE_ENTRIES_ERROR", "saved_count": len(inserted_items)}
@@ -17,6 +17,24 @@ async def get_database():
     """Get database instance"""
     return database
 
+
+# Cached answer to whether the deployment supports multi-document transactions
+_transactions_supported = None
+
+
+async def supports_transactions() -> bool:
+    """
+    Whether the connected deployment supports multi-document transactions.
+
+    Transactions need a replica set or a sharded cluster; a standalone
+    server (the default local setup) rejects them.
+    """
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
 # Collections
 transactions_collection = database.get_collection("transactions")
 goals_collection = database.get_collection("goals")
@@ -29,6 +47,25 @@ categories_collection = database.get_collection("categories")
 budgets_collection = database.get_collection("budgets")
 budget_line_items_collection = database.get_collection("budget_line_items")
 
+# Incrementally maintained per-month totals (see app/services/rollup_service.py)
+budget_rollups_collection = database.get_collection("budget_rollups")
+
+# Per-user data version counters (see app/services/data_version_service.py)
+user_data_versions_collection = database.get_collection("user_data_versions")
+
+# Per-user import suggestion lookup tables (see app/services/merchant_index_service.py)
+merchant_match_index_collection = database.get_collection("merchant_match_index")
+
+# Background CSV import jobs and their parsed rows (see app/services/import_job_service.py)
+import_jobs_collection = database.get_collection("import_jobs")
+import_job_rows_collection = database.get_collection("import_job_rows")
+
+# Known bank CSV layouts, per user and global (see app/services/bank_profile_service.py)
+bank_format_profiles_collection = database.get_collection("bank_format_profiles")
+
+# Per-user merchant categorizations from the AI (see app/services/merchant_category_cache_service.py)
+merchant_categorizations_collection = database.get_collection("merchant_categorizations")
+
 
 # ============================================================================
 # DATABASE INDEXES
@@ -70,8 +107,86 @@ async def create_indexes():
             [("user_id", 1), ("category_id", 1)],
             name="user_category_items"
         )
+        await budget_line_items_collection.create_index(
+            [("user_id", 1), ("category_type", 1), ("budget_id", 1)],
+            name="user_category_type_items"
+        )
+        # Keyset pagination: newest first, _id breaks ties
+        await budget_line_items_collection.create_index(
+            [("user_id", 1), ("budget_id", 1), ("created_at", -1), ("_id", -1)],
+            name="user_budget_items_by_created"
+        )
+        await budget_line_items_collection.create_index(
+            [("user_id", 1), ("created_at", -1), ("_id", -1)],
+            name="user_items_by_created"
+        )
+        # Re-imports: a bank row fingerprint is stored at most once per user
+        await budget_line_items_collection.create_index(
+            [("user_id", 1), ("fingerprint", 1)],
+            name="unique_import_fingerprint",
+            unique=True,
+            partialFilterExpression={"fingerprint": {"$type": "string"}}
+        )
         logger.info("Created indexes for budget_line_items collection")
 
+        # Budget rollups indexes
+        await budget_rollups_collection.create_index(
+            [("user_id", 1), ("month", 1)],
+            unique=True,
+            name="unique_rollup_per_user_month"
+        )
+        logger.info("Created indexes for budget_rollups collection")
+
+        # User data versions indexes
+        await user_data_versions_collection.create_index(
+            "user_id",
+            unique=True,
+            name="unique_data_version_per_user"
+        )
+        logger.info("Created indexes for user_data_versions collection")
+
+        # Merchant match index indexes
+        await merchant_match_index_collection.create_index(
+            [("user_id", 1), ("kind", 1), ("key", 1)],
+            unique=True,
+            name="unique_match_entry"
+        )
+        logger.info("Created indexes for merchant_match_index collection")
+
+        # Import jobs indexes; expired jobs and their rows are removed by TTL
+        await import_jobs_collection.create_index(
+            "expires_at",
+            expireAfterSeconds=0,
+            name="import_job_expiry"
+        )
+        await import_job_rows_collection.create_index(
+            [("job_id", 1), ("batch", 1)],
+            unique=True,
+            name="unique_job_batch"
+        )
+        await import_job_rows_collection.create_index(
+            "expires_at",
+            expireAfterSeconds=0,
+            name="import_job_rows_expiry"
+        )
+        logger.info("Created indexes for import_jobs collections")
+
+        # Bank format profiles indexes
+        await bank_format_profiles_collection.create_index(
+            [("scope", 1), ("user_id", 1), ("signature", 1)],
+            unique=True,
+            name="unique_profile_signature"
+        )
+        logger.info("Created indexes for bank_format_profiles collection")
+
+        # Merchant categorization cache indexes
+        await merchant_categorizations_collection.create_index(
+            [("user_id", 1), ("merchant_key", 1), ("is_income", 1)],
+            unique=True,
+            name="unique_merchant_categorization"
+        )
+        logger.info("Created indexes for merchant_categorizations collection")
+
         # Legacy collections (if they exist)
         await transactions_collection.create_index("user_id")
         await goals_collection.create_index("user_id")
@@ -91,6 +206,13 @@ async def drop_indexes():
         await categories_collection.drop_indexes()
         await budgets_collection.drop_indexes()
         await budget_line_items_collection.drop_indexes()
+        await budget_rollups_collection.drop_indexes()
+        await user_data_versions_collection.drop_indexes()
+        await merchant_match_index_collection.drop_indexes()
+        await import_jobs_collection.drop_indexes()
+        await import_job_rows_collection.drop_indexes()
+        await bank_format_profiles_collection.drop_indexes()
+        await merchant_categorizations_collection.drop_indexes()
         logger.info("Dropped all indexes")
     except Exception as e:
         logger.error(f"Error dropping indexes: {e}")
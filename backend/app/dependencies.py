@@ -1,7 +1,11 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.security import verify_token
 from app.database import database
+from app.services.data_version_service import DataVersionService
 
 security = HTTPBearer()
 
@@ -43,3 +47,40 @@ async def get_current_user_id(current_user_email: str = Depends(get_current_user
         )
     
     return str(user["_id"])
+
+
+async def check_etag(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_current_user_id),
+) -> None:
+    """
+    Dependency for GET endpoints whose output only depends on the user's data.
+
+    Derives a strong ETag from the user's data version, the request path and
+    query string, and the current month (endpoints default to it when no month
+    is given). If the client's If-None-Match matches, the request ends here
+    with 304 Not Modified and the endpoint body never runs.
+
+    The version is read before the endpoint queries MongoDB. A write that
+    lands in between bumps the version again, so the worst case is one extra
+    full response, never a stale 304.
+    """
+    version = await DataVersionService.get_version(user_id)
+    key = "|".join([
+        user_id,
+        str(version),
+        request.url.path,
+        request.url.query,
+        datetime.now().strftime("%Y-%m"),
+    ])
+    etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.routes import transactions, dashboard, auth, categories, database, budgets, budget_line_items, admin, goals, ai, demo, imports
 from app.database import create_indexes
+from app.services.bank_profile_service import BankProfileService
+from app.services.import_service import shutdown_suggestion_pool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,11 +21,18 @@ async def lifespan(app: FastAPI):
         logger.info("Database indexes created successfully")
     except Exception as e:
         logger.error(f"Failed to create indexes: {e}")
+
+    try:
+        count = await BankProfileService.register_default_profiles()
+        logger.info(f"Registered {count} built-in bank profiles")
+    except Exception as e:
+        logger.error(f"Failed to register bank profiles: {e}")
     
     yield
     
     # Shutdown: cleanup if needed
     logger.info("Application shutting down")
+    shutdown_suggestion_pool()
 
 
 app = FastAPI(
@@ -39,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Include routers
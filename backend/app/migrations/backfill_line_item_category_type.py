@@ -0,0 +1,136 @@
+"""
+Backfill category_type on budget_line_items.
+
+Line items store a copy of their category's type so analytics can group by
+type without joining categories. New writes set it; this script fills it in
+for items created before the field existed and repairs any copy that has
+drifted from its category. It then rebuilds the budget rollups, which are
+computed from the copied type.
+
+Items are updated with one UpdateMany per category, sent in bulk_write
+batches, so the cost grows with the number of categories rather than items.
+
+Usage:
+    python -m app.migrations.backfill_line_item_category_type [--dry-run] [--batch-size N]
+
+    --dry-run      Only report how many items would change
+    --batch-size   Categories per bulk_write (default 500)
+"""
+
+import asyncio
+import logging
+import sys
+
+from pymongo import UpdateMany
+
+from app.database import (
+    budget_line_items_collection,
+    categories_collection,
+    create_indexes,
+)
+from app.services.rollup_service import RollupService
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _parse_batch_size() -> int:
+    """Return the value following --batch-size, if present."""
+    if "--batch-size" not in sys.argv:
+        return DEFAULT_BATCH_SIZE
+    index = sys.argv.index("--batch-size")
+    try:
+        return max(1, int(sys.argv[index + 1]))
+    except (IndexError, ValueError):
+        logger.error("--batch-size requires a positive integer")
+        sys.exit(2)
+
+
+async def backfill(dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Copy each category's type onto its line items.
+
+    Args:
+        dry_run: If True, only count items that would change
+        batch_size: Number of categories per bulk_write
+
+    Returns:
+        Dict with categories, items_updated and orphaned counts
+    """
+    stats = {"categories": 0, "items_updated": 0, "orphaned": 0}
+    batch = []
+
+    async def flush():
+        if not batch:
+            return
+        if dry_run:
+            for query, _ in batch:
+                stats["items_updated"] += await budget_line_items_collection.count_documents(query)
+        else:
+            result = await budget_line_items_collection.bulk_write(
+                [UpdateMany(query, update) for query, update in batch],
+                ordered=False,
+            )
+            stats["items_updated"] += result.modified_count
+        logger.info(
+            f"Processed {stats['categories']} categories, "
+            f"{stats['items_updated']} items {'to update' if dry_run else 'updated'}"
+        )
+        batch.clear()
+
+    async for category in categories_collection.find({}, {"type": 1}):
+        stats["categories"] += 1
+        batch.append((
+            {
+                "category_id": category["_id"],
+                "category_type": {"$ne": category.get("type")},
+            },
+            {"$set": {"category_type": category.get("type")}},
+        ))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    # Items whose category is gone keep no type and stay out of analytics
+    stats["orphaned"] = await budget_line_items_collection.count_documents(
+        {"category_type": None}
+    )
+    return stats
+
+
+async def main():
+    """Main entry point for the category type backfill"""
+    dry_run = "--dry-run" in sys.argv
+    batch_size = _parse_batch_size()
+
+    logger.info("=" * 60)
+    logger.info("Backfilling category_type on budget line items")
+    logger.info(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}, batch size {batch_size}")
+    logger.info("=" * 60)
+
+    if not dry_run:
+        await create_indexes()
+
+    stats = await backfill(dry_run=dry_run, batch_size=batch_size)
+
+    logger.info("=" * 60)
+    logger.info(f"Categories processed:    {stats['categories']}")
+    logger.info(f"Items {'to update' if dry_run else 'updated'}:      {stats['items_updated']}")
+    logger.info(f"Orphaned (no category):  {stats['orphaned']}")
+    logger.info("=" * 60)
+
+    if dry_run:
+        return
+
+    rebuilt = await RollupService.rebuild()
+    logger.info(f"Rebuilt {rebuilt} monthly rollup(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
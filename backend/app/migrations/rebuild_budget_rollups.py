@@ -0,0 +1,68 @@
+"""
+Rebuild or verify the budget_rollups collection.
+
+Rollups are maintained incrementally by every line item write path. Run this
+once after deploying the rollups feature to backfill existing data, and any
+time you suspect drift (e.g. after editing line items directly in MongoDB).
+
+Usage:
+    python -m app.migrations.rebuild_budget_rollups [--verify] [--user USER_ID]
+
+    --verify   Only report drifted fields; exits with status 1 if any are found
+    --user     Limit the run to one user
+"""
+
+import asyncio
+import logging
+import sys
+
+from app.database import create_indexes
+from app.services.rollup_service import RollupService
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _parse_user_arg() -> str | None:
+    """Return the value following --user, if present."""
+    if "--user" not in sys.argv:
+        return None
+    index = sys.argv.index("--user")
+    if index + 1 >= len(sys.argv):
+        logger.error("--user requires a USER_ID")
+        sys.exit(2)
+    return sys.argv[index + 1]
+
+
+async def main():
+    """Main entry point for the rollup rebuild script"""
+    verify_only = "--verify" in sys.argv
+    user_id = _parse_user_arg()
+    scope = f"user {user_id}" if user_id else "all users"
+
+    logger.info("=" * 60)
+    logger.info(f"Budget rollups {'verification' if verify_only else 'rebuild'} for {scope}")
+    logger.info("=" * 60)
+
+    drift = await RollupService.verify(user_id)
+    for entry in drift:
+        logger.warning(
+            f"Drift for user {entry['user_id']} {entry['month']} {entry['field']}: "
+            f"expected {entry['expected']:.2f}, stored {entry['stored']:.2f}"
+        )
+    logger.info(f"Drifted fields: {len(drift)}")
+
+    if verify_only:
+        sys.exit(1 if drift else 0)
+
+    await create_indexes()
+    rebuilt = await RollupService.rebuild(user_id)
+    logger.info(f"Rebuilt {rebuilt} monthly rollup(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
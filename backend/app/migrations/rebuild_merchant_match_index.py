@@ -0,0 +1,61 @@
+"""
+Rebuild the merchant_match_index collection.
+
+The index is maintained incrementally by every line item write path, and a
+user without one gets it built on their first CSV upload. Run this to warm
+the index for existing users ahead of time, or to repair it after editing
+line items directly in MongoDB.
+
+Usage:
+    python -m app.migrations.rebuild_merchant_match_index [--user USER_ID]
+
+    --user     Limit the run to one user
+"""
+
+import asyncio
+import logging
+import sys
+
+from app.database import budget_line_items_collection, create_indexes
+from app.services.merchant_index_service import MerchantIndexService
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _parse_user_arg() -> str | None:
+    """Return the value following --user, if present."""
+    if "--user" not in sys.argv:
+        return None
+    index = sys.argv.index("--user")
+    if index + 1 >= len(sys.argv):
+        logger.error("--user requires a USER_ID")
+        sys.exit(2)
+    return sys.argv[index + 1]
+
+
+async def main():
+    """Main entry point for the merchant match index rebuild script"""
+    user_id = _parse_user_arg()
+    user_ids = [user_id] if user_id else await budget_line_items_collection.distinct("user_id")
+
+    logger.info("=" * 60)
+    logger.info(f"Merchant match index rebuild for {len(user_ids)} user(s)")
+    logger.info("=" * 60)
+
+    await create_indexes()
+
+    total = 0
+    for index, current_user_id in enumerate(user_ids, start=1):
+        total += await MerchantIndexService.rebuild(current_user_id)
+        logger.info(f"[{index}/{len(user_ids)}] {current_user_id}")
+
+    logger.info(f"Wrote {total} index entries")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
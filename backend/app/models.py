@@ -71,6 +71,40 @@ class ExpenseBreakdown(BaseModel):
     color: str = ""
 
 
+class RangeMonthTotals(BaseModel):
+    """Totals for one month of a range, summed over all owner slots"""
+    month: str
+    income: float
+    expenses: float
+    savings: float
+    fun: float
+    net_income: float
+
+
+class CategorySeries(BaseModel):
+    """One category's amounts per month, aligned with DashboardRange.months"""
+    category_id: str
+    name: str
+    type: str
+    icon: str = ""
+    color: str = ""
+    amounts: List[float]
+    total: float
+
+
+class DashboardRange(BaseModel):
+    """Per-month totals and per-category series for a range of months"""
+    months: List[RangeMonthTotals]
+    categories: List[CategorySeries]
+
+
+class DashboardOverview(BaseModel):
+    """Everything the dashboard page renders, served from one request"""
+    stats: DashboardStats
+    balance_trends: List[BalanceTrend]
+    expense_breakdown: List[ExpenseBreakdown]
+
+
 # ============================================================================
 # CATEGORIES, BUDGETS, AND BUDGET LINE ITEMS MODELS
 # ============================================================================
@@ -218,6 +252,10 @@ class BudgetLineItemInDB(BudgetLineItemBase):
     user_id: str = Field(..., description="The logged-in User_ID who owns this line item")
     budget_id: PyObjectId = Field(..., description="Reference to budget ObjectId")
     category_id: PyObjectId = Field(..., description="Reference to category ObjectId")
+    category_type: Optional[Literal["income", "expense", "savings", "fun"]] = Field(
+        None,
+        description="Copy of the category's type so analytics can group without a join"
+    )
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -273,6 +311,11 @@ class BudgetDraftRow(BaseModel):
     include: bool = True
     source: Literal["existing", "manual", "ai", "import", "copied"] = "manual"
     needs_review: bool = False
+    fingerprint: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="Bank row fingerprint for imported rows"
+    )
 
 
 class BudgetDraftRowResponse(BudgetDraftRow):
@@ -6,6 +6,12 @@ import re
 from fastapi import APIRouter, Depends, HTTPException
 from app.dependencies import get_current_user_id
 from app.database import database
+from app.services.bank_profile_service import BankProfileService
+from app.services.data_version_service import DataVersionService
+from app.services.import_job_service import ImportJobService
+from app.services.merchant_category_cache_service import MerchantCategoryCacheService
+from app.services.merchant_index_service import MerchantIndexService
+from app.services.rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +103,9 @@ async def clear_budgets(user_id: str = Depends(get_current_user_id)):
     
     # Delete all budget line items
     line_items_result = await budget_line_items_collection.delete_many({"user_id": user_id})
+    await RollupService.delete_user_rollups(user_id)
+    await MerchantIndexService.delete_user_index(user_id)
+    await DataVersionService.bump(user_id)
     
     return {
         "message": f"Cleared {budgets_result.deleted_count} budgets and {line_items_result.deleted_count} line items",
@@ -112,6 +121,13 @@ async def clear_categories(user_id: str = Depends(get_current_user_id)):
     """
     categories_collection = database["categories"]
     result = await categories_collection.delete_many({"user_id": user_id})
+    # Line items left without a category drop out of analytics.
+    # The rebuild also bumps the user's data version.
+    await database["budget_line_items"].update_many(
+        {"user_id": user_id},
+        {"$unset": {"category_type": ""}},
+    )
+    await RollupService.rebuild(user_id)
     return {
         "message": f"Cleared {result.deleted_count} categories",
         "deleted_count": result.deleted_count
@@ -125,6 +141,7 @@ async def clear_goals(user_id: str = Depends(get_current_user_id)):
     """
     goals_collection = database["goals"]
     result = await goals_collection.delete_many({"user_id": user_id})
+    await DataVersionService.bump(user_id)
     return {
         "message": f"Cleared {result.deleted_count} goals",
         "deleted_count": result.deleted_count
@@ -149,6 +166,12 @@ async def clear_all_data(user_id: str = Depends(get_current_user_id)):
     line_items_result = await budget_line_items_collection.delete_many({"user_id": user_id})
     categories_result = await categories_collection.delete_many({"user_id": user_id})
     goals_result = await goals_collection.delete_many({"user_id": user_id})
+    await RollupService.delete_user_rollups(user_id)
+    await MerchantIndexService.delete_user_index(user_id)
+    await ImportJobService.delete_user_jobs(user_id)
+    await BankProfileService.delete_user_profiles(user_id)
+    await MerchantCategoryCacheService.delete_user_cache(user_id)
+    await DataVersionService.bump(user_id)
     
     total_deleted = (
         transactions_result.deleted_count +
@@ -169,6 +192,32 @@ async def clear_all_data(user_id: str = Depends(get_current_user_id)):
     }
 
 
+@router.post("/rebuild-rollups")
+async def rebuild_rollups(
+    verify_only: bool = False,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Recompute the current user's budget rollups from their line items.
+
+    With verify_only=true nothing is written; the response lists the
+    months and fields where stored rollups drifted from the raw data.
+    """
+    drift = await RollupService.verify(user_id)
+    if verify_only:
+        return {
+            "message": f"Found {len(drift)} drifted rollup field(s)",
+            "drift": drift,
+        }
+
+    rebuilt = await RollupService.rebuild(user_id)
+    return {
+        "message": f"Rebuilt {rebuilt} monthly rollup(s), repaired {len(drift)} drifted field(s)",
+        "rebuilt": rebuilt,
+        "drift": drift,
+    }
+
+
 @router.post("/migrate-category-icons")
 async def migrate_category_icons(user_id: str = Depends(get_current_user_id)):
     """
@@ -225,6 +274,9 @@ async def migrate_category_icons(user_id: str = Depends(get_current_user_id)):
         else:
             skipped += 1
 
+    if updated:
+        await DataVersionService.bump(user_id)
+
     result = {
         "message": f"Migration complete: {updated} updated, {skipped} skipped",
         "updated": updated,
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, UploadFile, File
-from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Header, UploadFile, File
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Optional, Union
 from app.ai.agent import AIAgent
-from app.ai.schemas import AIChatRequest, AIChatResponse, AIChatMessage
+from app.ai.csv_import import process_csv_upload
+from app.ai.schemas import AIChatRequest, AIChatResponse, AIChatMessage, AIConfirmRequest
 from app.ai.tools import execute_save_budget_entries
+from app.services.import_job_service import ImportJobService
+import json
 import logging
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
@@ -80,18 +84,97 @@ async def chat(
         )
 
 
+def _sse(event: Dict[str, Any]) -> str:
+    """Format an agent event as a server-sent event."""
+    payload = {key: value for key, value in event.items() if key != "type"}
+    if "response" in payload:
+        payload = payload["response"].model_dump(mode="json")
+    elif "pending_action" in payload:
+        payload = payload["pending_action"].model_dump(mode="json")
+    return f"event: {event['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: AIChatRequest,
+    user_id: str = Depends(get_optional_user_id)
+):
+    """
+    Chat with AI assistant, streamed as server-sent events.
+
+    Runs the same loop as /chat and emits, as they happen:
+    - `token`: `{"content"}`, a piece of assistant text
+    - `tool_call_start`: `{"id", "name", "arguments"}`
+    - `tool_call_end`: `{"id", "name", "ok"}`
+    - `pending_action`: the proposal awaiting confirmation
+    - `done`: the same body /chat returns; its message is the final answer
+    - `error`: `{"detail"}`, after which the stream ends
+    """
+    logger.info(f"AI chat stream request from user {user_id}")
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in ai_agent.stream_request(request, user_id):
+                yield _sse(event)
+        except Exception as e:
+            logger.error(f"Error streaming AI chat request: {e}", exc_info=True)
+            yield _sse({"type": "error", "detail": f"Error processing AI chat request: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/confirm", response_model=AIChatResponse)
 async def confirm_action(
-    entries: list[dict],
+    body: Union[AIConfirmRequest, list[dict]] = Body(...),
     user_id: str = Depends(get_optional_user_id)
 ):
     """
     Confirm and execute a pending action (save budget entries).
-    The frontend sends the proposed entries that the user approved.
+
+    The frontend sends the pending action's preview_id plus overrides for
+    the entries the user changed; the entries are read from the stored
+    proposal. Posting the approved entries as a list is still accepted.
     """
     try:
+        preview_id = None
+        if isinstance(body, AIConfirmRequest):
+            preview_id = body.preview_id
+            try:
+                entries = await ImportJobService.claim_preview(
+                    user_id,
+                    preview_id,
+                    "ai_proposal",
+                    [override.model_dump() for override in body.overrides],
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if entries is None:
+                raise HTTPException(status_code=404, detail="Proposal not found")
+        else:
+            entries = body
+
         logger.info(f"Confirming {len(entries)} entries for user {user_id}")
         result = await execute_save_budget_entries(user_id, entries)
+        if preview_id:
+            if result.get("ok"):
+                await ImportJobService.complete_preview(user_id, preview_id, {
+                    "saved_count": result["data"]["saved_count"],
+                    "error_count": result["data"]["error_count"],
+                    "skipped_count": result["data"]["skipped_count"],
+                })
+            elif result.get("saved_count"):
+                # Some entries were written; confirming again would save them twice
+                await ImportJobService.complete_preview(user_id, preview_id, {
+                    "saved_count": result["saved_count"],
+                    "error": result.get("error"),
+                })
+            else:
+                await ImportJobService.release_preview(user_id, preview_id)
 
         if result.get("ok"):
             saved_count = result["data"]["saved_count"]
@@ -100,6 +183,9 @@ async def confirm_action(
             for item in saved_items:
                 lines.append(f"  ✅ {item['name']} — {item['amount']:,.0f} kr. ({item['category_name']})")
             detail = "\n".join(lines)
+            skipped_count = result["data"].get("skipped_count", 0)
+            if skipped_count:
+                detail += f"\n\n{skipped_count} entries were already in your budget from an earlier import and were skipped."
 
             return AIChatResponse(
                 message=AIChatMessage(
@@ -108,6 +194,17 @@ async def confirm_action(
                 ),
                 tool_calls=[{"name": "save_budget_entries", "arguments": {"count": saved_count}, "id": "confirmation"}],
             )
+        elif result.get("saved_count"):
+            return AIChatResponse(
+                message=AIChatMessage(
+                    role="assistant",
+                    content=(
+                        f"I saved {result['saved_count']} of the entries before an error stopped me: "
+                        f"{result.get('error', 'Unknown error')}. Please check your budget before adding the rest."
+                    ),
+                ),
+                tool_calls=[{"name": "save_budget_entries", "arguments": {"count": result["saved_count"]}, "id": "confirmation"}],
+            )
         else:
             return AIChatResponse(
                 message=AIChatMessage(
@@ -116,6 +213,8 @@ async def confirm_action(
                 ),
                 tool_calls=[],
             )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error confirming action: {e}", exc_info=True)
         raise HTTPException(
@@ -130,8 +229,9 @@ async def upload_csv(
     user_id: str = Depends(get_optional_user_id)
 ):
     """
-    Upload a CSV bank statement file. The AI will parse it,
-    categorize the transactions, and propose budget entries for confirmation.
+    Upload a CSV bank statement file. It is parsed and matched against the
+    user's history, the AI categorizes the remaining merchants, and the
+    entries are proposed for confirmation.
     """
     try:
         logger.info(f"CSV upload from user {user_id}: {file.filename}")
@@ -143,25 +243,12 @@ async def upload_csv(
         if not csv_text.strip():
             raise HTTPException(status_code=400, detail="Empty CSV file")
 
-        # Determine the current month for the prompt
-        from datetime import datetime
-        current_month = datetime.now().strftime("%Y-%m")
-
-        # Create a chat request that includes the CSV data
-        # The AI agent will use parse_csv_data + get_user_categories + propose_budget_entries
-        csv_message = (
-            f"I've uploaded a CSV bank statement. Please parse it, categorize each transaction "
-            f"into my existing budget categories, and propose budget entries for {current_month}.\n\n"
-            f"Here is the CSV data:\n```\n{csv_text}\n```"
-        )
-
-        request = AIChatRequest(
-            messages=[
-                AIChatMessage(role="user", content=csv_message),
-            ],
-        )
-
-        response = await ai_agent.process_request(request, user_id)
+        # Parsed and matched against history here; only merchants without a
+        # confident match are sent to the model
+        try:
+            response = await process_csv_upload(ai_agent.client, user_id, csv_text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         return response
 
     except HTTPException:
@@ -13,6 +13,7 @@ from app.security import (
     UserRegister,
     Token
 )
+from app.ai.agent import invalidate_user_names
 from app.services.default_categories import seed_default_categories
 import logging
 
@@ -177,6 +178,7 @@ async def update_user_me(user_update: UserUpdate, email: str = Depends(get_curre
     )
     
     updated_user = await db["users"].find_one({"email": email})
+    invalidate_user_names(str(updated_user["_id"]))
     return {
         "id": str(updated_user["_id"]),
         "email": updated_user["email"],
@@ -2,7 +2,8 @@
 API routes for budget line item operations.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Annotated, Union, List, Optional
 
 from app.models import (
@@ -18,6 +19,9 @@ from app.dependencies import get_current_user_id
 
 router = APIRouter(prefix="/api/budget-line-items", tags=["budget-line-items"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 @router.post("/", response_model=BudgetLineItemResponse, status_code=201)
 async def create_line_item(
@@ -59,22 +63,66 @@ async def save_budget_draft(
 
 @router.get("/", response_model=Union[List[BudgetLineItemResponse], List[BudgetLineItemWithCategory]])
 async def get_line_items(
+    response: Response,
     user_id: Annotated[str, Depends(get_current_user_id)],
     budget_id: Optional[str] = Query(None, description="Filter by budget ID"),
-    include_category: bool = Query(False, description="Include populated category details")
+    include_category: bool = Query(False, description="Include populated category details"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size for cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$", description="json or ndjson"),
 ):
     """
-    Get all line items for the logged-in user.
+    Get all line items for the logged-in user, newest first.
 
     Optional filters:
     - budget_id: Filter line items by budget
     - include_category: Populate category details
+
+    Pagination (opt-in):
+    - limit: Return at most this many items; the cursor for the next page
+      is sent in the X-Next-Cursor header, which is absent on the last page
+    - after: Continue after the cursor from the previous page
+
+    Streaming (opt-in):
+    - format=ndjson: Stream items as newline-delimited JSON as they are read
+      from the database. Honors after; ignores limit.
     """
-    return await BudgetLineItemService.get_line_items(
-        user_id=user_id,
-        budget_id=budget_id,
-        include_category=include_category
-    )
+    try:
+        if response_format == "ndjson":
+            # Decode the cursor before streaming starts so errors are still a 400
+            if after:
+                BudgetLineItemService.decode_cursor(after)
+            items = BudgetLineItemService.stream_line_items(
+                user_id=user_id,
+                budget_id=budget_id,
+                after=after,
+                include_category=include_category,
+            )
+            return StreamingResponse(
+                (item.model_dump_json() + "\n" async for item in items),
+                media_type="application/x-ndjson",
+            )
+
+        if limit is None and after is None:
+            return await BudgetLineItemService.get_line_items(
+                user_id=user_id,
+                budget_id=budget_id,
+                include_category=include_category
+            )
+
+        items, next_cursor = await BudgetLineItemService.get_line_items_page(
+            user_id=user_id,
+            limit=limit or DEFAULT_PAGE_SIZE,
+            budget_id=budget_id,
+            after=after,
+            include_category=include_category,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 @router.get("/{line_item_id}", response_model=Union[BudgetLineItemResponse, BudgetLineItemWithCategory])
@@ -7,7 +7,7 @@ from app.models import (
     InitializeBudgetMonthRequest,
     InitializeBudgetMonthResponse,
 )
-from app.dependencies import get_current_user_id
+from app.dependencies import check_etag, get_current_user_id
 from app.services.budget_service import BudgetService
 
 router = APIRouter(prefix="/api/budgets", tags=["budgets"])
@@ -38,7 +38,7 @@ async def create_budget(
         )
 
 
-@router.get("/", response_model=List[BudgetResponse])
+@router.get("/", response_model=List[BudgetResponse], dependencies=[Depends(check_etag)])
 async def get_budgets(
     user_id: str = Depends(get_current_user_id)
 ):
@@ -51,7 +51,7 @@ async def get_budgets(
     return budgets
 
 
-@router.get("/{budget_id}", response_model=BudgetResponse)
+@router.get("/{budget_id}", response_model=BudgetResponse, dependencies=[Depends(check_etag)])
 async def get_budget(
     budget_id: str,
     user_id: str = Depends(get_current_user_id)
@@ -75,7 +75,7 @@ async def get_budget(
     return budget
 
 
-@router.get("/by-month/{month}", response_model=BudgetResponse)
+@router.get("/by-month/{month}", response_model=BudgetResponse, dependencies=[Depends(check_etag)])
 async def get_budget_by_month(
     month: str,
     user_id: str = Depends(get_current_user_id)
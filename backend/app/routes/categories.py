@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional
 from app.models import CategoryCreate, CategoryUpdate, CategoryResponse
-from app.dependencies import get_current_user_id
+from app.dependencies import check_etag, get_current_user_id
 from app.services.category_service import CategoryService
 from app.services.default_categories import seed_default_categories, DEFAULT_CATEGORIES
 
@@ -36,7 +36,7 @@ async def create_category(
         )
 
 
-@router.get("/", response_model=List[CategoryResponse])
+@router.get("/", response_model=List[CategoryResponse], dependencies=[Depends(check_etag)])
 async def get_categories(
     user_id: str = Depends(get_current_user_id),
     type: Optional[str] = Query(None, description="Filter by category type (income or expense)")
@@ -52,7 +52,7 @@ async def get_categories(
     return categories
 
 
-@router.get("/{category_id}", response_model=CategoryResponse)
+@router.get("/{category_id}", response_model=CategoryResponse, dependencies=[Depends(check_etag)])
 async def get_category(
     category_id: str,
     user_id: str = Depends(get_current_user_id)
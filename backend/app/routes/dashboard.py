@@ -1,228 +1,125 @@
-from fastapi import APIRouter, Depends, Query
-from typing import List, Optional
-from app.models import DashboardStats, BalanceTrend, ExpenseBreakdown
-from app.database import transactions_collection, goals_collection, budget_line_items_collection, categories_collection, budgets_collection
-from app.dependencies import get_current_user_id
-from datetime import datetime, timedelta
-from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, List, Optional
+from app.models import DashboardStats, BalanceTrend, ExpenseBreakdown, DashboardOverview, DashboardRange
+from app.dependencies import check_etag, get_current_user_id
+from app.services.dashboard_service import DashboardService
+from datetime import datetime
 
 router = APIRouter()
 
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
 
-@router.get("/stats", response_model=DashboardStats)
+# Longest window /range serves in one request
+MAX_RANGE_MONTHS = 60
+
+
+def _build_stats(totals: Dict[str, Dict[str, float]], goals_achieved: int) -> DashboardStats:
+    """Turn a month's and the previous month's totals into the dashboard stat cards."""
+    current = totals["current"]
+    previous = totals["previous"]
+
+    # NET INCOME = Total Income - Total Expenses
+    net_income = current["total_income"] - current["total_expenses"]
+    previous_net_income = previous["total_income"] - previous["total_expenses"]
+
+    # Changes are percentages against the previous month
+    return DashboardStats(
+        net_income=net_income,
+        savings=current["total_savings"],
+        expenses=current["total_expenses"],
+        goals_achieved=goals_achieved,
+        income_change=DashboardService._percent_change(net_income, previous_net_income),
+        savings_change=DashboardService._percent_change(
+            current["total_savings"], previous["total_savings"]
+        ),
+        expenses_change=DashboardService._percent_change(
+            current["total_expenses"], previous["total_expenses"]
+        ),
+    )
+
+
+def _build_trends(rows: List[dict]) -> List[BalanceTrend]:
+    """Format balance trend rows for the chart."""
+    # Format month for chart (e.g. "Jan. 2026")
+    return [
+        BalanceTrend(
+            month=datetime.strptime(row["month"], "%Y-%m").strftime("%b. %Y"),
+            personal=row["fun"],  # Mapped to Green line
+            shared=row["shared"],  # Mapped to Blue line
+        )
+        for row in rows
+    ]
+
+
+def _check_range(from_month: Optional[str], to_month: Optional[str]) -> None:
+    """Reject a trend window whose start is after its end."""
+    if from_month and to_month and from_month > to_month:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+
+@router.get("/stats", response_model=DashboardStats, dependencies=[Depends(check_etag)])
 async def get_dashboard_stats(
     user_id: str = Depends(get_current_user_id),
     month: Optional[str] = Query(None, description="Month in YYYY-MM format. Defaults to current month.")
 ):
-    """Get dashboard statistics - calculates from a specific budget month"""
+    """
+    Get dashboard statistics - calculates from a specific budget month.
+
+    Issues a constant number of queries: one read of the month's and the
+    previous month's rollups (for the *_change fields), one aggregation over
+    the user's rollups for lifetime savings and one read of the user's goals.
+    """
     # Use provided month or default to current month
     month_str = month if month else datetime.now().strftime("%Y-%m")
-    
-    # Try to find budget for the specified month
-    budget = await budgets_collection.find_one({
-        "month": month_str,
-        "user_id": user_id
-    })
-    
-    total_income = 0
-    total_expenses = 0
-    total_savings = 0
-    
-    # Only calculate stats if budget exists for this month
-    if budget:
-        budget_id = budget["_id"]
-        
-        # Get budget line items for THIS budget only
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
-            
-            if category:
-                category_type = category.get("type")
-                amount = item.get("amount", 0)
-                owner_slot = item.get("owner_slot", "")
-                
-                if category_type == "income":
-                    total_income += amount
-                elif category_type == "expense":
-                    # Sum of Shared Expenses and Personal Expenses
-                    if owner_slot in ["shared", "user1", "user2"]:
-                        total_expenses += amount
-                elif category_type == "savings":
-                    # Only include Shared Savings
-                    if owner_slot == "shared":
-                        total_savings += amount
-                elif category_type == "fun":
-                    # Include all Fun
-                    total_savings += amount
-    
-    # NET INCOME = Total Income - Total Expenses
-    net_income = total_income - total_expenses
-    
+
+    # Sums by category type and owner slot for this month and the one
+    # before, maintained in budget_rollups. Months without a budget report zero.
+    totals = await DashboardService.get_month_totals(user_id, month_str)
+
     # Calculate lifetime shared savings for goal achievement calculation
-    pipeline = [
-        # 1. Match budgets for this user
-        {"$match": {"user_id": user_id}},
-        # 2. Lookup line items
-        {
-            "$lookup": {
-                "from": "budget_line_items",
-                "localField": "_id",
-                "foreignField": "budget_id",
-                "as": "items"
-            }
-        },
-        # 3. Unwind items
-        {"$unwind": "$items"},
-        # 4. Lookup category for each item
-        {
-            "$lookup": {
-                "from": "categories",
-                "localField": "items.category_id",
-                "foreignField": "_id",
-                "as": "category"
-            }
-        },
-        # 5. Unwind category (should be 1:1)
-        {"$unwind": "$category"},
-        # 6. Sum amounts based on type
-        {
-            "$group": {
-                "_id": None,
-                "total_shared_savings": {
-                    "$sum": {
-                        "$cond": [
-                            {"$and": [
-                                {"$eq": ["$category.type", "savings"]},
-                                {"$eq": ["$items.owner_slot", "shared"]}
-                            ]},
-                            "$items.amount",
-                            0
-                        ]
-                    }
-                },
-                "total_fun_savings": {
-                     "$sum": {
-                        "$cond": [
-                            {"$eq": ["$category.type", "fun"]},
-                            "$items.amount",
-                            0
-                        ]
-                    }
-                }
-            }
-        }
-    ]
-    
-    aggregation_result = await budgets_collection.aggregate(pipeline).to_list(length=1)
-    lifetime_shared_savings = aggregation_result[0]["total_shared_savings"] if aggregation_result else 0.0
-    lifetime_fun_savings = aggregation_result[0]["total_fun_savings"] if aggregation_result else 0.0
-    
+    lifetime = await DashboardService.get_lifetime_savings(user_id)
+
     # Calculate achieved goals based on hierarchy
-    goals_achieved_count = 0
-    remaining_shared = lifetime_shared_savings
-    remaining_fun = lifetime_fun_savings
-    
-    # Get all goals sorted by priority
-    cursor = goals_collection.find({"user_id": user_id}).sort("priority", 1)
-    async for goal in cursor:
-        target = goal.get("target_amount", 0)
-        goal_type = goal.get("type", "shared")
-        
-        # Select correct wallet
-        if goal_type == "shared":
-            remaining = remaining_shared
-        else: # fun
-            remaining = remaining_fun
-            
-        if target <= 0:
-            goals_achieved_count += 1
-            continue
-            
-        amount_for_goal = min(remaining, target)
-        
-        if amount_for_goal >= target:
-            goals_achieved_count += 1
-            
-        # Deduct used savings
-        if goal_type == "shared":
-             remaining_shared = max(0, remaining_shared - amount_for_goal)
-        else:
-             remaining_fun = max(0, remaining_fun - amount_for_goal)
-            
-    goals_achieved = goals_achieved_count
-    
-    return DashboardStats(
-        net_income=net_income,
-        savings=total_savings,
-        expenses=total_expenses,
-        goals_achieved=goals_achieved,
-        income_change=0.0,
-        savings_change=0.0,
-        expenses_change=0.0
+    goals_achieved = await DashboardService.count_achieved_goals(
+        user_id,
+        lifetime["shared"],
+        lifetime["fun"],
     )
 
+    return _build_stats(totals, goals_achieved)
 
-@router.get("/balance-trends", response_model=List[BalanceTrend])
-async def get_balance_trends(user_id: str = Depends(get_current_user_id)):
+
+@router.get("/balance-trends", response_model=List[BalanceTrend], dependencies=[Depends(check_etag)])
+async def get_balance_trends(
+    user_id: str = Depends(get_current_user_id),
+    from_month: Optional[str] = Query(
+        None,
+        alias="from",
+        pattern=MONTH_PATTERN,
+        description="First month to include (YYYY-MM). Defaults to the first budget."
+    ),
+    to_month: Optional[str] = Query(
+        None,
+        alias="to",
+        pattern=MONTH_PATTERN,
+        description="Last month to include (YYYY-MM). Defaults to the last budget."
+    ),
+):
     """
     Get balance trends for chart (Lifetime Savings).
     - Shared (Blue): Cumulative 'savings' type with 'shared' slot
     - Personal (Green): Cumulative 'fun' type
+
+    Totals are cumulative over the user's whole history even when a
+    from/to window is requested.
     """
-    trends = []
-    
-    # 1. Get all budgets for the user, sorted by date ascending
-    cursor = budgets_collection.find({"user_id": user_id}).sort("month", 1)
-    budgets = await cursor.to_list(length=None)
-    
-    cumulative_shared = 0.0
-    cumulative_fun = 0.0
-    
-    for budget in budgets:
-        budget_id = budget["_id"]
-        month_str = budget["month"] # "YYYY-MM"
-        
-        # Format month for chart (e.g. "Jan. 2026")
-        dt = datetime.strptime(month_str, "%Y-%m")
-        display_month = dt.strftime("%b. %Y")
-        
-        monthly_shared = 0.0
-        monthly_fun = 0.0
-        
-        # 2. Get line items for this budget
-        async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-            category = await categories_collection.find_one({"_id": item["category_id"]})
-            if not category:
-                continue
-                
-            cat_type = category.get("type")
-            amount = item.get("amount", 0)
-            slot = item.get("owner_slot", "")
-            
-            if cat_type == "savings" and slot == "shared":
-                monthly_shared += amount
-            elif cat_type == "fun":
-                # Assuming all 'fun' is counted as the "Green Line" per requirements
-                monthly_fun += amount
-                
-        cumulative_shared += monthly_shared
-        cumulative_fun += monthly_fun
-        
-        trends.append(BalanceTrend(
-            month=display_month,
-            personal=cumulative_fun, # Mapped to Green line
-            shared=cumulative_shared # Mapped to Blue line
-        ))
-    
-    # If no data, return empty or sample? Let's return empty if no budgets.
-    if not trends:
-        # Fallback to empty list so chart shows empty state instead of potentially confusing dummy data
-        return []
-        
-    return trends
-
-
-@router.get("/expense-breakdown", response_model=List[ExpenseBreakdown])
+    _check_range(from_month, to_month)
+
+    rows = await DashboardService.get_balance_trends(user_id, from_month, to_month)
+    return _build_trends(rows)
+
+
+@router.get("/expense-breakdown", response_model=List[ExpenseBreakdown], dependencies=[Depends(check_etag)])
 async def get_expense_breakdown(
     user_id: str = Depends(get_current_user_id),
     month: Optional[str] = Query(None, description="Month in YYYY-MM format. Defaults to current month.")
@@ -232,58 +129,66 @@ async def get_expense_breakdown(
     Only includes items where category type is 'expense' (Shared + Personal).
     """
     month_str = month if month else datetime.now().strftime("%Y-%m")
-    
-    # Try to find budget for the specified month
-    budget = await budgets_collection.find_one({
-        "month": month_str,
-        "user_id": user_id
-    })
-    
-    if not budget:
-        return []
-        
-    budget_id = budget["_id"]
-    category_totals: dict = {}
-    category_meta: dict = {}
-    total_expenses = 0
-    
-    # Get budget line items
-    async for item in budget_line_items_collection.find({"budget_id": budget_id}):
-        category = await categories_collection.find_one({"_id": item["category_id"]})
-        if not category:
-            continue
-            
-        # Filter for Expense type
-        if category.get("type") != "expense":
-            continue
-            
-        # Includes Shared and Personal (user1/user2)
-        # Note: If we wanted to restrict personal to ONLY the current user slot, we might need more logic
-        # But request says "categories from shared expenses and personal expenses" which usually implies all expenses in the budget.
-        
-        amount = item.get("amount", 0)
-        cat_name = category.get("name", "Unknown")
-        
-        category_totals[cat_name] = category_totals.get(cat_name, 0) + amount
-        # Store icon and color from the category document
-        if cat_name not in category_meta:
-            category_meta[cat_name] = {
-                "icon": category.get("icon", ""),
-                "color": category.get("color", ""),
-            }
-        total_expenses += amount
-    
-    # Calculate percentages
-    breakdown = []
-    for category_name, amount in category_totals.items():
-        percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
-        meta = category_meta.get(category_name, {})
-        breakdown.append(ExpenseBreakdown(
-            category=category_name,
-            amount=amount,
-            percentage=round(percentage, 1),
-            icon=meta.get("icon", ""),
-            color=meta.get("color", ""),
-        ))
-    
-    return sorted(breakdown, key=lambda x: x.amount, reverse=True)
+
+    breakdown = await DashboardService.get_expense_breakdown(user_id, month_str)
+    return [ExpenseBreakdown(**row) for row in breakdown]
+
+
+@router.get("/overview", response_model=DashboardOverview, dependencies=[Depends(check_etag)])
+async def get_dashboard_overview(
+    user_id: str = Depends(get_current_user_id),
+    month: Optional[str] = Query(None, description="Month in YYYY-MM format. Defaults to current month."),
+    from_month: Optional[str] = Query(
+        None,
+        alias="from",
+        pattern=MONTH_PATTERN,
+        description="First balance trend month (YYYY-MM). Defaults to the first budget."
+    ),
+    to_month: Optional[str] = Query(
+        None,
+        alias="to",
+        pattern=MONTH_PATTERN,
+        description="Last balance trend month (YYYY-MM). Defaults to the last budget."
+    ),
+):
+    """
+    Get stats, balance trends and expense breakdown for the dashboard page.
+
+    Equivalent to calling /stats, /balance-trends and /expense-breakdown, but
+    the month's rollup and the category map are read once and shared, and the
+    independent queries run concurrently.
+    """
+    _check_range(from_month, to_month)
+    month_str = month if month else datetime.now().strftime("%Y-%m")
+
+    overview = await DashboardService.get_overview(user_id, month_str, from_month, to_month)
+
+    return DashboardOverview(
+        stats=_build_stats(overview["totals"], overview["goals_achieved"]),
+        balance_trends=_build_trends(overview["balance_trends"]),
+        expense_breakdown=[ExpenseBreakdown(**row) for row in overview["expense_breakdown"]],
+    )
+
+
+@router.get("/range", response_model=DashboardRange, dependencies=[Depends(check_etag)])
+async def get_dashboard_range(
+    user_id: str = Depends(get_current_user_id),
+    from_month: str = Query(..., alias="from", pattern=MONTH_PATTERN, description="First month (YYYY-MM)"),
+    to_month: str = Query(..., alias="to", pattern=MONTH_PATTERN, description="Last month (YYYY-MM)"),
+):
+    """
+    Get per-month income/expense/savings/fun totals and per-category series
+    for a range of months, e.g. a year view.
+
+    Every month in the range is returned, with zeros for months without a
+    budget. Category series list one amount per month in the same order.
+    """
+    _check_range(from_month, to_month)
+    span = (int(to_month[:4]) - int(from_month[:4])) * 12 + int(to_month[5:]) - int(from_month[5:]) + 1
+    if span > MAX_RANGE_MONTHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must not exceed {MAX_RANGE_MONTHS} months"
+        )
+
+    return await DashboardService.get_range(user_id, from_month, to_month)
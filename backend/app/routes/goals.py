@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
 from pydantic import BaseModel
 from app.database import goals_collection
-from app.dependencies import get_current_user_id
+from app.dependencies import check_etag, get_current_user_id
+from app.services.data_version_service import DataVersionService
 from datetime import datetime, timezone
 import uuid
 from pymongo import UpdateOne
@@ -87,6 +88,7 @@ async def create_goal(goal: GoalCreate, user_id: str = Depends(get_current_user_
     }
     
     result = await goals_collection.insert_one(new_goal)
+    await DataVersionService.bump(user_id)
     created_goal = await goals_collection.find_one({"_id": result.inserted_id})
     
     if not created_goal:
@@ -106,7 +108,7 @@ async def create_goal(goal: GoalCreate, user_id: str = Depends(get_current_user_
         created_at=created_goal["created_at"]
     )
 
-@router.get("", response_model=List[GoalResponse])
+@router.get("", response_model=List[GoalResponse], dependencies=[Depends(check_etag)])
 async def get_goals(user_id: str = Depends(get_current_user_id)):
     """Get all goals for the logged-in user."""
     goals = []
@@ -143,6 +145,7 @@ async def reorder_goals(reorder_data: GoalReorder, user_id: str = Depends(get_cu
     
     if operations:
         await goals_collection.bulk_write(operations)
+        await DataVersionService.bump(user_id)
 
 @router.put("/{goal_id}", response_model=GoalResponse)
 async def update_goal(goal_id: str, goal: GoalUpdate, user_id: str = Depends(get_current_user_id)):
@@ -176,6 +179,7 @@ async def update_goal(goal_id: str, goal: GoalUpdate, user_id: str = Depends(get
     
     if not updated_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
+    await DataVersionService.bump(user_id)
         
     return GoalResponse(
         id=updated_goal["_id"],
@@ -199,5 +203,6 @@ async def delete_goal(goal_id: str, user_id: str = Depends(get_current_user_id))
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Goal not found")
+    await DataVersionService.bump(user_id)
     
     return None
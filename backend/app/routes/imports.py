@@ -1,14 +1,45 @@
 """
 Import routes — CSV bank statement upload, preview, and budget reconciliation.
 """
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
+import tempfile
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status, Depends, UploadFile, File
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Dict, List, Optional, Literal
 from app.dependencies import get_current_user_id
+from app.services.bank_profile_service import BankProfileService
+from app.services.import_job_service import ImportJobService
 from app.services.import_service import ImportService
 
 router = APIRouter(prefix="/api/import", tags=["import"])
 
+# Bytes read from an uploaded file at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Job uploads are kept in memory up to this size, then spooled to disk
+UPLOAD_SPOOL_SIZE = 1024 * 1024
+
+
+async def _read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read an upload in fixed-size chunks instead of all at once."""
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _read_spooled(spool: tempfile.SpooledTemporaryFile) -> AsyncIterator[bytes]:
+    """Read a spooled upload back in fixed-size chunks, off the event loop."""
+    while chunk := await run_in_threadpool(spool.read, UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _run_spooled_job(job_id: str, user_id: str, spool: tempfile.SpooledTemporaryFile) -> None:
+    """Run an import job over a spooled upload, deleting the spool when done."""
+    try:
+        await ImportJobService.run_job(job_id, user_id, _read_spooled(spool))
+    finally:
+        spool.close()
+
 
 # ---------- Request / Response schemas ----------
 
@@ -26,6 +57,8 @@ class ParsedRow(BaseModel):
     suggestion_basis: Optional[str] = None
     matched_terms: List[str] = Field(default_factory=list)
     matched_example: Optional[str] = None
+    fingerprint: Optional[str] = None
+    already_imported: bool = False
 
 
 class UploadResponse(BaseModel):
@@ -33,6 +66,9 @@ class UploadResponse(BaseModel):
     count: int
     header: List[str]
     delimiter: str
+    columns: Dict[str, Optional[int]] = Field(default_factory=dict)
+    profile: Optional[str] = None
+    preview_id: Optional[str] = None
 
 
 class CategoryOption(BaseModel):
@@ -48,20 +84,85 @@ class ConfirmEntry(BaseModel):
     category_id: str
     amount: float = Field(..., ge=0)
     owner_slot: Literal["user1", "user2", "shared"] = "user1"
+    fingerprint: Optional[str] = Field(None, max_length=64)
+
+
+class RowOverride(BaseModel):
+    """A change to one stored preview row, by its index in the upload response."""
+    index: int = Field(..., ge=0)
+    category_id: Optional[str] = None
+    owner_slot: Optional[Literal["user1", "user2", "shared"]] = None
+    include: Optional[bool] = None
 
 
 class ConfirmRequest(BaseModel):
+    """Either a preview_id with sparse overrides, or every entry in full."""
     month: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$")
-    entries: List[ConfirmEntry]
+    entries: List[ConfirmEntry] = Field(default_factory=list)
+    preview_id: Optional[str] = None
+    overrides: List[RowOverride] = Field(default_factory=list)
 
 
 class ConfirmResponse(BaseModel):
     saved_count: int
     error_count: int
+    skipped_count: int = 0
     saved: List[dict]
     errors: List[str]
 
 
+class ImportJobResponse(BaseModel):
+    """State of a background import job, with an optional page of rows."""
+    id: str
+    status: Literal["processing", "ready", "failed", "confirming", "confirmed"]
+    filename: Optional[str] = None
+    header: List[str] = Field(default_factory=list)
+    delimiter: Optional[str] = None
+    columns: Dict[str, Optional[int]] = Field(default_factory=dict)
+    profile: Optional[str] = None
+    processed_rows: int = 0
+    error: Optional[str] = None
+    result: Optional[dict] = None
+    rows: List[ParsedRow] = Field(default_factory=list)
+    created_at: datetime
+    updated_at: datetime
+    expires_at: datetime
+
+
+class ProfileColumns(BaseModel):
+    date: int = Field(..., ge=0)
+    description: int = Field(..., ge=0)
+    amount: int = Field(..., ge=0)
+
+
+class BankProfileCreate(BaseModel):
+    """A confirmed column mapping for a bank's CSV header."""
+    name: Optional[str] = Field(None, max_length=100)
+    header: List[str] = Field(..., min_length=1)
+    delimiter: Literal[";", ",", "\t"]
+    columns: ProfileColumns
+    date_format: Optional[str] = Field(None, max_length=40, description="strptime format, e.g. %d.%m.%Y")
+    amount_locale: Literal["da", "en"] = "da"
+
+
+class BankProfileResponse(BaseModel):
+    id: str
+    scope: Literal["user", "global"]
+    name: Optional[str] = None
+    signature: str
+    header: List[str]
+    delimiter: str
+    columns: ProfileColumns
+    date_format: Optional[str] = None
+    amount_locale: str
+    updated_at: datetime
+
+
+class ConfirmJobRequest(BaseModel):
+    month: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$")
+    overrides: List[RowOverride] = Field(default_factory=list)
+
+
 # ---------- Endpoints ----------
 
 @router.post("/upload", response_model=UploadResponse)
@@ -72,6 +173,9 @@ async def upload_csv(
     """
     Upload a CSV bank statement file.
     Returns parsed rows with auto-detected columns.
+
+    The file is read, decoded and parsed in chunks, so only the parsed
+    rows are held in memory rather than several copies of the raw file.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
@@ -81,16 +185,29 @@ async def upload_csv(
         raise HTTPException(status_code=400, detail="Only .csv files are accepted")
 
     try:
-        content = await file.read()
-        # Try UTF-8 first, fall back to latin-1 (common for Danish bank exports)
-        try:
-            csv_text = content.decode("utf-8")
-        except UnicodeDecodeError:
-            csv_text = content.decode("latin-1")
-
-        result = ImportService.parse_csv(csv_text)
-        result["rows"] = await ImportService.apply_historical_suggestions(user_id, result["rows"])
-        return result
+        parsed = await ImportService.parse_csv_stream(
+            ImportService.decode_chunks(_read_chunks(file)), user_id
+        )
+        rows = await ImportService.apply_historical_suggestions(user_id, parsed["rows"])
+        await ImportService.flag_imported_rows(user_id, rows)
+        preview_id = await ImportJobService.store_preview(
+            user_id,
+            rows,
+            filename=file.filename,
+            header=parsed["header"],
+            delimiter=parsed["delimiter"],
+            columns=parsed["columns"],
+            profile=parsed["profile"],
+        )
+        return {
+            "rows": rows,
+            "count": len(rows),
+            "header": parsed["header"],
+            "delimiter": parsed["delimiter"],
+            "columns": parsed["columns"],
+            "profile": parsed["profile"],
+            "preview_id": preview_id,
+        }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -110,8 +227,18 @@ async def upload_csv_text(
         raise HTTPException(status_code=400, detail="No CSV content provided")
 
     try:
-        result = ImportService.parse_csv(csv_content)
+        profile = await BankProfileService.match(user_id, csv_content.lstrip().split("\n", 1)[0])
+        result = ImportService.parse_csv(csv_content, profile)
         result["rows"] = await ImportService.apply_historical_suggestions(user_id, result["rows"])
+        await ImportService.flag_imported_rows(user_id, result["rows"])
+        result["preview_id"] = await ImportJobService.store_preview(
+            user_id,
+            result["rows"],
+            header=result["header"],
+            delimiter=result["delimiter"],
+            columns=result["columns"],
+            profile=result["profile"],
+        )
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -136,7 +263,16 @@ async def confirm_import(
     """
     Confirm and save mapped entries as budget line items.
     Creates the budget for the target month if it doesn't exist.
+
+    Send the preview_id from the upload response plus overrides for the
+    rows the user changed; the rows themselves are read from the stored
+    preview. Posting every entry in full is still accepted.
     """
+    if body.preview_id:
+        return await confirm_import_job(
+            body.preview_id, ConfirmJobRequest(month=body.month, overrides=body.overrides), user_id
+        )
+
     if not body.entries:
         raise HTTPException(status_code=400, detail="No entries to import")
 
@@ -146,3 +282,115 @@ async def confirm_import(
         entries=[e.model_dump() for e in body.entries],
     )
     return result
+
+
+@router.post("/jobs", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_import_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Upload a CSV bank statement and parse it in the background.
+
+    Returns the job straight away; poll GET /api/import/jobs/{job_id} for
+    progress and rows, then confirm the job once it is ready.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only .csv files are accepted")
+
+    # The request's file is gone by the time the background task runs, so
+    # it is copied to a spool that the job streams from and then deletes
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    try:
+        async for chunk in _read_chunks(file):
+            await run_in_threadpool(spool.write, chunk)
+        await run_in_threadpool(spool.seek, 0)
+        job = await ImportJobService.create_job(user_id, file.filename)
+    except BaseException:
+        spool.close()
+        raise
+    background_tasks.add_task(_run_spooled_job, job["id"], user_id, spool)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Index of the first row to return"),
+    limit: int = Query(0, ge=0, le=5000, description="Rows to return; 0 returns state only"),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Get an import job's progress, with a page of the rows parsed so far."""
+    job = await ImportJobService.get_job(user_id, job_id, offset=offset, limit=limit)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/confirm", response_model=ConfirmResponse)
+async def confirm_import_job(
+    job_id: str,
+    body: ConfirmJobRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Save a finished job's included rows as budget line items.
+    Creates the budget for the target month if it doesn't exist.
+    """
+    try:
+        result = await ImportJobService.confirm_job(
+            user_id, job_id, body.month, [override.model_dump() for override in body.overrides]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return result
+
+
+@router.get("/profiles", response_model=List[BankProfileResponse])
+async def list_bank_profiles(
+    user_id: str = Depends(get_current_user_id),
+):
+    """List the user's saved bank formats followed by the built-in ones."""
+    return await BankProfileService.list_profiles(user_id)
+
+
+@router.post("/profiles", response_model=BankProfileResponse, status_code=status.HTTP_201_CREATED)
+async def save_bank_profile(
+    body: BankProfileCreate,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Remember the correct column mapping for a bank's CSV header.
+
+    Later uploads with the same header and delimiter use this mapping,
+    date format and amount locale instead of guessing. Saving the same
+    header again replaces the earlier mapping.
+    """
+    try:
+        return await BankProfileService.save_user_profile(
+            user_id,
+            header=body.header,
+            delimiter=body.delimiter,
+            columns=body.columns.model_dump(),
+            date_format=body.date_format,
+            amount_locale=body.amount_locale,
+            name=body.name,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/profiles/{profile_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_bank_profile(
+    profile_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Forget one of the user's saved bank formats."""
+    if not await BankProfileService.delete_user_profile(user_id, profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
@@ -0,0 +1,349 @@
+"""
+Bank Profile Service
+Remembers how a bank's CSV export is laid out, so uploads of a known format
+skip the keyword-based column detection in ImportService.
+
+A profile is keyed by a signature: a hash of the header row's fields and the
+delimiter. It pins the column mapping, the date format and the amount locale.
+User profiles (saved when someone corrects a mapping) take precedence over
+global ones (registered for common banks).
+
+Profile shape:
+    {
+        "scope": "user" | "global",
+        "user_id": "..." | None,
+        "signature": "<32 hex chars>",
+        "name": "Nordea",
+        "header": ["Bogføringsdato", "Beløb", ...],
+        "delimiter": ";",
+        "columns": {"date": 0, "description": 5, "amount": 1},
+        "date_format": "%Y/%m/%d" | None,
+        "amount_locale": "da" | "en",
+        "created_at", "updated_at",
+    }
+"""
+import csv
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.database import bank_format_profiles_collection
+
+logger = logging.getLogger(__name__)
+
+# Delimiters a header line is tried with when looking up a profile
+CANDIDATE_DELIMITERS = (";", ",", "\t")
+
+# How long the global profiles are cached in-process
+GLOBAL_CACHE_SECONDS = 300
+
+# Amount parsing per locale: characters dropped or swapped before float()
+AMOUNT_LOCALES = {
+    # 1.234,56 -> 1234.56
+    "da": str.maketrans({".": None, ",": ".", " ": None, "\xa0": None}),
+    # 1,234.56 -> 1234.56
+    "en": str.maketrans({",": None, " ": None, "\xa0": None}),
+}
+# Currency text and anything else that is not part of the number
+AMOUNT_NOISE = re.compile(r"(?i)kr\.|[^0-9.,+\-]")
+
+# Layouts of the Danish bank exports we see most; registered as global profiles
+DANISH_BANK_PROFILES = [
+    {
+        "name": "Danske Bank",
+        "header": ["Dato", "Tekst", "Beløb", "Saldo", "Status", "Afstemt"],
+        "delimiter": ";",
+        "columns": {"date": 0, "description": 1, "amount": 2},
+        "date_format": "%d.%m.%Y",
+        "amount_locale": "da",
+    },
+    {
+        # Keyword detection picks "Modtager" as the description here
+        "name": "Nordea",
+        "header": ["Bogføringsdato", "Beløb", "Afsender", "Modtager", "Navn", "Beskrivelse", "Saldo", "Valuta", "Afstemt"],
+        "delimiter": ";",
+        "columns": {"date": 0, "description": 5, "amount": 1},
+        "date_format": "%Y/%m/%d",
+        "amount_locale": "da",
+    },
+    {
+        "name": "Jyske Bank",
+        "header": ["Dato", "Valør", "Tekst", "Beløb", "Saldo"],
+        "delimiter": ";",
+        "columns": {"date": 0, "description": 2, "amount": 3},
+        "date_format": "%d.%m.%Y",
+        "amount_locale": "da",
+    },
+    {
+        "name": "Sydbank",
+        "header": ["Bogføringsdato", "Rentedato", "Tekst", "Beløb", "Saldo", "Valuta"],
+        "delimiter": ";",
+        "columns": {"date": 0, "description": 2, "amount": 3},
+        "date_format": "%d.%m.%Y",
+        "amount_locale": "da",
+    },
+]
+
+# Global profiles by signature, reloaded every GLOBAL_CACHE_SECONDS
+_global_cache: Dict[str, Any] = {"loaded_at": None, "profiles": {}}
+
+# Compiled layouts by (signature, updated_at), so edits recompile
+_compiled_cache: Dict[tuple, Dict[str, Any]] = {}
+COMPILED_CACHE_SIZE = 1024
+
+
+class BankProfileService:
+    """Service for bank CSV format profiles"""
+
+    @staticmethod
+    def signature(header: List[str], delimiter: str) -> str:
+        """Hash of a header row's fields (trimmed, case-folded) and delimiter."""
+        normalized = "\x1f".join(field.strip().lower() for field in header)
+        return hashlib.sha256(f"{delimiter}\x1e{normalized}".encode("utf-8")).hexdigest()[:32]
+
+    @classmethod
+    async def match(cls, user_id: Optional[str], header_line: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the profile for a CSV header line, compiled for parsing.
+
+        The line is split with every candidate delimiter, so a profile also
+        corrects a wrongly detected delimiter. A user's own profile wins over
+        a global one.
+
+        Args:
+            user_id: The logged-in user's ID, or None for global profiles only
+            header_line: The first record of the CSV
+
+        Returns:
+            Compiled layout (see compile), or None if the format is unknown
+        """
+        signatures = [
+            cls.signature(next(csv.reader([header_line], delimiter=delimiter), []), delimiter)
+            for delimiter in CANDIDATE_DELIMITERS
+        ]
+
+        if user_id:
+            profile = await bank_format_profiles_collection.find_one(
+                {"scope": "user", "user_id": user_id, "signature": {"$in": signatures}}
+            )
+            if profile:
+                return cls.compile(profile)
+
+        global_profiles = await cls._global_profiles()
+        for signature in signatures:
+            if signature in global_profiles:
+                return cls.compile(global_profiles[signature])
+        return None
+
+    @staticmethod
+    def compile(profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn a profile into the layout ImportService parses with.
+
+        Returns:
+            Dict with delimiter, columns, max_col, parse_amount, date_format and name
+        """
+        key = (profile["signature"], profile.get("updated_at"))
+        compiled = _compiled_cache.get(key)
+        if compiled is None:
+            columns = dict(profile["columns"])
+            compiled = {
+                "name": profile.get("name"),
+                "delimiter": profile["delimiter"],
+                "columns": columns,
+                "max_col": max(columns.values()),
+                "parse_amount": BankProfileService.amount_parser(profile["amount_locale"]),
+                "date_format": profile.get("date_format"),
+            }
+            if len(_compiled_cache) >= COMPILED_CACHE_SIZE:
+                _compiled_cache.clear()
+            _compiled_cache[key] = compiled
+        return compiled
+
+    @staticmethod
+    def amount_parser(locale: str) -> Callable[[str], float]:
+        """Return a parser for amounts written in the given locale."""
+        table = AMOUNT_LOCALES[locale]
+
+        def parse_amount(value: str) -> float:
+            try:
+                return float(AMOUNT_NOISE.sub("", value).translate(table))
+            except ValueError:
+                return 0.0
+
+        return parse_amount
+
+    @staticmethod
+    def validate(
+        header: List[str],
+        columns: Dict[str, int],
+        date_format: Optional[str],
+        amount_locale: str,
+    ) -> None:
+        """
+        Check that a profile's mapping fits its header.
+
+        Raises:
+            ValueError: If a column is missing or out of range, the date
+                format does not round-trip or the locale is unknown
+        """
+        for field in ("date", "description", "amount"):
+            index = columns.get(field)
+            if index is None or not 0 <= index < len(header):
+                raise ValueError(f"Column for {field} must be between 0 and {len(header) - 1}")
+        if amount_locale not in AMOUNT_LOCALES:
+            raise ValueError(f"Amount locale must be one of {', '.join(AMOUNT_LOCALES)}")
+        if date_format:
+            sample = datetime(2026, 1, 31)
+            try:
+                parsed = datetime.strptime(sample.strftime(date_format), date_format)
+            except ValueError:
+                parsed = None
+            if parsed is None or parsed.date() != sample.date():
+                raise ValueError(f"Invalid date format '{date_format}'")
+
+    @classmethod
+    async def save_user_profile(
+        cls,
+        user_id: str,
+        header: List[str],
+        delimiter: str,
+        columns: Dict[str, int],
+        date_format: Optional[str] = None,
+        amount_locale: str = "da",
+        name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Remember a user's confirmed mapping for a header, replacing any earlier one.
+
+        Returns:
+            The stored profile
+
+        Raises:
+            ValueError: If the mapping does not fit the header
+        """
+        cls.validate(header, columns, date_format, amount_locale)
+        return await cls._upsert("user", user_id, header, delimiter, columns, date_format, amount_locale, name)
+
+    @classmethod
+    async def register_global_profile(
+        cls,
+        header: List[str],
+        delimiter: str,
+        columns: Dict[str, int],
+        date_format: Optional[str] = None,
+        amount_locale: str = "da",
+        name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Register a bank format for every user.
+
+        Raises:
+            ValueError: If the mapping does not fit the header
+        """
+        cls.validate(header, columns, date_format, amount_locale)
+        profile = await cls._upsert("global", None, header, delimiter, columns, date_format, amount_locale, name)
+        _global_cache["loaded_at"] = None
+        return profile
+
+    @classmethod
+    async def register_default_profiles(cls) -> int:
+        """Register DANISH_BANK_PROFILES as global profiles; returns how many."""
+        for profile in DANISH_BANK_PROFILES:
+            await cls.register_global_profile(**profile)
+        return len(DANISH_BANK_PROFILES)
+
+    @staticmethod
+    async def list_profiles(user_id: str) -> List[Dict[str, Any]]:
+        """Return the user's own profiles followed by the global ones."""
+        cursor = bank_format_profiles_collection.find({
+            "$or": [{"scope": "user", "user_id": user_id}, {"scope": "global"}]
+        }).sort([("scope", -1), ("name", 1)])
+        return [BankProfileService._profile_response(profile) async for profile in cursor]
+
+    @staticmethod
+    async def delete_user_profile(user_id: str, profile_id: str) -> bool:
+        """Delete one of the user's profiles; returns False if not found."""
+        if not ObjectId.is_valid(profile_id):
+            return False
+        result = await bank_format_profiles_collection.delete_one(
+            {"_id": ObjectId(profile_id), "scope": "user", "user_id": user_id}
+        )
+        return result.deleted_count > 0
+
+    @staticmethod
+    async def delete_user_profiles(user_id: str) -> None:
+        """Delete every profile a user saved."""
+        await bank_format_profiles_collection.delete_many({"scope": "user", "user_id": user_id})
+
+    @staticmethod
+    async def _upsert(
+        scope: str,
+        user_id: Optional[str],
+        header: List[str],
+        delimiter: str,
+        columns: Dict[str, int],
+        date_format: Optional[str],
+        amount_locale: str,
+        name: Optional[str],
+    ) -> Dict[str, Any]:
+        signature = BankProfileService.signature(header, delimiter)
+        now = datetime.now(timezone.utc)
+        profile = await bank_format_profiles_collection.find_one_and_update(
+            {"scope": scope, "user_id": user_id, "signature": signature},
+            {
+                "$set": {
+                    "name": name,
+                    "header": [field.strip() for field in header],
+                    "delimiter": delimiter,
+                    "columns": {field: columns[field] for field in ("date", "description", "amount")},
+                    "date_format": date_format or None,
+                    "amount_locale": amount_locale,
+                    "updated_at": now,
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return BankProfileService._profile_response(profile)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop the cached global profiles and compiled layouts."""
+        _global_cache["loaded_at"] = None
+        _compiled_cache.clear()
+
+    @staticmethod
+    async def _global_profiles() -> Dict[str, Dict[str, Any]]:
+        """Global profiles by signature, from the in-process cache."""
+        loaded_at = _global_cache["loaded_at"]
+        if loaded_at is None or time.monotonic() - loaded_at > GLOBAL_CACHE_SECONDS:
+            profiles = {}
+            async for profile in bank_format_profiles_collection.find({"scope": "global"}):
+                profiles[profile["signature"]] = profile
+            _global_cache["profiles"] = profiles
+            _global_cache["loaded_at"] = time.monotonic()
+        return _global_cache["profiles"]
+
+    @staticmethod
+    def _profile_response(profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a profile document to its API shape."""
+        return {
+            "id": str(profile["_id"]),
+            "scope": profile["scope"],
+            "name": profile.get("name"),
+            "signature": profile["signature"],
+            "header": profile["header"],
+            "delimiter": profile["delimiter"],
+            "columns": profile["columns"],
+            "date_format": profile.get("date_format"),
+            "amount_locale": profile["amount_locale"],
+            "updated_at": profile["updated_at"],
+        }
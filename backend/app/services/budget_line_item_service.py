@@ -6,9 +6,18 @@ Handles business logic, validation, and database operations for budget line item
 
 from bson import ObjectId
 from datetime import datetime, timezone
-from typing import Optional, Union, List
+from typing import AsyncIterator, Dict, Optional, Tuple, Union, List
 
-from app.database import budget_line_items_collection, budgets_collection, categories_collection
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.database import (
+    budget_line_items_collection,
+    budgets_collection,
+    categories_collection,
+    client,
+    supports_transactions,
+)
 from app.models import (
     BudgetLineItemCreate,
     BudgetLineItemUpdate,
@@ -22,6 +31,15 @@ from app.models import (
     CategoryResponse,
 )
 from app.services.budget_service import BudgetService
+from app.services.data_version_service import DataVersionService
+from app.services.merchant_index_service import MerchantIndexService
+from app.services.rollup_service import RollupService
+
+# Listing order: newest first, _id breaks ties between equal timestamps
+LIST_SORT = [("created_at", -1), ("_id", -1)]
+
+# Items fetched and converted per round trip when streaming
+STREAM_BATCH_SIZE = 500
 
 
 class BudgetLineItemService:
@@ -79,6 +97,7 @@ class BudgetLineItemService:
             "budget_id": budget_id_obj,
             "name": line_item_data.name,
             "category_id": category_id_obj,
+            "category_type": category.get("type"),
             "amount": line_item_data.amount,
             "owner_slot": line_item_data.owner_slot,
             "created_at": now,
@@ -87,6 +106,13 @@ class BudgetLineItemService:
 
         result = await budget_line_items_collection.insert_one(line_item_doc)
         line_item_doc["_id"] = result.inserted_id
+        await RollupService.apply_changes(
+            user_id,
+            added=[line_item_doc],
+            budget_months={budget_id_obj: budget["month"]},
+        )
+        await MerchantIndexService.apply_changes(user_id, added=[line_item_doc])
+        await DataVersionService.bump(user_id)
 
         # Convert to response model
         return BudgetLineItemResponse(
@@ -119,14 +145,154 @@ class BudgetLineItemService:
             List of line items, optionally with category info
         """
         # Build query
-        query = {"user_id": user_id}
-        if budget_id:
-            query["budget_id"] = ObjectId(budget_id)
+        query = BudgetLineItemService._list_query(user_id, budget_id)
 
         # Fetch line items (sorted by created_at descending)
-        cursor = budget_line_items_collection.find(query).sort("created_at", -1)
+        cursor = budget_line_items_collection.find(query).sort(LIST_SORT)
         line_items = await cursor.to_list(length=None)
 
+        return await BudgetLineItemService._to_list_responses(
+            line_items, user_id, include_category
+        )
+
+    @staticmethod
+    async def get_line_items_page(
+        user_id: str,
+        limit: int,
+        budget_id: Optional[str] = None,
+        after: Optional[str] = None,
+        include_category: bool = False,
+    ) -> Tuple[Union[List[BudgetLineItemResponse], List[BudgetLineItemWithCategory]], Optional[str]]:
+        """
+        Get one page of line items, newest first, using keyset pagination.
+
+        Pages are addressed by the (created_at, _id) of the last item on the
+        previous page rather than an offset, so every page is an index range
+        scan on (user_id, [budget_id,] created_at, _id) no matter how deep.
+
+        Args:
+            user_id: The logged-in User_ID
+            limit: Maximum number of items to return
+            budget_id: Optional budget ID to filter by
+            after: Cursor returned with the previous page
+            include_category: Whether to populate category details
+
+        Returns:
+            Tuple of (items, next cursor or None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = BudgetLineItemService._list_query(user_id, budget_id, after)
+
+        # One extra item tells us whether another page exists
+        cursor = budget_line_items_collection.find(query).sort(LIST_SORT).limit(limit + 1)
+        line_items = await cursor.to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(line_items) > limit:
+            line_items = line_items[:limit]
+            next_cursor = BudgetLineItemService.encode_cursor(line_items[-1])
+
+        items = await BudgetLineItemService._to_list_responses(
+            line_items, user_id, include_category
+        )
+        return items, next_cursor
+
+    @staticmethod
+    async def stream_line_items(
+        user_id: str,
+        budget_id: Optional[str] = None,
+        after: Optional[str] = None,
+        include_category: bool = False,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> AsyncIterator[Union[BudgetLineItemResponse, BudgetLineItemWithCategory]]:
+        """
+        Yield line items, newest first, as the cursor produces them.
+
+        Items are converted in batches of batch_size so category hydration
+        stays at one query per batch and memory stays bounded.
+
+        Args:
+            user_id: The logged-in User_ID
+            budget_id: Optional budget ID to filter by
+            after: Optional cursor to resume from
+            include_category: Whether to populate category details
+            batch_size: Items fetched and converted per round trip
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = BudgetLineItemService._list_query(user_id, budget_id, after)
+        cursor = budget_line_items_collection.find(query).sort(LIST_SORT).batch_size(batch_size)
+
+        batch: List[dict] = []
+        async for item in cursor:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                for response in await BudgetLineItemService._to_list_responses(
+                    batch, user_id, include_category
+                ):
+                    yield response
+                batch = []
+
+        for response in await BudgetLineItemService._to_list_responses(
+            batch, user_id, include_category
+        ):
+            yield response
+
+    @staticmethod
+    def encode_cursor(item: dict) -> str:
+        """
+        Encode an item's (created_at, _id) as a page cursor.
+
+        created_at is written as epoch milliseconds (MongoDB's own precision)
+        so the cursor is safe to paste into a query string unencoded.
+        """
+        created_at = item["created_at"]
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        millis = int(created_at.timestamp() * 1000 + 0.5)
+        return f"{millis},{item['_id']}"
+
+    @staticmethod
+    def decode_cursor(after: str) -> Tuple[datetime, ObjectId]:
+        """Parse a cursor produced by encode_cursor."""
+        millis, _, item_id = after.partition(",")
+        try:
+            created_at = datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError("Invalid cursor")
+        if not ObjectId.is_valid(item_id):
+            raise ValueError("Invalid cursor")
+        return created_at, ObjectId(item_id)
+
+    @staticmethod
+    def _list_query(
+        user_id: str,
+        budget_id: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> dict:
+        """Build the listing filter, continuing after a cursor if given."""
+        query: dict = {"user_id": user_id}
+        if budget_id:
+            query["budget_id"] = ObjectId(budget_id)
+        if after:
+            created_at, item_id = BudgetLineItemService.decode_cursor(after)
+            # Strictly after the cursor in (created_at desc, _id desc) order
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": item_id}},
+            ]
+        return query
+
+    @staticmethod
+    async def _to_list_responses(
+        line_items: List[dict],
+        user_id: str,
+        include_category: bool,
+    ) -> Union[List[BudgetLineItemResponse], List[BudgetLineItemWithCategory]]:
+        """Convert stored line items, hydrating categories with one query if asked."""
         if not include_category:
             # Return simple response without category
             return [
@@ -144,44 +310,15 @@ class BudgetLineItemService:
                 for item in line_items
             ]
 
-        # Populate category information
-        result_with_category = []
-        for item in line_items:
-            category = await categories_collection.find_one({
-                "_id": item["category_id"],
-                "user_id": user_id
-            })
-
-            category_data = None
-            if category:
-                category_data = CategoryResponse(
-                    id=str(category["_id"]),
-                    user_id=category["user_id"],
-                    name=category["name"],
-                    type=category["type"],
-                    icon=category["icon"],
-                    color=category["color"],
-                    # is_active=category.get("is_active", True),
-                    created_at=category["created_at"],
-                    updated_at=category["updated_at"],
-                )
-
-            result_with_category.append(
-                BudgetLineItemWithCategory(
-                    id=str(item["_id"]),
-                    user_id=item["user_id"],
-                    budget_id=str(item["budget_id"]),
-                    name=item["name"],
-                    category_id=str(item["category_id"]),
-                    amount=item["amount"],
-                    owner_slot=item["owner_slot"],
-                    created_at=item["created_at"],
-                    updated_at=item["updated_at"],
-                    category=category_data,
-                )
-            )
-
-        return result_with_category
+        # Populate category information with one $in query for all items
+        categories = await BudgetLineItemService._load_categories(
+            [item["category_id"] for item in line_items],
+            user_id,
+        )
+        return [
+            BudgetLineItemService._with_category(item, categories.get(item["category_id"]))
+            for item in line_items
+        ]
 
     @staticmethod
     async def get_line_item(
@@ -222,36 +359,59 @@ class BudgetLineItemService:
             )
 
         # Populate category
-        category = await categories_collection.find_one({
-            "_id": line_item["category_id"],
-            "user_id": user_id
-        })
+        categories = await BudgetLineItemService._load_categories(
+            [line_item["category_id"]],
+            user_id,
+        )
+        return BudgetLineItemService._with_category(
+            line_item, categories.get(line_item["category_id"])
+        )
 
-        category_data = None
-        if category:
-            category_data = CategoryResponse(
+    @staticmethod
+    async def _load_categories(
+        category_ids: List[ObjectId],
+        user_id: str,
+    ) -> Dict[ObjectId, CategoryResponse]:
+        """Fetch the user's categories for a set of IDs in one query, keyed by ObjectId."""
+        unique_ids = list(set(category_ids))
+        categories: Dict[ObjectId, CategoryResponse] = {}
+        if not unique_ids:
+            return categories
+
+        cursor = categories_collection.find(
+            {"_id": {"$in": unique_ids}, "user_id": user_id}
+        )
+        async for category in cursor:
+            categories[category["_id"]] = CategoryResponse(
                 id=str(category["_id"]),
                 user_id=category["user_id"],
                 name=category["name"],
                 type=category["type"],
-                icon=category["icon"],
-                color=category["color"],
+                icon=category.get("icon"),
+                color=category.get("color"),
                 # is_active=category.get("is_active", True),
                 created_at=category["created_at"],
                 updated_at=category["updated_at"],
             )
+        return categories
 
+    @staticmethod
+    def _with_category(
+        item: dict,
+        category: Optional[CategoryResponse],
+    ) -> BudgetLineItemWithCategory:
+        """Build a line item response with its (possibly missing) category."""
         return BudgetLineItemWithCategory(
-            id=str(line_item["_id"]),
-            user_id=line_item["user_id"],
-            budget_id=str(line_item["budget_id"]),
-            name=line_item["name"],
-            category_id=str(line_item["category_id"]),
-            amount=line_item["amount"],
-            owner_slot=line_item["owner_slot"],
-            created_at=line_item["created_at"],
-            updated_at=line_item["updated_at"],
-            category=category_data,
+            id=str(item["_id"]),
+            user_id=item["user_id"],
+            budget_id=str(item["budget_id"]),
+            name=item["name"],
+            category_id=str(item["category_id"]),
+            amount=item["amount"],
+            owner_slot=item["owner_slot"],
+            created_at=item["created_at"],
+            updated_at=item["updated_at"],
+            category=category,
         )
 
     @staticmethod
@@ -306,6 +466,7 @@ class BudgetLineItemService:
 
             # Convert to ObjectId for storage
             update_dict["category_id"] = category_id_obj
+            update_dict["category_type"] = category.get("type")
 
         # Always update the updated_at timestamp
         update_dict["updated_at"] = datetime.now(timezone.utc)
@@ -320,6 +481,10 @@ class BudgetLineItemService:
         if not result:
             return None
 
+        await RollupService.apply_changes(user_id, added=[result], removed=[existing])
+        await MerchantIndexService.apply_changes(user_id, added=[result], removed=[existing])
+        await DataVersionService.bump(user_id)
+
         return BudgetLineItemResponse(
             id=str(result["_id"]),
             user_id=result["user_id"],
@@ -344,11 +509,17 @@ class BudgetLineItemService:
         Returns:
             True if deleted, False if not found
         """
-        result = await budget_line_items_collection.delete_one({
+        deleted = await budget_line_items_collection.find_one_and_delete({
             "_id": ObjectId(line_item_id),
             "user_id": user_id
         })
-        return result.deleted_count > 0
+        if not deleted:
+            return False
+
+        await RollupService.apply_changes(user_id, removed=[deleted])
+        await MerchantIndexService.apply_changes(user_id, removed=[deleted])
+        await DataVersionService.bump(user_id)
+        return True
 
     @staticmethod
     async def get_line_items_by_budget(
@@ -380,9 +551,28 @@ class BudgetLineItemService:
         user_id: str,
         draft_data: SaveBudgetDraftRequest,
     ) -> SaveBudgetDraftResponse:
-        """Persist a full draft review state in one request."""
+        """
+        Persist a full draft review state in one request.
+
+        Every row is validated before anything is written. Removals, updates
+        and inserts are then sent as one ordered bulk_write, inside a
+        transaction when the deployment supports them so a failure leaves
+        the draft untouched. New rows carrying an import fingerprint the
+        user already has are dropped instead of inserted twice.
+
+        Args:
+            user_id: The logged-in User_ID
+            draft_data: Month, rows and explicit deletions
+
+        Returns:
+            The budget, its saved rows and the IDs that were removed
+
+        Raises:
+            ValueError: If any included row is invalid
+        """
         budget = await BudgetService.ensure_budget(user_id, draft_data.month)
         budget_id_obj = ObjectId(budget.id)
+        owned = {"user_id": user_id, "budget_id": budget_id_obj}
 
         rows_to_save = [row for row in draft_data.rows if row.include]
 
@@ -400,65 +590,123 @@ class BudgetLineItemService:
             async for category in cursor:
                 category_docs[str(category["_id"])] = category
 
+        for row in rows_to_save:
+            BudgetLineItemService._validate_draft_row(row, category_docs)
+
+        # One read for every row the draft touches; the rollups need the old values
+        deleted_ids = list(dict.fromkeys(
+            ObjectId(item_id) for item_id in draft_data.deleted_ids if ObjectId.is_valid(item_id)
+        ))
+        row_ids = {ObjectId(row.id) for row in rows_to_save if row.id and ObjectId.is_valid(row.id)}
+        existing_items = {}
+        if deleted_ids or row_ids:
+            cursor = budget_line_items_collection.find({**owned, "_id": {"$in": list(row_ids.union(deleted_ids))}})
+            async for item in cursor:
+                existing_items[item["_id"]] = item
+
+        # Imported rows already stored (and not being removed) are not inserted twice
+        new_fingerprints = list({
+            row.fingerprint
+            for row in rows_to_save
+            if row.fingerprint
+            and not (row.id and ObjectId.is_valid(row.id) and ObjectId(row.id) in existing_items)
+        })
+        stored_fingerprints = set()
+        if new_fingerprints:
+            cursor = budget_line_items_collection.find(
+                {"user_id": user_id, "fingerprint": {"$in": new_fingerprints}},
+                {"fingerprint": 1},
+            )
+            async for item in cursor:
+                if item["_id"] not in deleted_ids:
+                    stored_fingerprints.add(item["fingerprint"])
+
         now = datetime.now(timezone.utc)
-        removed_ids: list[str] = []
+        # Each operation is paired with the rollup change it causes: (removed, added)
+        operations = []
+        changes: list[tuple[list[dict], list[dict]]] = []
 
-        for deleted_id in draft_data.deleted_ids:
-            if not ObjectId.is_valid(deleted_id):
-                continue
-            result = await budget_line_items_collection.delete_one({
-                "_id": ObjectId(deleted_id),
-                "user_id": user_id,
-                "budget_id": budget_id_obj,
-            })
-            if result.deleted_count:
-                removed_ids.append(deleted_id)
+        removed = [existing_items[item_id] for item_id in deleted_ids if item_id in existing_items]
+        if removed:
+            operations.append(DeleteMany({**owned, "_id": {"$in": [item["_id"] for item in removed]}}))
+            changes.append((removed, []))
 
         for row in rows_to_save:
-            BudgetLineItemService._validate_draft_row(row, category_docs)
-
             payload = {
                 "name": row.name.strip(),
                 "category_id": ObjectId(row.category_id),
+                "category_type": category_docs[row.category_id].get("type"),
                 "amount": row.amount,
                 "owner_slot": row.owner_slot,
                 "updated_at": now,
             }
 
-            if row.id and ObjectId.is_valid(row.id):
-                existing = await budget_line_items_collection.find_one({
-                    "_id": ObjectId(row.id),
-                    "user_id": user_id,
-                    "budget_id": budget_id_obj,
-                })
-                if existing:
-                    await budget_line_items_collection.update_one(
-                        {"_id": existing["_id"]},
-                        {"$set": payload},
-                    )
+            existing = existing_items.get(ObjectId(row.id)) if row.id and ObjectId.is_valid(row.id) else None
+            if existing and existing["_id"] not in deleted_ids:
+                operations.append(UpdateOne({**owned, "_id": existing["_id"]}, {"$set": payload}))
+                changes.append(([existing], [{**existing, **payload}]))
+                continue
+
+            if row.fingerprint:
+                if row.fingerprint in stored_fingerprints:
                     continue
+                stored_fingerprints.add(row.fingerprint)
+                payload["fingerprint"] = row.fingerprint
 
             payload.update({
+                "_id": ObjectId(),
                 "user_id": user_id,
                 "budget_id": budget_id_obj,
                 "created_at": now,
             })
-            await budget_line_items_collection.insert_one(payload)
+            operations.append(InsertOne(payload))
+            changes.append(([], [payload]))
+
+        transactional = bool(operations) and await supports_transactions()
+        applied = len(operations)
+        try:
+            if operations:
+                if transactional:
+                    async with await client.start_session() as session:
+                        async with session.start_transaction():
+                            await budget_line_items_collection.bulk_write(
+                                operations, ordered=True, session=session
+                            )
+                else:
+                    await budget_line_items_collection.bulk_write(operations, ordered=True)
+        except BulkWriteError as e:
+            # Without a transaction, an ordered bulk write keeps everything
+            # before the failing operation, and the rollups must follow
+            applied = 0 if transactional else e.details["writeErrors"][0]["index"]
+            raise
+        except PyMongoError:
+            # An aborted transaction wrote nothing; otherwise the outcome is
+            # unknown and RollupService.rebuild() is the way to reconcile
+            applied = 0
+            raise
+        finally:
+            if applied:
+                added_items = [item for _, new in changes[:applied] for item in new]
+                removed_items = [item for old, _ in changes[:applied] for item in old]
+                await RollupService.apply_changes(
+                    user_id,
+                    added=added_items,
+                    removed=removed_items,
+                    budget_months={budget_id_obj: budget.month},
+                )
+                await MerchantIndexService.apply_changes(user_id, added=added_items, removed=removed_items)
+                await DataVersionService.bump(user_id)
 
-        refreshed_budget = await BudgetService.ensure_budget(user_id, draft_data.month)
-        refreshed_rows = await BudgetService._draft_rows_from_items(
-            await budget_line_items_collection.find({
-                "user_id": user_id,
-                "budget_id": ObjectId(refreshed_budget.id),
-            }).sort("created_at", 1).to_list(length=None),
+        saved_rows = await BudgetService._draft_rows_from_items(
+            await budget_line_items_collection.find(owned).sort("created_at", 1).to_list(length=None),
             user_id,
             "existing",
         )
 
         return SaveBudgetDraftResponse(
-            budget=refreshed_budget,
-            rows=refreshed_rows,
-            removed_ids=removed_ids,
+            budget=budget,
+            rows=saved_rows,
+            removed_ids=[str(item["_id"]) for item in removed],
         )
 
     @staticmethod
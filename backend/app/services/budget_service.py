@@ -15,6 +15,9 @@ from app.models import (
     BudgetDraftRowResponse,
     CategoryResponse,
 )
+from app.services.data_version_service import DataVersionService
+from app.services.merchant_index_service import MerchantIndexService
+from app.services.rollup_service import RollupService
 
 
 class BudgetService:
@@ -63,6 +66,7 @@ class BudgetService:
         # Insert into database
         doc_dict = budget_doc.model_dump(by_alias=True, exclude_none=True)
         result = await budgets_collection.insert_one(doc_dict)
+        await DataVersionService.bump(user_id)
         
         # Fetch and return created budget
         created = await budgets_collection.find_one({
@@ -204,6 +208,10 @@ class BudgetService:
         
         if result.matched_count == 0:
             return None
+
+        if "month" in update_data and update_data["month"] != existing["month"]:
+            await RollupService.rename_month(user_id, existing["month"], update_data["month"])
+        await DataVersionService.bump(user_id)
         
         # Fetch and return updated budget
         updated = await budgets_collection.find_one({
@@ -237,17 +245,26 @@ class BudgetService:
         if not existing:
             return False
         
+        # The match index needs each item's name, category and owner to decrement
+        items_filter = {"user_id": user_id, "budget_id": ObjectId(budget_id)}
+        removed_items = await budget_line_items_collection.find(
+            items_filter,
+            {"name": 1, "category_id": 1, "owner_slot": 1},
+        ).to_list(length=None)
+
         # Delete all associated line items first
-        await budget_line_items_collection.delete_many({
-            "user_id": user_id,
-            "budget_id": ObjectId(budget_id)
-        })
+        await budget_line_items_collection.delete_many(items_filter)
         
         # Delete budget
         result = await budgets_collection.delete_one({
             "_id": ObjectId(budget_id),
             "user_id": user_id
         })
+
+        # The month's items are gone, so its rollup goes with them
+        await RollupService.delete_month(user_id, existing["month"])
+        await MerchantIndexService.apply_changes(user_id, removed=removed_items)
+        await DataVersionService.bump(user_id)
         
         return result.deleted_count > 0
 
@@ -306,6 +323,7 @@ class BudgetService:
                             "budget_id": budget_id_obj,
                             "name": item["name"],
                             "category_id": item["category_id"],
+                            "category_type": item.get("category_type"),
                             "amount": item["amount"],
                             "owner_slot": item["owner_slot"],
                             "created_at": now,
@@ -313,6 +331,13 @@ class BudgetService:
                         })
                     if copies:
                         await budget_line_items_collection.insert_many(copies)
+                        await RollupService.apply_changes(
+                            user_id,
+                            added=copies,
+                            budget_months={budget_id_obj: month},
+                        )
+                        await MerchantIndexService.apply_changes(user_id, added=copies)
+                        await DataVersionService.bump(user_id)
 
         items = await budget_line_items_collection.find(
             {"user_id": user_id, "budget_id": budget_id_obj}
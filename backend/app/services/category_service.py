@@ -8,6 +8,8 @@ from datetime import datetime, timezone
 
 from app.database import categories_collection, budget_line_items_collection
 from app.models import CategoryCreate, CategoryUpdate, CategoryInDB, CategoryResponse
+from app.services.data_version_service import DataVersionService
+from app.services.rollup_service import RollupService
 
 
 class CategoryService:
@@ -55,6 +57,7 @@ class CategoryService:
         # Insert into database
         doc_dict = category_doc.model_dump(by_alias=True, exclude_none=True)
         result = await categories_collection.insert_one(doc_dict)
+        await DataVersionService.bump(user_id)
         
         # Fetch and return created category
         created = await categories_collection.find_one({
@@ -187,6 +190,19 @@ class CategoryService:
         
         if result.matched_count == 0:
             return None
+
+        # Line items carry a copy of the type, and rollups are keyed by it,
+        # so a type change moves every amount booked against this category
+        # into a different bucket
+        if "type" in update_data and update_data["type"] != existing["type"]:
+            await budget_line_items_collection.update_many(
+                {"user_id": user_id, "category_id": ObjectId(category_id)},
+                {"$set": {"category_type": update_data["type"]}},
+            )
+            await RollupService.move_category_type(
+                user_id, ObjectId(category_id), existing["type"], update_data["type"]
+            )
+        await DataVersionService.bump(user_id)
         
         # Fetch and return updated category
         updated = await categories_collection.find_one({
@@ -239,6 +255,8 @@ class CategoryService:
             "_id": ObjectId(category_id),
             "user_id": user_id
         })
+        if result.deleted_count:
+            await DataVersionService.bump(user_id)
         
         return result.deleted_count > 0
 
@@ -0,0 +1,453 @@
+"""
+Dashboard Service
+Aggregations behind the dashboard endpoints.
+
+Every method issues a fixed number of MongoDB round trips regardless of how
+many line items a month contains: totals come from the budget_rollups
+documents maintained by RollupService.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.database import (
+    budget_rollups_collection,
+    budgets_collection,
+    categories_collection,
+    goals_collection,
+)
+from app.services.rollup_service import RollupService
+
+
+class DashboardService:
+    """Service for dashboard statistics"""
+
+    @staticmethod
+    async def get_month_totals(user_id: str, month: str) -> Dict[str, Dict[str, float]]:
+        """
+        Get a budget month's totals and the previous month's, from their rollups.
+
+        The rollups already hold sums by category type and owner slot, so both
+        months come back in one query no matter how many items exist.
+
+        Args:
+            user_id: The logged-in user's ID
+            month: Month in YYYY-MM format
+
+        Returns:
+            Dict with current and previous, each holding total_income,
+            total_expenses and total_savings
+        """
+        previous_month = DashboardService._shift_month(month, -1)
+        rollups = await RollupService.get_month_rollups(user_id, [previous_month, month])
+        return DashboardService._current_and_previous(rollups, month)
+
+    @staticmethod
+    def _current_and_previous(rollups: Dict[str, dict], month: str) -> Dict[str, Dict[str, float]]:
+        """Summarize a month and the month before it from rollups keyed by month."""
+        previous_month = DashboardService._shift_month(month, -1)
+        return {
+            "current": DashboardService._summarize_totals(
+                rollups.get(month, {}).get("totals", {})
+            ),
+            "previous": DashboardService._summarize_totals(
+                rollups.get(previous_month, {}).get("totals", {})
+            ),
+        }
+
+    @staticmethod
+    def _shift_month(month: str, offset: int) -> str:
+        """Move a YYYY-MM month string by offset months."""
+        year, month_number = (int(part) for part in month.split("-"))
+        index = year * 12 + (month_number - 1) + offset
+        return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+    @staticmethod
+    def _percent_change(current: float, previous: float) -> float:
+        """Percent change from the previous value; 0 when there is no baseline."""
+        if not previous:
+            return 0.0
+        return round((current - previous) / abs(previous) * 100, 1)
+
+    @staticmethod
+    def _summarize_totals(totals: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Fold {category type: {owner slot: sum}} into the dashboard totals."""
+        total_income = 0.0
+        total_expenses = 0.0
+        total_savings = 0.0
+
+        for category_type, slots in totals.items():
+            for owner_slot, amount in slots.items():
+                if category_type == "income":
+                    total_income += amount
+                elif category_type == "expense":
+                    # Sum of Shared Expenses and Personal Expenses
+                    if owner_slot in ["shared", "user1", "user2"]:
+                        total_expenses += amount
+                elif category_type == "savings":
+                    # Only include Shared Savings
+                    if owner_slot == "shared":
+                        total_savings += amount
+                elif category_type == "fun":
+                    # Include all Fun
+                    total_savings += amount
+
+        return {
+            "total_income": total_income,
+            "total_expenses": total_expenses,
+            "total_savings": total_savings,
+        }
+
+    @staticmethod
+    async def get_lifetime_savings(user_id: str) -> Dict[str, float]:
+        """
+        Calculate lifetime shared savings and fun savings across all budgets.
+
+        Returns:
+            Dict with shared and fun lifetime totals
+        """
+        return await RollupService.get_lifetime_savings(user_id)
+
+    @staticmethod
+    async def get_balance_trends(
+        user_id: str,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        """
+        Get cumulative shared savings and fun per budget month in one pipeline.
+
+        Each budget month joins its rollup, and $setWindowFields keeps running
+        totals over the whole history. The from/to window is applied after the
+        running sums, so the first visible month still carries everything saved
+        before it.
+
+        Args:
+            user_id: The logged-in user's ID
+            from_month: First month to return (YYYY-MM, inclusive)
+            to_month: Last month to return (YYYY-MM, inclusive)
+
+        Returns:
+            List of dicts with month, shared and fun, ordered by month
+        """
+        month_range: Dict[str, str] = {}
+        if from_month:
+            month_range["$gte"] = from_month
+        if to_month:
+            month_range["$lte"] = to_month
+
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {
+                "$lookup": {
+                    "from": "budget_rollups",
+                    "localField": "month",
+                    "foreignField": "month",
+                    "pipeline": [{"$match": {"user_id": user_id}}],
+                    "as": "rollup"
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "month": 1,
+                    "shared": {
+                        "$ifNull": [{"$first": "$rollup.totals.savings.shared"}, 0]
+                    },
+                    "fun": {
+                        "$add": [
+                            {"$ifNull": [{"$first": "$rollup.totals.fun.user1"}, 0]},
+                            {"$ifNull": [{"$first": "$rollup.totals.fun.user2"}, 0]},
+                            {"$ifNull": [{"$first": "$rollup.totals.fun.shared"}, 0]},
+                        ]
+                    },
+                }
+            },
+            {
+                "$setWindowFields": {
+                    "sortBy": {"month": 1},
+                    "output": {
+                        "shared": {
+                            "$sum": "$shared",
+                            "window": {"documents": ["unbounded", "current"]},
+                        },
+                        "fun": {
+                            "$sum": "$fun",
+                            "window": {"documents": ["unbounded", "current"]},
+                        },
+                    },
+                }
+            },
+        ]
+        if month_range:
+            pipeline.append({"$match": {"month": month_range}})
+        pipeline.append({"$sort": {"month": 1}})
+
+        return await budgets_collection.aggregate(pipeline).to_list(length=None)
+
+    @staticmethod
+    async def get_expense_breakdown(user_id: str, month: str) -> List[Dict[str, Any]]:
+        """
+        Get expense totals per category for a budget month.
+
+        Args:
+            user_id: The logged-in user's ID
+            month: Month in YYYY-MM format
+
+        Returns:
+            List of dicts with category, amount, percentage, icon and color,
+            largest first
+        """
+        rollup = await RollupService.get_month_rollup(user_id, month)
+        if not rollup or not rollup.get("categories"):
+            return []
+
+        category_map = await DashboardService._get_category_map(user_id)
+        return DashboardService._build_expense_breakdown(rollup, category_map)
+
+    @staticmethod
+    async def get_overview(
+        user_id: str,
+        month: str,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get everything the dashboard page shows in one call.
+
+        The month's rollup and the user's category map are read once and shared
+        by the stats and the expense breakdown. They are fetched concurrently
+        with lifetime savings, goals and balance trends, which do not depend on
+        each other.
+
+        Args:
+            user_id: The logged-in user's ID
+            month: Month in YYYY-MM format
+            from_month: First balance trend month (YYYY-MM, inclusive)
+            to_month: Last balance trend month (YYYY-MM, inclusive)
+
+        Returns:
+            Dict with totals (current and previous month), goals_achieved,
+            expense_breakdown and balance_trends
+        """
+        previous_month = DashboardService._shift_month(month, -1)
+        rollups, category_map, lifetime, goals, trends = await asyncio.gather(
+            RollupService.get_month_rollups(user_id, [previous_month, month]),
+            DashboardService._get_category_map(user_id),
+            RollupService.get_lifetime_savings(user_id),
+            DashboardService._list_goals(user_id),
+            DashboardService.get_balance_trends(user_id, from_month, to_month),
+        )
+
+        return {
+            "totals": DashboardService._current_and_previous(rollups, month),
+            "goals_achieved": DashboardService._count_achieved(
+                goals, lifetime["shared"], lifetime["fun"]
+            ),
+            "expense_breakdown": DashboardService._build_expense_breakdown(
+                rollups.get(month), category_map
+            ),
+            "balance_trends": trends,
+        }
+
+    @staticmethod
+    async def get_range(user_id: str, from_month: str, to_month: str) -> Dict[str, Any]:
+        """
+        Get per-month totals and per-category series for a range of months.
+
+        One aggregation reads the rollups in the range through the unique
+        (user_id, month) index and sums each category type server-side. The
+        category map for the series is fetched concurrently.
+
+        Args:
+            user_id: The logged-in user's ID
+            from_month: First month (YYYY-MM, inclusive)
+            to_month: Last month (YYYY-MM, inclusive)
+
+        Returns:
+            Dict with months (one entry per month in the range, zeros when the
+            month has no budget) and categories (one series per category with
+            amounts aligned to months)
+        """
+        def type_total(category_type: str) -> dict:
+            return {
+                "$sum": {
+                    "$map": {
+                        "input": {"$objectToArray": {"$ifNull": [f"$totals.{category_type}", {}]}},
+                        "in": "$$this.v",
+                    }
+                }
+            }
+
+        pipeline = [
+            {"$match": {"user_id": user_id, "month": {"$gte": from_month, "$lte": to_month}}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "month": 1,
+                    "categories": 1,
+                    "income": type_total("income"),
+                    "expenses": type_total("expense"),
+                    "savings": type_total("savings"),
+                    "fun": type_total("fun"),
+                }
+            },
+            {"$sort": {"month": 1}},
+        ]
+        rows, category_map = await asyncio.gather(
+            budget_rollups_collection.aggregate(pipeline).to_list(length=None),
+            DashboardService._get_category_map(user_id),
+        )
+        rows_by_month = {row["month"]: row for row in rows}
+
+        months: List[str] = []
+        month = from_month
+        while month <= to_month:
+            months.append(month)
+            month = DashboardService._shift_month(month, 1)
+
+        month_totals = []
+        series: Dict[str, List[float]] = {}
+        for index, month in enumerate(months):
+            row = rows_by_month.get(month, {})
+            income = row.get("income", 0.0)
+            expenses = row.get("expenses", 0.0)
+            month_totals.append({
+                "month": month,
+                "income": income,
+                "expenses": expenses,
+                "savings": row.get("savings", 0.0),
+                "fun": row.get("fun", 0.0),
+                "net_income": income - expenses,
+            })
+            for category_id, amount in (row.get("categories") or {}).items():
+                series.setdefault(category_id, [0.0] * len(months))[index] += amount
+
+        categories = []
+        for category_id, amounts in series.items():
+            category = category_map.get(category_id)
+            total = sum(amounts)
+            # Deleted categories and amounts that netted out are not shown
+            if not category or round(total, 2) == 0:
+                continue
+            categories.append({
+                "category_id": category_id,
+                "name": category.get("name", "Unknown"),
+                "type": category.get("type", ""),
+                "icon": category.get("icon") or "",
+                "color": category.get("color") or "",
+                "amounts": amounts,
+                "total": total,
+            })
+        categories.sort(key=lambda c: (c["type"], -c["total"]))
+
+        return {"months": month_totals, "categories": categories}
+
+    @staticmethod
+    async def _get_category_map(user_id: str) -> Dict[str, dict]:
+        """Load the user's categories keyed by their string ID."""
+        cursor = categories_collection.find(
+            {"user_id": user_id},
+            {"name": 1, "type": 1, "icon": 1, "color": 1},
+        )
+        return {str(category["_id"]): category async for category in cursor}
+
+    @staticmethod
+    def _build_expense_breakdown(
+        rollup: Optional[dict],
+        category_map: Dict[str, dict],
+    ) -> List[Dict[str, Any]]:
+        """Group a rollup's per-category sums into the expense breakdown."""
+        category_totals: Dict[str, float] = {}
+        category_meta: Dict[str, dict] = {}
+        total_expenses = 0.0
+
+        for category_id, amount in ((rollup or {}).get("categories") or {}).items():
+            category = category_map.get(category_id)
+            # Only expense categories (Shared + Personal); amounts that netted
+            # out to zero after deletes are not shown
+            if not category or category.get("type") != "expense" or round(amount, 2) == 0:
+                continue
+
+            cat_name = category.get("name", "Unknown")
+            category_totals[cat_name] = category_totals.get(cat_name, 0) + amount
+            if cat_name not in category_meta:
+                category_meta[cat_name] = {
+                    "icon": category.get("icon") or "",
+                    "color": category.get("color") or "",
+                }
+            total_expenses += amount
+
+        breakdown = []
+        for category_name, amount in category_totals.items():
+            percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
+            breakdown.append({
+                "category": category_name,
+                "amount": amount,
+                "percentage": round(percentage, 1),
+                **category_meta[category_name],
+            })
+
+        return sorted(breakdown, key=lambda x: x["amount"], reverse=True)
+
+    @staticmethod
+    async def _list_goals(user_id: str) -> List[dict]:
+        """Get the user's goals sorted by priority."""
+        cursor = goals_collection.find(
+            {"user_id": user_id},
+            {"target_amount": 1, "type": 1, "priority": 1},
+        ).sort("priority", 1)
+        return await cursor.to_list(length=None)
+
+    @staticmethod
+    async def count_achieved_goals(
+        user_id: str,
+        lifetime_shared_savings: float,
+        lifetime_fun_savings: float,
+    ) -> int:
+        """
+        Count goals that are fully funded, filling goals in priority order.
+
+        Shared goals draw from shared savings, fun goals from fun savings.
+        """
+        goals = await DashboardService._list_goals(user_id)
+        return DashboardService._count_achieved(
+            goals, lifetime_shared_savings, lifetime_fun_savings
+        )
+
+    @staticmethod
+    def _count_achieved(
+        goals: List[dict],
+        lifetime_shared_savings: float,
+        lifetime_fun_savings: float,
+    ) -> int:
+        """Count funded goals from a priority-sorted goal list."""
+        goals_achieved_count = 0
+        remaining_shared = lifetime_shared_savings
+        remaining_fun = lifetime_fun_savings
+
+        for goal in goals:
+            target = goal.get("target_amount", 0)
+            goal_type = goal.get("type", "shared")
+
+            # Select correct wallet
+            if goal_type == "shared":
+                remaining = remaining_shared
+            else: # fun
+                remaining = remaining_fun
+
+            if target <= 0:
+                goals_achieved_count += 1
+                continue
+
+            amount_for_goal = min(remaining, target)
+
+            if amount_for_goal >= target:
+                goals_achieved_count += 1
+
+            # Deduct used savings
+            if goal_type == "shared":
+                remaining_shared = max(0, remaining_shared - amount_for_goal)
+            else:
+                remaining_fun = max(0, remaining_fun - amount_for_goal)
+
+        return goals_achieved_count
@@ -0,0 +1,65 @@
+"""
+Data Version Service
+Keeps one monotonically increasing counter per user in user_data_versions.
+
+Every write path that changes a user's categories, budgets, line items or
+goals calls bump afterwards. Read endpoints derive their ETag from the
+current version (see app.dependencies.check_etag), so an unchanged version
+means the cached response is still valid and the request can be answered
+with 304 Not Modified without running any aggregation.
+"""
+from datetime import datetime, timezone
+
+from app.database import user_data_versions_collection
+
+
+class DataVersionService:
+    """Service for per-user data version counters"""
+
+    @staticmethod
+    async def get_version(user_id: str) -> int:
+        """
+        Get the user's current data version.
+
+        Args:
+            user_id: The logged-in user's ID
+
+        Returns:
+            The version, or 0 if the user has never written anything
+        """
+        doc = await user_data_versions_collection.find_one(
+            {"user_id": user_id},
+            {"version": 1},
+        )
+        return doc["version"] if doc else 0
+
+    @staticmethod
+    async def bump(user_id: str) -> None:
+        """
+        Mark the user's data as changed.
+
+        Call this after the write has completed, so a reader never caches a
+        response under a version that predates the write.
+
+        Args:
+            user_id: The user whose data changed
+        """
+        await user_data_versions_collection.update_one(
+            {"user_id": user_id},
+            {
+                "$inc": {"version": 1},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+
+    @staticmethod
+    async def bump_all() -> None:
+        """Mark every user's data as changed, e.g. after a global rollup rebuild."""
+        await user_data_versions_collection.update_many(
+            {},
+            {
+                "$inc": {"version": 1},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+        )
@@ -4,6 +4,7 @@ Seeds a new user with common budget categories on registration.
 """
 from datetime import datetime, timezone
 from app.database import categories_collection
+from app.services.data_version_service import DataVersionService
 
 # Default categories to seed for every new user.
 # Each tuple is (name, type, icon, color).
@@ -77,4 +78,6 @@ async def seed_default_categories(user_id: str) -> int:
         })
         inserted += 1
 
+    if inserted:
+        await DataVersionService.bump(user_id)
     return inserted
@@ -15,6 +15,9 @@ from app.database import (
     budget_line_items_collection,
     goals_collection,
 )
+from app.services.data_version_service import DataVersionService
+from app.services.merchant_index_service import MerchantIndexService
+from app.services.rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
@@ -158,6 +161,7 @@ async def seed_demo_data(user_id: str) -> dict:
     # 4. Create budget line items
     # ------------------------------------------------------------------
     line_items_created = 0
+    inserted_items: list[dict] = []
     for row in rows:
         cat_name = row["category"].strip()
         cat_type = TYPE_MAP.get(row["type"].strip(), row["type"].strip())
@@ -176,18 +180,28 @@ async def seed_demo_data(user_id: str) -> dict:
             continue
 
         now = datetime.now(timezone.utc)
-        await budget_line_items_collection.insert_one({
+        line_item_doc = {
             "user_id": user_id,
             "budget_id": ObjectId(budget_id),
             "name": name,
             "category_id": ObjectId(category_id),
+            "category_type": cat_type,
             "amount": amount,
             "owner_slot": owner_slot,
             "created_at": now,
             "updated_at": now,
-        })
+        }
+        await budget_line_items_collection.insert_one(line_item_doc)
+        inserted_items.append(line_item_doc)
         line_items_created += 1
 
+    await RollupService.apply_changes(
+        user_id,
+        added=inserted_items,
+        budget_months={ObjectId(budget_id): month for month, budget_id in budget_map.items()},
+    )
+    await MerchantIndexService.apply_changes(user_id, added=inserted_items)
+
     # ------------------------------------------------------------------
     # 5. Seed a couple of demo goals
     # ------------------------------------------------------------------
@@ -251,6 +265,8 @@ async def seed_demo_data(user_id: str) -> dict:
         })
         goals_created += 1
 
+    await DataVersionService.bump(user_id)
+
     summary = {
         "categories_created": categories_created,
         "budgets_created": budgets_created,
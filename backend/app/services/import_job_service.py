@@ -0,0 +1,427 @@
+"""
+Import Job Service
+Runs CSV statement parsing and suggestion outside the upload request, and
+keeps parsed previews on the server until they are confirmed.
+
+An upload creates a job and returns its ID straight away; the parse and
+suggestion pass then runs as a background task, storing each suggested batch
+in import_job_rows as soon as it is done so progress and partial results can
+be polled. The synchronous upload endpoints and the AI assistant's proposals
+store their rows the same way, as a job that is ready at once (a preview).
+Confirming reads the stored rows back, so the client sends only the preview
+ID and the rows the user changed instead of posting every row again.
+
+Job shape:
+    {
+        "_id": ObjectId,
+        "user_id": "...",
+        "kind": "import" | "ai_proposal",
+        "status": "processing" | "ready" | "failed" | "confirming" | "confirmed",
+        "filename": "statement.csv",
+        "header": [...], "delimiter": ";",
+        "columns": {"date": 0, ...}, "profile": "Nordea" | None,
+        "processed_rows": 4000,
+        "batch_count": 4,
+        "error": None,
+        "result": None,              # confirm summary once confirmed
+        "created_at", "updated_at", "expires_at",
+    }
+
+Both collections carry a TTL index on expires_at, so abandoned jobs clean
+themselves up.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.database import import_job_rows_collection, import_jobs_collection
+from app.services.import_service import SUGGESTION_BATCH_SIZE, ImportService
+
+logger = logging.getLogger(__name__)
+
+# How long a job and its rows are kept after the last change
+JOB_TTL = timedelta(hours=24)
+
+# A processing job that has not stored a batch for this long was interrupted
+JOB_STALL_TIMEOUT = timedelta(minutes=10)
+
+# Fields a confirm may change on a stored row
+OVERRIDE_FIELDS = ("category_id", "owner_slot", "include")
+
+
+class ImportJobService:
+    """Service for background CSV import jobs and stored previews"""
+
+    @staticmethod
+    async def create_job(user_id: str, filename: str) -> Dict[str, Any]:
+        """
+        Create a job in the processing state.
+
+        Args:
+            user_id: The logged-in user's ID
+            filename: Name of the uploaded file
+
+        Returns:
+            The job as returned by get_job
+        """
+        job = ImportJobService._new_job(user_id, "import", "processing", filename=filename)
+        result = await import_jobs_collection.insert_one(job)
+        job["_id"] = result.inserted_id
+        return ImportJobService._job_response(job)
+
+    @staticmethod
+    async def store_preview(
+        user_id: str,
+        rows: List[Dict[str, Any]],
+        kind: str = "import",
+        filename: Optional[str] = None,
+        header: Optional[List[str]] = None,
+        delimiter: Optional[str] = None,
+        columns: Optional[Dict[str, Optional[int]]] = None,
+        profile: Optional[str] = None,
+    ) -> str:
+        """
+        Store already parsed rows as a job that is ready to confirm.
+
+        Args:
+            user_id: The logged-in user's ID
+            rows: Parsed rows, or validated AI proposal entries
+            kind: "import" for statement rows, "ai_proposal" for AI entries
+            filename: Name of the uploaded file, if any
+            header: Detected CSV header, if any
+            delimiter: Detected CSV delimiter, if any
+            columns: Column mapping used, if any
+            profile: Name of the bank profile used, if any
+
+        Returns:
+            The preview (job) ID
+        """
+        job = ImportJobService._new_job(
+            user_id,
+            kind,
+            "ready",
+            filename=filename,
+            header=header or [],
+            delimiter=delimiter,
+            columns=columns or {},
+            profile=profile,
+            processed_rows=len(rows),
+            batch_count=-(-len(rows) // SUGGESTION_BATCH_SIZE),
+        )
+        result = await import_jobs_collection.insert_one(job)
+        if rows:
+            await import_job_rows_collection.insert_many([
+                {
+                    "job_id": result.inserted_id,
+                    "user_id": user_id,
+                    "batch": batch,
+                    "rows": rows[start:start + SUGGESTION_BATCH_SIZE],
+                    "expires_at": job["expires_at"],
+                }
+                for batch, start in enumerate(range(0, len(rows), SUGGESTION_BATCH_SIZE))
+            ])
+        return str(result.inserted_id)
+
+    @staticmethod
+    def _new_job(user_id: str, kind: str, status: str, **fields: Any) -> Dict[str, Any]:
+        """Build a job document with the default fields."""
+        now = datetime.now(timezone.utc)
+        return {
+            "user_id": user_id,
+            "kind": kind,
+            "status": status,
+            "filename": None,
+            "header": [],
+            "delimiter": None,
+            "columns": {},
+            "profile": None,
+            "processed_rows": 0,
+            "batch_count": 0,
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + JOB_TTL,
+            **fields,
+        }
+
+    @staticmethod
+    async def run_job(job_id: str, user_id: str, chunks: AsyncIterable[bytes]) -> None:
+        """
+        Parse, suggest and store a statement for a job.
+
+        Meant to run as a background task. Each suggested batch is stored and
+        counted as soon as it is ready; any failure ends the job in the
+        failed state with a message instead of raising.
+
+        Args:
+            job_id: The job to fill in
+            user_id: The logged-in user's ID
+            chunks: The raw uploaded file
+        """
+        job_filter = {"_id": ObjectId(job_id), "user_id": user_id}
+        try:
+            parsed = await ImportService.parse_csv_stream(ImportService.decode_chunks(chunks), user_id)
+            await import_jobs_collection.update_one(
+                job_filter,
+                {"$set": {
+                    "header": parsed["header"],
+                    "delimiter": parsed["delimiter"],
+                    "columns": parsed["columns"],
+                    "profile": parsed["profile"],
+                }},
+            )
+
+            batch_number = 0
+            async for batch in ImportService.suggest_batches(user_id, parsed["rows"]):
+                await ImportService.flag_imported_rows(user_id, batch)
+                now = datetime.now(timezone.utc)
+                await import_job_rows_collection.insert_one({
+                    "job_id": job_filter["_id"],
+                    "user_id": user_id,
+                    "batch": batch_number,
+                    "rows": batch,
+                    "expires_at": now + JOB_TTL,
+                })
+                batch_number += 1
+                await import_jobs_collection.update_one(
+                    job_filter,
+                    {
+                        "$inc": {"processed_rows": len(batch), "batch_count": 1},
+                        "$set": {"updated_at": now},
+                    },
+                )
+
+            await ImportJobService._finish(job_filter, "ready")
+        except ValueError as e:
+            await ImportJobService._finish(job_filter, "failed", error=str(e))
+        except Exception as e:
+            logger.exception(f"Import job {job_id} failed")
+            await ImportJobService._finish(job_filter, "failed", error=f"Failed to parse CSV: {str(e)}")
+
+    @staticmethod
+    async def get_job(
+        user_id: str,
+        job_id: str,
+        offset: int = 0,
+        limit: int = 0,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a job's state, optionally with a page of its rows.
+
+        Rows are available while the job is still processing; they cover the
+        batches stored so far.
+
+        Args:
+            user_id: The logged-in user's ID
+            job_id: The job ID
+            offset: Index of the first row to return
+            limit: Maximum rows to return; 0 returns none
+
+        Returns:
+            The job with a rows list, or None if not found
+        """
+        if not ObjectId.is_valid(job_id):
+            return None
+        job_filter = {"_id": ObjectId(job_id), "user_id": user_id, "kind": "import"}
+
+        # A job whose task died with the process would otherwise poll forever
+        stalled_before = datetime.now(timezone.utc) - JOB_STALL_TIMEOUT
+        job = await import_jobs_collection.find_one_and_update(
+            {**job_filter, "status": "processing", "updated_at": {"$lt": stalled_before}},
+            {"$set": {"status": "failed", "error": "The import was interrupted; please upload the file again"}},
+            return_document=ReturnDocument.AFTER,
+        ) or await import_jobs_collection.find_one(job_filter)
+        if not job:
+            return None
+
+        response = ImportJobService._job_response(job)
+        response["rows"] = await ImportJobService._read_rows(job["_id"], offset, limit) if limit > 0 else []
+        return response
+
+    @staticmethod
+    async def confirm_job(
+        user_id: str,
+        job_id: str,
+        month: str,
+        overrides: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Save a finished job's included rows as budget line items.
+
+        Args:
+            user_id: The logged-in user's ID
+            job_id: The job or preview ID
+            month: Target month in YYYY-MM format
+            overrides: Sparse per-row changes, see claim_preview
+
+        Returns:
+            Summary as returned by ImportService.confirm_import, or None if
+            the job was not found
+
+        Raises:
+            ValueError: If the job is not ready to confirm or an override is invalid
+        """
+        rows = await ImportJobService.claim_preview(user_id, job_id, "import", overrides)
+        if rows is None:
+            return None
+
+        try:
+            entries = [
+                {
+                    "name": row.get("description") or "Imported item",
+                    "category_id": row.get("category_id") or "",
+                    "amount": row.get("abs_amount", 0.0),
+                    "owner_slot": row.get("owner_slot", "user1"),
+                    "fingerprint": row.get("fingerprint"),
+                }
+                for row in rows
+            ]
+            result = await ImportService.confirm_import(user_id, month, entries)
+        except Exception:
+            await ImportJobService.release_preview(user_id, job_id)
+            raise
+
+        await ImportJobService.complete_preview(user_id, job_id, {
+            "saved_count": result["saved_count"],
+            "error_count": result["error_count"],
+            "skipped_count": result["skipped_count"],
+        })
+        return result
+
+    @staticmethod
+    async def claim_preview(
+        user_id: str,
+        job_id: str,
+        kind: str,
+        overrides: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Take a ready job for confirmation and return its rows to save.
+
+        The job moves to confirming, so a repeated request cannot save the
+        rows twice; finish with complete_preview, or release_preview if the
+        save failed without writing anything. Overrides are dicts with the row's index in the preview
+        and any of category_id, owner_slot and include; rows left with
+        include false are dropped.
+
+        Args:
+            user_id: The logged-in user's ID
+            job_id: The job or preview ID
+            kind: The kind of job expected
+            overrides: Sparse per-row changes
+
+        Returns:
+            The included rows with overrides applied, or None if not found
+
+        Raises:
+            ValueError: If the job is not ready to confirm or an override is invalid
+        """
+        if not ObjectId.is_valid(job_id):
+            return None
+        job_filter = {"_id": ObjectId(job_id), "user_id": user_id, "kind": kind}
+
+        job = await import_jobs_collection.find_one_and_update(
+            {**job_filter, "status": "ready"},
+            {"$set": {"status": "confirming", "updated_at": datetime.now(timezone.utc)}},
+        )
+        if not job:
+            existing = await import_jobs_collection.find_one(job_filter, {"status": 1})
+            if not existing:
+                return None
+            raise ValueError(f"Import is {existing['status']}, not ready to confirm")
+
+        changes: Dict[int, Dict[str, Any]] = {}
+        for override in overrides or []:
+            index = override["index"]
+            if not 0 <= index < job.get("processed_rows", 0):
+                await ImportJobService.release_preview(user_id, job_id)
+                raise ValueError(f"Override for unknown row {index}")
+            changes.setdefault(index, {}).update(
+                (field, override[field]) for field in OVERRIDE_FIELDS if override.get(field) is not None
+            )
+
+        rows = []
+        index = 0
+        async for row in ImportJobService._iter_rows(job["_id"]):
+            if index in changes:
+                row = {**row, **changes[index]}
+            if row.get("include", True):
+                rows.append(row)
+            index += 1
+        return rows
+
+    @staticmethod
+    async def complete_preview(user_id: str, job_id: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a claimed preview as confirmed, keeping a summary of the save."""
+        await ImportJobService._finish(
+            {"_id": ObjectId(job_id), "user_id": user_id}, "confirmed", result=result
+        )
+
+    @staticmethod
+    async def release_preview(user_id: str, job_id: str) -> None:
+        """Return a claimed preview to ready after a failed save."""
+        await ImportJobService._finish({"_id": ObjectId(job_id), "user_id": user_id}, "ready")
+
+    @staticmethod
+    async def delete_user_jobs(user_id: str) -> None:
+        """Delete every import job and stored row for a user."""
+        await import_job_rows_collection.delete_many({"user_id": user_id})
+        await import_jobs_collection.delete_many({"user_id": user_id})
+
+    @staticmethod
+    async def _finish(job_filter: Dict[str, Any], status: str, **fields: Any) -> None:
+        """Move a job to a new status and push its expiry out."""
+        now = datetime.now(timezone.utc)
+        await import_jobs_collection.update_one(
+            job_filter,
+            {"$set": {"status": status, "updated_at": now, "expires_at": now + JOB_TTL, **fields}},
+        )
+        await import_job_rows_collection.update_many(
+            {"job_id": job_filter["_id"]},
+            {"$set": {"expires_at": now + JOB_TTL}},
+        )
+
+    @staticmethod
+    async def _read_rows(job_oid: ObjectId, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Return rows offset..offset+limit, reading only the batches they span."""
+        first_batch = offset // SUGGESTION_BATCH_SIZE
+        last_batch = (offset + limit - 1) // SUGGESTION_BATCH_SIZE
+        rows: List[Dict[str, Any]] = []
+        cursor = import_job_rows_collection.find(
+            {"job_id": job_oid, "batch": {"$gte": first_batch, "$lte": last_batch}}
+        ).sort("batch", 1)
+        async for document in cursor:
+            rows.extend(document["rows"])
+        start = offset - first_batch * SUGGESTION_BATCH_SIZE
+        return rows[start:start + limit]
+
+    @staticmethod
+    async def _iter_rows(job_oid: ObjectId):
+        """Yield every stored row of a job in statement order."""
+        cursor = import_job_rows_collection.find({"job_id": job_oid}).sort("batch", 1)
+        async for document in cursor:
+            for row in document["rows"]:
+                yield row
+
+    @staticmethod
+    def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a job document to its API shape."""
+        return {
+            "id": str(job["_id"]),
+            "status": job["status"],
+            "filename": job.get("filename"),
+            "header": job.get("header", []),
+            "delimiter": job.get("delimiter"),
+            "columns": job.get("columns", {}),
+            "profile": job.get("profile"),
+            "processed_rows": job.get("processed_rows", 0),
+            "error": job.get("error"),
+            "result": job.get("result"),
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "expires_at": job["expires_at"],
+        }
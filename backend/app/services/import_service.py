@@ -2,24 +2,101 @@
 Import Service
 Handles CSV bank statement parsing, preview generation, and budget reconciliation.
 """
+import asyncio
+import codecs
 import csv
-import io
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 from datetime import datetime, timezone
 from bson import ObjectId
-import unicodedata
-import re
-from collections import defaultdict
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from app.database import (
     categories_collection,
     budgets_collection,
     budget_line_items_collection,
 )
+from app.services.bank_profile_service import BankProfileService
+from app.services.data_version_service import DataVersionService
+from app.services.merchant_index_service import INDEX_KINDS, MerchantIndexService
+from app.services.rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
+# Parsed rows suggested per merchant index lookup
+SUGGESTION_BATCH_SIZE = 1000
+
+# Uploads from this many rows on are scored in the suggestion process pool;
+# smaller ones finish faster on the event loop than the pickling would take
+PARALLEL_SUGGESTION_MIN_ROWS = 5000
+
+# Worker processes scoring suggestion batches (defaults to one per core)
+SUGGESTION_WORKERS = int(os.getenv("SUGGESTION_WORKERS", "0")) or os.cpu_count() or 1
+
+# Line items sent per insert_many when confirming an import
+CONFIRM_BATCH_SIZE = 500
+
+# Fingerprints per $in when checking for already imported rows
+FINGERPRINT_BATCH_SIZE = 5000
+
+# MongoDB duplicate key error, raised when a fingerprint is already stored
+DUPLICATE_KEY_ERROR = 11000
+
+# Currency text stripped from detected amount columns
+AMOUNT_NOISE = re.compile(r"kr\.?")
+
+
+_suggestion_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _suggestion_executor() -> ProcessPoolExecutor:
+    """The shared suggestion pool, started on first use."""
+    global _suggestion_pool
+    if _suggestion_pool is None:
+        # spawn: forking would copy the event loop and the driver's threads
+        _suggestion_pool = ProcessPoolExecutor(
+            max_workers=SUGGESTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _suggestion_pool
+
+
+def _suggest_in_worker(
+    rows: List[Dict[str, Any]],
+    indexes: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Score one batch in a pool process."""
+    return [ImportService._with_suggestion(row, indexes, True) for row in rows]
+
+
+def shutdown_suggestion_pool() -> None:
+    """Stop the suggestion pool; the next large upload starts a new one."""
+    global _suggestion_pool
+    if _suggestion_pool is not None:
+        _suggestion_pool.shutdown(wait=False, cancel_futures=True)
+        _suggestion_pool = None
+
+
+@lru_cache(maxsize=4096)
+def _matches_date_format(value: str, date_format: str) -> bool:
+    """Whether a date cell parses with a profile's format; statements repeat dates."""
+    try:
+        datetime.strptime(value, date_format)
+    except ValueError:
+        return False
+    return True
+
 
 class ImportService:
     """Service for CSV bank statement import and budget reconciliation."""
@@ -28,14 +105,6 @@ class ImportService:
     DATE_KEYWORDS = ["date", "dato", "transaction date", "booking date", "bogført"]
     DESC_KEYWORDS = ["description", "text", "beskrivelse", "merchant", "tekst", "modtager"]
     AMOUNT_KEYWORDS = ["amount", "beløb", "sum", "value", "kr"]
-    MATCH_NOISE_TOKENS = {
-        "aps", "as", "ab", "dk", "dkk", "eur", "visa", "mastercard", "kort", "card",
-        "betaling", "payment", "konto", "kontonr", "overforsel", "overfoersel", "transfer",
-        "aut", "automatisk", "mobilepay", "mp", "pos", "purchase", "shop", "store", "web",
-        "butikk", "butik", "online", "subscription", "service", "services", "danmark",
-        "debit", "credit", "invoice", "regning", "betalinger", "terminal", "ref", "reference",
-        "betalingstjeneste", "giro", "pbs", "fi", "dd", "via", "the", "and",
-    }
 
     @staticmethod
     def _detect_delimiter(first_line: str) -> str:
@@ -49,154 +118,29 @@ class ImportService:
     @staticmethod
     def _parse_amount(amount_str: str) -> float:
         """Parse amount string handling Danish format (1.234,56) and currency symbols."""
-        cleaned = amount_str.replace(" ", "").replace("kr.", "").replace("kr", "").strip()
+        cleaned = AMOUNT_NOISE.sub("", amount_str.replace(" ", "")).strip()
         # Danish format: 1.234,56 → 1234.56
-        if "," in cleaned and "." in cleaned:
+        if "," in cleaned:
             cleaned = cleaned.replace(".", "").replace(",", ".")
-        elif "," in cleaned:
-            cleaned = cleaned.replace(",", ".")
         try:
             return float(cleaned)
         except ValueError:
             return 0.0
 
-    @classmethod
-    def _normalize_description(cls, value: str) -> str:
-        normalized = unicodedata.normalize("NFKD", value.lower())
-        ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
-        collapsed = re.sub(r"[^a-z0-9]+", " ", ascii_text)
-        return re.sub(r"\s+", " ", collapsed).strip()
-
-    @classmethod
-    def _meaningful_tokens(cls, value: str) -> List[str]:
-        normalized = cls._normalize_description(value)
-        tokens = []
-        for token in normalized.split():
-            if len(token) < 2:
-                continue
-            if token in cls.MATCH_NOISE_TOKENS:
-                continue
-            if token.isdigit() and len(token) < 4:
-                continue
-            tokens.append(token)
-        return tokens
-
-    @classmethod
-    def _candidate_phrases(cls, value: str) -> List[str]:
-        tokens = cls._meaningful_tokens(value)
-        phrases: List[str] = []
-        if not tokens:
-            return phrases
-
-        phrases.append(tokens[0])
-        if len(tokens) >= 2:
-            phrases.append(" ".join(tokens[:2]))
-        if len(tokens) >= 3 and tokens[1].isdigit():
-            phrases.append(" ".join(tokens[:3]))
-
-        deduped: List[str] = []
-        for phrase in phrases:
-            if phrase and phrase not in deduped:
-                deduped.append(phrase)
-        return deduped
-
-    @staticmethod
-    def _top_choice(counts: Dict[str, int]) -> Optional[Dict[str, float]]:
-        if not counts:
-            return None
-
-        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
-        top_value, top_count = ranked[0]
-        total = sum(counts.values())
-        second_count = ranked[1][1] if len(ranked) > 1 else 0
-
-        return {
-            "value": top_value,
-            "count": top_count,
-            "total": total,
-            "ratio": top_count / total if total else 0,
-            "margin": top_count - second_count,
-        }
-
-    @classmethod
-    async def _historical_match_indexes(cls, user_id: str) -> Dict[str, Dict[str, Any]]:
-        cursor = budget_line_items_collection.find(
-            {"user_id": user_id},
-            {"name": 1, "category_id": 1, "owner_slot": 1},
-        )
-
-        exact_map: Dict[str, Dict[str, Any]] = {}
-        phrase_map: Dict[str, Dict[str, Any]] = {}
-        token_map: Dict[str, Dict[str, Any]] = {}
-
-        async for item in cursor:
-            category_id = item.get("category_id")
-            if not category_id:
-                continue
-
-            category_key = str(category_id)
-            name = item.get("name", "")
-            normalized = cls._normalize_description(name)
-            if not normalized:
-                continue
-
-            exact_entry = exact_map.setdefault(
-                normalized,
-                {"category_counts": defaultdict(int), "owner_counts": defaultdict(int), "examples": []},
-            )
-            exact_entry["category_counts"][category_key] += 1
-            exact_entry["owner_counts"][item.get("owner_slot", "user1")] += 1
-            if len(exact_entry["examples"]) < 3:
-                exact_entry["examples"].append(name)
-
-            seen_phrases = set()
-            for phrase in cls._candidate_phrases(name):
-                if phrase in seen_phrases:
-                    continue
-                seen_phrases.add(phrase)
-                phrase_entry = phrase_map.setdefault(
-                    phrase,
-                    {"category_counts": defaultdict(int), "owner_counts": defaultdict(int), "examples": []},
-                )
-                phrase_entry["category_counts"][category_key] += 1
-                phrase_entry["owner_counts"][item.get("owner_slot", "user1")] += 1
-                if len(phrase_entry["examples"]) < 3:
-                    phrase_entry["examples"].append(name)
-
-            seen_tokens = set()
-            for token in cls._meaningful_tokens(name):
-                if token in seen_tokens:
-                    continue
-                seen_tokens.add(token)
-                token_entry = token_map.setdefault(
-                    token,
-                    {"category_counts": defaultdict(int), "owner_counts": defaultdict(int), "examples": []},
-                )
-                token_entry["category_counts"][category_key] += 1
-                token_entry["owner_counts"][item.get("owner_slot", "user1")] += 1
-                if len(token_entry["examples"]) < 3:
-                    token_entry["examples"].append(name)
-
-        return {
-            "exact_map": exact_map,
-            "phrase_map": phrase_map,
-            "token_map": token_map,
-        }
-
     @classmethod
     def _suggest_mapping_for_description(
         cls,
         description: str,
         indexes: Dict[str, Dict[str, Any]],
     ) -> Optional[Dict[str, Any]]:
-        normalized = cls._normalize_description(description)
+        normalized, phrases, tokens = MerchantIndexService.description_terms(description)
         if not normalized:
             return None
 
         exact_entry = indexes["exact_map"].get(normalized)
         if exact_entry:
-            top_category = cls._top_choice(dict(exact_entry["category_counts"]))
-            top_owner = cls._top_choice(dict(exact_entry["owner_counts"]))
+            top_category = exact_entry["top_category"]
+            top_owner = exact_entry["top_owner"]
             if top_category and top_category["ratio"] >= 0.6:
                 confidence = min(0.99, 0.75 + (0.05 * top_category["count"]))
                 return {
@@ -213,13 +157,13 @@ class ImportService:
         matched_terms: List[str] = []
         matched_examples: List[str] = []
 
-        for phrase in cls._candidate_phrases(description):
+        for phrase in phrases:
             phrase_entry = indexes["phrase_map"].get(phrase)
             if not phrase_entry:
                 continue
 
-            top_category = cls._top_choice(dict(phrase_entry["category_counts"]))
-            top_owner = cls._top_choice(dict(phrase_entry["owner_counts"]))
+            top_category = phrase_entry["top_category"]
+            top_owner = phrase_entry["top_owner"]
             if not top_category or top_category["ratio"] < 0.75:
                 continue
 
@@ -230,13 +174,13 @@ class ImportService:
             matched_terms.append(phrase)
             matched_examples.extend(phrase_entry["examples"][:1])
 
-        for token in cls._meaningful_tokens(description):
+        for token in tokens:
             token_entry = indexes["token_map"].get(token)
             if not token_entry:
                 continue
 
-            top_category = cls._top_choice(dict(token_entry["category_counts"]))
-            top_owner = cls._top_choice(dict(token_entry["owner_counts"]))
+            top_category = token_entry["top_category"]
+            top_owner = token_entry["top_owner"]
             if not top_category:
                 continue
 
@@ -270,7 +214,7 @@ class ImportService:
             for (category_id, owner), score in owner_scores.items()
             if category_id == top_category_id
         }
-        top_owner = cls._top_choice(owner_candidates)
+        top_owner = MerchantIndexService.top_choice(owner_candidates)
 
         return {
             "category_id": top_category_id,
@@ -285,34 +229,154 @@ class ImportService:
     async def apply_historical_suggestions(
         cls,
         user_id: str,
-        rows: List[Dict[str, Any]],
+        rows: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
     ) -> List[Dict[str, Any]]:
-        if not rows:
+        """
+        Suggest a category and owner for each parsed row from the user's history.
+
+        Rows may be a list or an async iterable such as parse_csv_stream's
+        row generator. They are suggested in batches of SUGGESTION_BATCH_SIZE,
+        and each batch loads only the index keys no earlier batch asked for.
+
+        Args:
+            user_id: The logged-in user's ID
+            rows: Parsed rows
+
+        Returns:
+            The rows with suggestion fields filled in
+        """
+        if isinstance(rows, list) and not rows:
             return rows
 
-        indexes = await cls._historical_match_indexes(user_id)
         enriched_rows: List[Dict[str, Any]] = []
-        for row in rows:
-            enriched = dict(row)
-            suggestion = None
-            if indexes["exact_map"] or indexes["phrase_map"] or indexes["token_map"]:
-                suggestion = cls._suggest_mapping_for_description(row.get("description", ""), indexes)
-            if suggestion:
-                enriched["category_id"] = suggestion["category_id"]
-                enriched["owner_slot"] = suggestion["owner_slot"]
-                enriched["suggestion_confidence"] = suggestion["suggestion_confidence"]
-                enriched["suggestion_basis"] = suggestion["suggestion_basis"]
-                enriched["matched_terms"] = suggestion["matched_terms"]
-                enriched["matched_example"] = suggestion["matched_example"]
-            else:
-                enriched["suggestion_confidence"] = None
-                enriched["suggestion_basis"] = None
-                enriched["matched_terms"] = []
-                enriched["matched_example"] = None
+        async for batch in cls.suggest_batches(user_id, rows):
+            enriched_rows.extend(batch)
+        return enriched_rows
 
-            enriched_rows.append(enriched)
+    @classmethod
+    async def suggest_batches(
+        cls,
+        user_id: str,
+        rows: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Suggest rows batch by batch, yielding each batch once it is done.
 
-        return enriched_rows
+        Used directly by import jobs to store partial results; see
+        apply_historical_suggestions for the batching rules.
+
+        Once an upload reaches PARALLEL_SUGGESTION_MIN_ROWS (a list of that
+        size, or a stream after that many rows), batches are scored in the
+        suggestion process pool so the event loop stays free. Each batch is
+        sent with only the index entries its rows can match. Up to
+        SUGGESTION_WORKERS batches are in flight, and they are yielded in
+        upload order.
+        """
+        indexes: Dict[str, Dict[str, Any]] = {"exact_map": {}, "phrase_map": {}, "token_map": {}}
+        requested: set = set()
+        parallel = isinstance(rows, list) and len(rows) >= PARALLEL_SUGGESTION_MIN_ROWS
+        seen = 0
+        in_flight: deque = deque()
+
+        async for batch in cls._batched(rows, SUGGESTION_BATCH_SIZE):
+            loaded = await MerchantIndexService.load(
+                user_id, (row.get("description", "") for row in batch), requested
+            )
+            for name, entries in loaded.items():
+                indexes[name].update(entries)
+            has_history = bool(indexes["exact_map"] or indexes["phrase_map"] or indexes["token_map"])
+
+            seen += len(batch)
+            parallel = parallel or seen >= PARALLEL_SUGGESTION_MIN_ROWS
+            if parallel and has_history:
+                in_flight.append((batch, cls._score_in_pool(batch, indexes)))
+                if len(in_flight) >= SUGGESTION_WORKERS:
+                    yield await cls._collect(*in_flight.popleft(), indexes)
+                continue
+
+            while in_flight:
+                yield await cls._collect(*in_flight.popleft(), indexes)
+            yield [cls._with_suggestion(row, indexes, has_history) for row in batch]
+
+        while in_flight:
+            yield await cls._collect(*in_flight.popleft(), indexes)
+
+    @staticmethod
+    def _score_in_pool(
+        batch: List[Dict[str, Any]],
+        indexes: Dict[str, Dict[str, Any]],
+    ) -> "asyncio.Future[List[Dict[str, Any]]]":
+        """Submit a batch to the suggestion pool with the index entries it can match."""
+        subset: Dict[str, Dict[str, Any]] = {name: {} for name in indexes}
+        for row in batch:
+            for kind, key in MerchantIndexService.entry_keys(row.get("description", "")):
+                name = INDEX_KINDS[kind]
+                entry = indexes[name].get(key)
+                if entry is not None:
+                    subset[name][key] = entry
+        return asyncio.get_running_loop().run_in_executor(
+            _suggestion_executor(), _suggest_in_worker, batch, subset
+        )
+
+    @classmethod
+    async def _collect(
+        cls,
+        batch: List[Dict[str, Any]],
+        future: "asyncio.Future[List[Dict[str, Any]]]",
+        indexes: Dict[str, Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Await a pooled batch, scoring it on the loop if the pool died."""
+        try:
+            return await future
+        except BrokenProcessPool:
+            logger.exception("Suggestion pool failed; scoring the batch in-process")
+            shutdown_suggestion_pool()
+            return [cls._with_suggestion(row, indexes, True) for row in batch]
+
+    @classmethod
+    def _with_suggestion(
+        cls,
+        row: Dict[str, Any],
+        indexes: Dict[str, Dict[str, Any]],
+        has_history: bool,
+    ) -> Dict[str, Any]:
+        enriched = dict(row)
+        suggestion = None
+        if has_history:
+            suggestion = cls._suggest_mapping_for_description(row.get("description", ""), indexes)
+        if suggestion:
+            enriched["category_id"] = suggestion["category_id"]
+            enriched["owner_slot"] = suggestion["owner_slot"]
+            enriched["suggestion_confidence"] = suggestion["suggestion_confidence"]
+            enriched["suggestion_basis"] = suggestion["suggestion_basis"]
+            enriched["matched_terms"] = suggestion["matched_terms"]
+            enriched["matched_example"] = suggestion["matched_example"]
+        else:
+            enriched["suggestion_confidence"] = None
+            enriched["suggestion_basis"] = None
+            enriched["matched_terms"] = []
+            enriched["matched_example"] = None
+        return enriched
+
+    @staticmethod
+    async def _batched(
+        rows: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        size: int,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield rows from a list or async iterable in lists of at most size."""
+        if isinstance(rows, list):
+            for start in range(0, len(rows), size):
+                yield rows[start:start + size]
+            return
+
+        batch: List[Dict[str, Any]] = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     @classmethod
     def _detect_columns(cls, header: List[str]) -> Dict[str, Optional[int]]:
@@ -350,39 +414,237 @@ class ImportService:
         return {"date": date_col, "description": desc_col, "amount": amount_col}
 
     @classmethod
-    def parse_csv(cls, csv_content: str) -> Dict[str, Any]:
+    def parse_csv(cls, csv_content: str, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Parse raw CSV content and return structured rows with column detection.
 
+        Args:
+            csv_content: The CSV text
+            profile: Compiled bank profile from BankProfileService.match; when
+                given, its delimiter and columns replace detection
+
         Returns:
             Dict with parsed rows, detected header, delimiter, and column mapping.
         """
-        if not csv_content.strip():
+        records, tail = cls._split_records(csv_content.strip())
+        if tail:
+            records.append(tail)
+        if not records:
+            raise ValueError("Empty CSV content")
+
+        delimiter = profile["delimiter"] if profile else cls._detect_delimiter(records[0])
+        header, layout = cls._read_header(records[0], delimiter, profile)
+        if len(records) < 2:
+            raise ValueError("CSV must have at least a header row and one data row")
+
+        parsed = cls._parse_records(records[1:], delimiter, layout, Counter())
+        return {
+            "rows": parsed,
+            "count": len(parsed),
+            "header": header,
+            "delimiter": delimiter,
+            "columns": layout["columns"],
+            "profile": layout["profile"],
+        }
+
+    @staticmethod
+    async def decode_chunks(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+        """
+        Decode uploaded bytes incrementally.
+
+        UTF-8 is tried first. At the first invalid byte the rest of the
+        stream is decoded as latin-1, which is common for Danish bank
+        exports and never fails.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        async for chunk in chunks:
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError:
+                pending, _ = decoder.getstate()
+                decoder = codecs.getincrementaldecoder("latin-1")()
+                text = decoder.decode(pending + chunk)
+            if text:
+                yield text
+
+        try:
+            text = decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            pending, _ = decoder.getstate()
+            text = pending.decode("latin-1")
+        if text:
+            yield text
+
+    @classmethod
+    async def parse_csv_stream(
+        cls,
+        text_chunks: AsyncIterable[str],
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parse CSV text as it arrives, without holding the whole file.
+
+        The header and delimiter are read from the first complete line; the
+        remaining rows come from an async generator, so only one chunk of
+        text and the rows parsed so far are in memory at any time.
+
+        Args:
+            text_chunks: Decoded text, e.g. from decode_chunks
+            user_id: When given, a saved or global bank profile matching the
+                header replaces delimiter and column detection
+
+        Returns:
+            Dict with header, delimiter, columns, profile (the matched
+            profile's name) and rows (an async iterator of parsed rows).
+            The iterator raises ValueError if the file has no data rows.
+
+        Raises:
+            ValueError: If the content is empty
+        """
+        chunks = text_chunks.__aiter__()
+        tail = ""
+        records: List[str] = []
+        exhausted = False
+        # Leading blank lines are skipped; read until the header line is complete
+        while not records and not exhausted:
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+                if tail.strip():
+                    records = [tail]
+                    tail = ""
+                break
+            records, tail = cls._split_records((tail + chunk).lstrip())
+
+        if not records:
             raise ValueError("Empty CSV content")
 
-        first_line = csv_content.strip().split("\n")[0]
-        delimiter = cls._detect_delimiter(first_line)
+        profile = await BankProfileService.match(user_id, records[0]) if user_id else None
+        delimiter = profile["delimiter"] if profile else cls._detect_delimiter(records[0])
+        header, layout = cls._read_header(records[0], delimiter, profile)
+
+        async def rows() -> AsyncIterator[Dict[str, Any]]:
+            pending, remainder = records[1:], tail
+            occurrences: Counter = Counter()
+            seen_data = False
+            while True:
+                if pending:
+                    seen_data = seen_data or any(record.strip() for record in pending)
+                    for row in cls._parse_records(pending, delimiter, layout, occurrences):
+                        yield row
+                if exhausted:
+                    break
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                pending, remainder = cls._split_records(remainder + chunk)
+
+            if remainder.strip():
+                seen_data = True
+                for row in cls._parse_records([remainder], delimiter, layout, occurrences):
+                    yield row
+            if not seen_data:
+                raise ValueError("CSV must have at least a header row and one data row")
 
-        reader = csv.reader(io.StringIO(csv_content.strip()), delimiter=delimiter)
-        rows = list(reader)
+        return {
+            "header": header,
+            "delimiter": delimiter,
+            "columns": layout["columns"],
+            "profile": layout["profile"],
+            "rows": rows(),
+        }
 
-        if len(rows) < 2:
-            raise ValueError("CSV must have at least a header row and one data row")
+    @staticmethod
+    def _split_records(text: str) -> Tuple[List[str], str]:
+        """
+        Split text into complete CSV records and the unfinished remainder.
+
+        A line ends a record when the quotes seen since the record started
+        are balanced, so quoted fields may span lines and chunks.
+        """
+        lines = text.split("\n")
+        tail = lines.pop()
+        records: List[str] = []
+        pending: Optional[str] = None
+        quotes = 0
+        for line in lines:
+            if pending is None:
+                pending, quotes = line, line.count('"')
+            else:
+                pending += "\n" + line
+                quotes += line.count('"')
+            if quotes % 2 == 0:
+                records.append(pending)
+                pending = None
+        if pending is not None:
+            tail = pending + "\n" + tail
+        return records, tail
+
+    @classmethod
+    def _read_header(
+        cls,
+        record: str,
+        delimiter: str,
+        profile: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Parse the header record and decide how data rows are read.
+
+        Returns:
+            (header, layout): layout holds columns, max_col, parse_amount,
+            date_format and profile (the profile's name, or None if detected)
+        """
+        header = [h.strip() for h in next(csv.reader([record], delimiter=delimiter), [])]
+        if profile:
+            return header, {
+                "columns": profile["columns"],
+                "max_col": profile["max_col"],
+                "parse_amount": profile["parse_amount"],
+                "date_format": profile["date_format"],
+                "profile": profile["name"] or "saved",
+            }
 
-        header = [h.strip() for h in rows[0]]
         cols = cls._detect_columns(header)
-        data_rows = rows[1:]
+        return header, {
+            "columns": cols,
+            "max_col": max((v for v in cols.values() if v is not None), default=0),
+            "parse_amount": cls._parse_amount,
+            "date_format": None,
+            "profile": None,
+        }
 
-        max_col = max(v for v in cols.values() if v is not None)
+    @classmethod
+    def _parse_records(
+        cls,
+        records: List[str],
+        delimiter: str,
+        layout: Dict[str, Any],
+        occurrences: Counter,
+    ) -> List[Dict[str, Any]]:
+        """
+        Turn complete CSV records into parsed rows, skipping incomplete ones.
 
+        With a profile's date format, records whose date does not parse
+        (balance lines, footers) are skipped too. occurrences counts rows per
+        (date, description, amount) across the whole file so identical
+        transactions get distinct fingerprints.
+        """
+        cols = layout["columns"]
+        max_col = layout["max_col"]
+        parse_amount = layout["parse_amount"]
+        date_format = layout["date_format"]
         parsed = []
-        for row in data_rows:
+        for row in csv.reader(records, delimiter=delimiter):
             if len(row) <= max_col:
                 continue  # skip incomplete rows
 
             date_val = row[cols["date"]].strip() if cols["date"] is not None else ""
+            if date_format and not _matches_date_format(date_val, date_format):
+                continue
             desc_val = row[cols["description"]].strip() if cols["description"] is not None else ""
-            amount = cls._parse_amount(row[cols["amount"]]) if cols["amount"] is not None else 0.0
+            amount = parse_amount(row[cols["amount"]]) if cols["amount"] is not None else 0.0
 
             if not desc_val and amount == 0:
                 continue
@@ -393,18 +655,73 @@ class ImportService:
                 "amount": amount,
                 "is_expense": amount < 0,
                 "abs_amount": abs(amount),
+                "fingerprint": cls._fingerprint(date_val, desc_val, amount, occurrences),
                 # Defaults for the mapping step
                 "category_id": None,
                 "owner_slot": "user1",
                 "include": True,
             })
+        return parsed
 
-        return {
-            "rows": parsed,
-            "count": len(parsed),
-            "header": header,
-            "delimiter": delimiter,
-        }
+    @staticmethod
+    def _fingerprint(date: str, description: str, amount: float, occurrences: Counter) -> str:
+        """
+        Stable identity for a statement row.
+
+        Built from the normalized date, description and amount plus how many
+        identical rows came before it in the file, so two equal purchases on
+        the same day stay distinct while re-uploading an overlapping export
+        reproduces the same fingerprints.
+        """
+        base = (
+            f"{date.replace('.', '-').replace('/', '-')}"
+            f"|{MerchantIndexService.normalize_description(description)}|{amount:.2f}"
+        )
+        count = occurrences[base] + 1
+        occurrences[base] = count
+        return hashlib.sha256(f"{base}|{count}".encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    async def imported_fingerprints(user_id: str, fingerprints: Iterable[str]) -> set:
+        """
+        Return the fingerprints the user already has line items for.
+
+        Args:
+            user_id: The logged-in user's ID
+            fingerprints: Row fingerprints to check
+
+        Returns:
+            Set of fingerprints that are already stored
+        """
+        unique = list(dict.fromkeys(fingerprint for fingerprint in fingerprints if fingerprint))
+        found = set()
+        for start in range(0, len(unique), FINGERPRINT_BATCH_SIZE):
+            cursor = budget_line_items_collection.find(
+                {"user_id": user_id, "fingerprint": {"$in": unique[start:start + FINGERPRINT_BATCH_SIZE]}},
+                {"fingerprint": 1, "_id": 0},
+            )
+            async for item in cursor:
+                found.add(item["fingerprint"])
+        return found
+
+    @classmethod
+    async def flag_imported_rows(cls, user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Mark parsed rows that were already imported and leave them out by default.
+
+        Args:
+            user_id: The logged-in user's ID
+            rows: Parsed rows with fingerprints
+
+        Returns:
+            The same rows with already_imported set
+        """
+        imported = await cls.imported_fingerprints(user_id, (row.get("fingerprint") for row in rows))
+        for row in rows:
+            row["already_imported"] = row.get("fingerprint") in imported
+            if row["already_imported"]:
+                row["include"] = False
+        return rows
 
     @staticmethod
     async def get_user_categories(user_id: str) -> List[Dict[str, Any]]:
@@ -434,72 +751,142 @@ class ImportService:
             user_id: The logged-in user's ID
             month: Target month in YYYY-MM format
             entries: List of entries with name, category_id, amount, owner_slot
+                and optional fingerprint
+
+        Categories are checked with one query and line items are written
+        with unordered insert_many batches; a row that fails to insert is
+        reported in errors without stopping the rest. Entries whose
+        fingerprint is already stored are skipped and counted.
 
         Returns:
             Summary with saved/skipped counts
         """
         # Ensure budget exists for target month (auto-create if needed)
-        budget = await budgets_collection.find_one({
-            "user_id": user_id,
-            "month": month,
-        })
-        if not budget:
-            now = datetime.now(timezone.utc)
-            result = await budgets_collection.insert_one({
-                "user_id": user_id,
-                "month": month,
-                "created_at": now,
-                "updated_at": now,
-            })
-            budget = await budgets_collection.find_one({"_id": result.inserted_id})
-
+        now = datetime.now(timezone.utc)
+        budget = await budgets_collection.find_one_and_update(
+            {"user_id": user_id, "month": month},
+            {"$setOnInsert": {"created_at": now, "updated_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
         budget_id = budget["_id"]
 
-        saved = []
-        errors = []
+        # Verify every referenced category belongs to the user in one query
+        category_ids = {
+            entry.get("category_id")
+            for entry in entries
+            if entry.get("category_id") and ObjectId.is_valid(entry.get("category_id"))
+        }
+        categories: Dict[str, Dict[str, Any]] = {}
+        if category_ids:
+            cursor = categories_collection.find(
+                {"_id": {"$in": [ObjectId(category_id) for category_id in category_ids]}, "user_id": user_id},
+                {"name": 1, "type": 1},
+            )
+            async for category in cursor:
+                categories[str(category["_id"])] = category
 
-        for entry in entries:
-            try:
-                category_id_str = entry.get("category_id", "")
-                if not category_id_str or not ObjectId.is_valid(category_id_str):
-                    errors.append(f"Invalid category for '{entry.get('name', 'unknown')}'")
+        # Rows imported before, or repeated within this request, are skipped
+        imported = await ImportService.imported_fingerprints(
+            user_id, (entry.get("fingerprint") for entry in entries)
+        )
+        skipped_count = 0
+
+        # Errors are keyed by entry position so they come back in entry order
+        errors: Dict[int, str] = {}
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+
+        for position, entry in enumerate(entries):
+            name = entry.get("name", "unknown")
+            fingerprint = entry.get("fingerprint")
+            if fingerprint:
+                if fingerprint in imported:
+                    skipped_count += 1
                     continue
+                imported.add(fingerprint)
 
-                # Verify category belongs to user
-                category = await categories_collection.find_one({
-                    "_id": ObjectId(category_id_str),
-                    "user_id": user_id,
-                })
-                if not category:
-                    errors.append(f"Category not found for '{entry.get('name', 'unknown')}'")
-                    continue
+            category_id_str = entry.get("category_id", "")
+            if not category_id_str or not ObjectId.is_valid(category_id_str):
+                errors[position] = f"Invalid category for '{name}'"
+                continue
+
+            category = categories.get(category_id_str)
+            if not category:
+                errors[position] = f"Category not found for '{name}'"
+                continue
 
-                now = datetime.now(timezone.utc)
-                line_item_doc = {
+            try:
+                pending.append((position, {
+                    "_id": ObjectId(),
                     "user_id": user_id,
                     "budget_id": budget_id,
                     "name": entry.get("name", "Imported item"),
                     "category_id": ObjectId(category_id_str),
+                    "category_type": category.get("type"),
                     "amount": abs(float(entry.get("amount", 0))),
                     "owner_slot": entry.get("owner_slot", "user1"),
+                    **({"fingerprint": fingerprint} if fingerprint else {}),
                     "created_at": now,
                     "updated_at": now,
-                }
-
-                result = await budget_line_items_collection.insert_one(line_item_doc)
-                saved.append({
-                    "id": str(result.inserted_id),
-                    "name": entry.get("name"),
-                    "amount": abs(float(entry.get("amount", 0))),
-                    "category": category.get("name", ""),
-                })
+                }))
             except Exception as e:
-                errors.append(f"Error saving '{entry.get('name', 'unknown')}': {str(e)}")
+                errors[position] = f"Error saving '{name}': {str(e)}"
                 logger.error(f"Import entry error: {e}")
 
+        inserted_items = []
+        for start in range(0, len(pending), CONFIRM_BATCH_SIZE):
+            batch = pending[start:start + CONFIRM_BATCH_SIZE]
+            failed: Dict[int, Optional[str]] = {}
+            try:
+                await budget_line_items_collection.insert_many(
+                    [line_item_doc for _, line_item_doc in batch],
+                    ordered=False,
+                )
+            except BulkWriteError as e:
+                # Unordered inserts keep going; only the reported rows are missing
+                for error in e.details["writeErrors"]:
+                    if error.get("code") == DUPLICATE_KEY_ERROR:
+                        # Imported concurrently by another request
+                        failed[error["index"]] = None
+                    else:
+                        failed[error["index"]] = error.get("errmsg", "write failed")
+            except PyMongoError as e:
+                # Nothing is known to be written; report the whole batch
+                failed = {index: str(e) for index in range(len(batch))}
+
+            for index, (position, line_item_doc) in enumerate(batch):
+                if index in failed and failed[index] is None:
+                    skipped_count += 1
+                elif index in failed:
+                    errors[position] = f"Error saving '{entries[position].get('name', 'unknown')}': {failed[index]}"
+                    logger.error(f"Import entry error: {failed[index]}")
+                else:
+                    inserted_items.append((position, line_item_doc))
+
+        saved = [
+            {
+                "id": str(line_item_doc["_id"]),
+                "name": entries[position].get("name"),
+                "amount": line_item_doc["amount"],
+                "category": categories[str(line_item_doc["category_id"])].get("name", ""),
+            }
+            for position, line_item_doc in inserted_items
+        ]
+        inserted_items = [line_item_doc for _, line_item_doc in inserted_items]
+        errors = [errors[position] for position in sorted(errors)]
+
+        await RollupService.apply_changes(
+            user_id,
+            added=inserted_items,
+            budget_months={budget_id: month},
+        )
+        await MerchantIndexService.apply_changes(user_id, added=inserted_items)
+        await DataVersionService.bump(user_id)
+
         return {
             "saved_count": len(saved),
             "error_count": len(errors),
+            "skipped_count": skipped_count,
             "saved": saved,
             "errors": errors,
         }
@@ -0,0 +1,108 @@
+"""
+Merchant Category Cache Service
+Remembers the category and owner the AI chose for each merchant, per user,
+so a merchant is only sent to the model the first time it shows up on a
+statement.
+
+Entry shape (one document per user, merchant key and direction):
+    {
+        "user_id": "...",
+        "merchant_key": "cafe solo",        # MerchantIndexService.normalize_description
+        "is_income": False,
+        "description": "CAFE SOLO",         # As last seen
+        "category_id": "<category_id>",
+        "owner_slot": "user1" | "user2" | "shared",
+        "updated_at": ISODate,
+    }
+
+Only actual decisions are stored; a merchant the model could not place is
+asked about again next time, when the user may have added a fitting
+category. Entries pointing at a category the user has since deleted are
+ignored on lookup.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+
+from app.database import merchant_categorizations_collection
+
+logger = logging.getLogger(__name__)
+
+MerchantKey = Tuple[str, bool]
+
+
+class MerchantCategoryCacheService:
+    """Service for per-user cached merchant categorizations"""
+
+    @staticmethod
+    async def lookup(
+        user_id: str,
+        keys: Iterable[MerchantKey],
+        category_ids: Iterable[str],
+    ) -> Dict[MerchantKey, Dict[str, str]]:
+        """
+        Find earlier decisions for merchants, in one query.
+
+        Args:
+            user_id: The logged-in user's ID
+            keys: (merchant_key, is_income) pairs
+            category_ids: The user's current category IDs; decisions for
+                other categories are skipped
+
+        Returns:
+            {(merchant_key, is_income): {"category_id", "owner_slot"}}
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        valid_categories = set(category_ids)
+        cursor = merchant_categorizations_collection.find(
+            {"user_id": user_id, "merchant_key": {"$in": list({key for key, _ in keys})}},
+            {"merchant_key": 1, "is_income": 1, "category_id": 1, "owner_slot": 1},
+        )
+        decisions = {}
+        async for entry in cursor:
+            key = (entry["merchant_key"], entry["is_income"])
+            if key in keys and entry["category_id"] in valid_categories:
+                decisions[key] = {"category_id": entry["category_id"], "owner_slot": entry["owner_slot"]}
+        return decisions
+
+    @staticmethod
+    async def store(user_id: str, decisions: List[Dict[str, Any]]) -> None:
+        """
+        Remember decisions, replacing earlier ones for the same merchants.
+
+        Args:
+            user_id: The logged-in user's ID
+            decisions: Dicts with merchant_key, is_income, description,
+                category_id and owner_slot
+        """
+        if not decisions:
+            return
+
+        now = datetime.now(timezone.utc)
+        await merchant_categorizations_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "merchant_key": decision["merchant_key"], "is_income": decision["is_income"]},
+                    {"$set": {
+                        "description": decision["description"],
+                        "category_id": decision["category_id"],
+                        "owner_slot": decision["owner_slot"],
+                        "updated_at": now,
+                    }},
+                    upsert=True,
+                )
+                for decision in decisions
+            ],
+            ordered=False,
+        )
+
+    @staticmethod
+    async def delete_user_cache(user_id: str) -> int:
+        """Delete every cached decision for a user; returns how many."""
+        result = await merchant_categorizations_collection.delete_many({"user_id": user_id})
+        return result.deleted_count
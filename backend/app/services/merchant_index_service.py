@@ -0,0 +1,415 @@
+"""
+Merchant Index Service
+Maintains the merchant_match_index collection: the per-user lookup tables the
+CSV import uses to suggest a category and owner for each statement row.
+
+Entry shape (one document per user, kind and key):
+    {
+        "user_id": "...",
+        "kind": "exact" | "phrase" | "token",
+        "key": "netto",
+        "category_counts": {"<category_id>": 3, ...},
+        "owner_counts": {"user1": 3, ...},
+        "examples": ["NETTO 1234 AALBORG", ...],
+    }
+
+Each line item counts once towards its exact normalized name, each of its
+candidate phrases and each of its meaningful tokens. A marker entry (kind
+"built") records that a user's index exists: the first suggestion pass for
+a user without one builds it from their line items, and from then on every
+write path reports line item changes through apply_changes, which adjusts
+the counts with $inc so no pass has to rescan the user's history.
+"""
+import logging
+import string
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import InsertOne, UpdateOne
+
+from app.database import budget_line_items_collection, merchant_match_index_collection
+
+logger = logging.getLogger(__name__)
+
+# Entry kinds, mapped to the keys of the dict load() returns
+INDEX_KINDS = {"exact": "exact_map", "phrase": "phrase_map", "token": "token_map"}
+BUILT_MARKER = "built"
+
+# Example names kept per entry
+MAX_EXAMPLES = 3
+
+# Entries inserted per bulk_write during a rebuild
+REBUILD_BATCH_SIZE = 1000
+
+# Distinct descriptions whose normalized form is memoized; statements repeat
+# the same merchant strings, so a pass mostly hits the cache
+NORMALIZE_CACHE_SIZE = 65536
+
+# Every ASCII character except a-z and 0-9 becomes a space
+_NON_ALNUM = str.maketrans({
+    char: " " for char in map(chr, range(128))
+    if char not in string.ascii_lowercase + string.digits
+})
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize(value: str) -> str:
+    normalized = unicodedata.normalize("NFKD", value.lower())
+    ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
+    return " ".join(ascii_text.translate(_NON_ALNUM).split())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _terms(value: str) -> Tuple[str, Tuple[str, ...], Tuple[str, ...]]:
+    normalized = _normalize(value)
+    tokens = MerchantIndexService._tokens_from_normalized(normalized)
+    return normalized, tuple(MerchantIndexService._phrases_from_tokens(tokens)), tuple(tokens)
+
+
+class MerchantIndexService:
+    """Service for maintaining and reading per-user merchant match indexes"""
+
+    MATCH_NOISE_TOKENS = {
+        "aps", "as", "ab", "dk", "dkk", "eur", "visa", "mastercard", "kort", "card",
+        "betaling", "payment", "konto", "kontonr", "overforsel", "overfoersel", "transfer",
+        "aut", "automatisk", "mobilepay", "mp", "pos", "purchase", "shop", "store", "web",
+        "butikk", "butik", "online", "subscription", "service", "services", "danmark",
+        "debit", "credit", "invoice", "regning", "betalinger", "terminal", "ref", "reference",
+        "betalingstjeneste", "giro", "pbs", "fi", "dd", "via", "the", "and",
+    }
+
+    # ------------------------------------------------------------------
+    # Text normalization
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def normalize_description(cls, value: str) -> str:
+        return _normalize(value)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop the memoized normalized descriptions and terms."""
+        _normalize.cache_clear()
+        _terms.cache_clear()
+
+    @classmethod
+    def meaningful_tokens(cls, value: str) -> List[str]:
+        return cls._tokens_from_normalized(cls.normalize_description(value))
+
+    @classmethod
+    def candidate_phrases(cls, value: str) -> List[str]:
+        return cls._phrases_from_tokens(cls.meaningful_tokens(value))
+
+    @classmethod
+    def _tokens_from_normalized(cls, normalized: str) -> List[str]:
+        tokens = []
+        for token in normalized.split():
+            if len(token) < 2:
+                continue
+            if token in cls.MATCH_NOISE_TOKENS:
+                continue
+            if token.isdigit() and len(token) < 4:
+                continue
+            tokens.append(token)
+        return tokens
+
+    @staticmethod
+    def _phrases_from_tokens(tokens: List[str]) -> List[str]:
+        phrases: List[str] = []
+        if not tokens:
+            return phrases
+
+        phrases.append(tokens[0])
+        if len(tokens) >= 2:
+            phrases.append(" ".join(tokens[:2]))
+        if len(tokens) >= 3 and tokens[1].isdigit():
+            phrases.append(" ".join(tokens[:3]))
+
+        deduped: List[str] = []
+        for phrase in phrases:
+            if phrase and phrase not in deduped:
+                deduped.append(phrase)
+        return deduped
+
+    @classmethod
+    def description_terms(cls, value: str) -> Tuple[str, Tuple[str, ...], Tuple[str, ...]]:
+        """Normalize once and return (normalized, candidate phrases, meaningful tokens), memoized."""
+        return _terms(value)
+
+    @classmethod
+    def entry_keys(cls, name: str) -> List[Tuple[str, str]]:
+        """Every (kind, key) a line item or statement row with this name maps to."""
+        normalized, phrases, tokens = cls.description_terms(name)
+        if not normalized:
+            return []
+
+        keys = [("exact", normalized)]
+        keys.extend(("phrase", phrase) for phrase in phrases)
+        keys.extend(("token", token) for token in dict.fromkeys(tokens))
+        return keys
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    @classmethod
+    async def apply_changes(
+        cls,
+        user_id: str,
+        added: Iterable[dict] = (),
+        removed: Iterable[dict] = (),
+    ) -> None:
+        """
+        Fold inserted and deleted line items into the user's match index.
+
+        An update is reported as the old document in removed and the new one
+        in added, the same way RollupService.apply_changes takes it. Items
+        only need name, category_id and owner_slot, so updates that only
+        touch the amount cancel out and write nothing.
+
+        Args:
+            user_id: The logged-in user's ID
+            added: Line item documents that were written
+            removed: Line item documents that were deleted or replaced
+        """
+        increments: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        examples: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+
+        for items, sign in ((added, 1), (removed, -1)):
+            for item in items:
+                category_id = item.get("category_id")
+                if not category_id:
+                    continue
+                name = item.get("name", "")
+                owner_slot = item.get("owner_slot", "user1")
+                for entry_key in cls.entry_keys(name):
+                    inc = increments[entry_key]
+                    inc[f"category_counts.{category_id}"] += sign
+                    inc[f"owner_counts.{owner_slot}"] += sign
+                    if sign > 0 and len(examples[entry_key]) < MAX_EXAMPLES:
+                        examples[entry_key].append(name)
+
+        operations = []
+        for (kind, key), inc in increments.items():
+            changed = {field: value for field, value in inc.items() if value}
+            if not changed:
+                continue
+            update: Dict[str, Any] = {"$inc": changed}
+            if examples.get((kind, key)):
+                update["$push"] = {"examples": {"$each": examples[(kind, key)], "$slice": MAX_EXAMPLES}}
+            operations.append(UpdateOne(
+                {"user_id": user_id, "kind": kind, "key": key},
+                update,
+                upsert=True,
+            ))
+
+        if operations:
+            await merchant_match_index_collection.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def delete_user_index(user_id: str) -> int:
+        """Drop a user's whole index. Returns the number of entries removed."""
+        result = await merchant_match_index_collection.delete_many({"user_id": user_id})
+        return result.deleted_count
+
+    @classmethod
+    def build_entries(cls, items: Iterable[dict]) -> List[Dict[str, Any]]:
+        """
+        Compute index entries from line items.
+
+        Args:
+            items: Line items with name, category_id and owner_slot
+
+        Returns:
+            One dict per (kind, key) with category_counts, owner_counts and examples
+        """
+        entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for item in items:
+            category_id = item.get("category_id")
+            if not category_id:
+                continue
+
+            category_key = str(category_id)
+            name = item.get("name", "")
+            owner_slot = item.get("owner_slot", "user1")
+            for kind, key in cls.entry_keys(name):
+                entry = entries.setdefault(
+                    (kind, key),
+                    {"category_counts": defaultdict(int), "owner_counts": defaultdict(int), "examples": []},
+                )
+                entry["category_counts"][category_key] += 1
+                entry["owner_counts"][owner_slot] += 1
+                if len(entry["examples"]) < MAX_EXAMPLES:
+                    entry["examples"].append(name)
+
+        return [
+            {
+                "kind": kind,
+                "key": key,
+                "category_counts": dict(entry["category_counts"]),
+                "owner_counts": dict(entry["owner_counts"]),
+                "examples": entry["examples"],
+            }
+            for (kind, key), entry in entries.items()
+        ]
+
+    @classmethod
+    async def rebuild(cls, user_id: str) -> int:
+        """
+        Recompute a user's index from their line items.
+
+        Args:
+            user_id: The user whose index to rebuild
+
+        Returns:
+            Number of entries written
+        """
+        cursor = budget_line_items_collection.find(
+            {"user_id": user_id},
+            {"name": 1, "category_id": 1, "owner_slot": 1},
+        )
+        documents = [
+            {"user_id": user_id, **entry}
+            for entry in cls.build_entries(await cursor.to_list(length=None))
+        ]
+
+        await cls.delete_user_index(user_id)
+
+        for start in range(0, len(documents), REBUILD_BATCH_SIZE):
+            await merchant_match_index_collection.bulk_write(
+                [InsertOne(document) for document in documents[start:start + REBUILD_BATCH_SIZE]],
+                ordered=False,
+            )
+
+        # Written last so an interrupted rebuild is retried on the next pass
+        await merchant_match_index_collection.update_one(
+            {"user_id": user_id, "kind": BUILT_MARKER, "key": ""},
+            {"$set": {"built_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        logger.info(f"Rebuilt merchant match index for {user_id}: {len(documents)} entries")
+        return len(documents)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @classmethod
+    async def load(
+        cls,
+        user_id: str,
+        descriptions: Iterable[str],
+        requested: Optional[set] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the index entries a set of statement descriptions can match.
+
+        Only the keys the descriptions map to are fetched, in one query that
+        also checks for the built marker. A user without one has their index
+        built first.
+
+        Args:
+            user_id: The logged-in user's ID
+            descriptions: Statement row descriptions about to be suggested
+            requested: Optional set of (kind, key) pairs already loaded by an
+                earlier batch; they are skipped, and new ones are added to it
+
+        Returns:
+            Dict with exact_map, phrase_map and token_map, each mapping a key
+            to its category_counts, owner_counts and examples
+        """
+        keys_by_kind: Dict[str, set] = defaultdict(set)
+        for description in descriptions:
+            for kind, key in cls.entry_keys(description):
+                if requested is not None:
+                    if (kind, key) in requested:
+                        continue
+                    requested.add((kind, key))
+                keys_by_kind[kind].add(key)
+
+        query = {
+            "user_id": user_id,
+            "$or": [{"kind": BUILT_MARKER}] + [
+                {"kind": kind, "key": {"$in": list(keys)}}
+                for kind, keys in keys_by_kind.items()
+            ],
+        }
+
+        documents = await merchant_match_index_collection.find(query).to_list(length=None)
+        if not any(document["kind"] == BUILT_MARKER for document in documents):
+            await cls.rebuild(user_id)
+            documents = await merchant_match_index_collection.find(query).to_list(length=None)
+
+        return cls.index_from_entries(documents)
+
+    @classmethod
+    def index_from_entries(cls, documents: Iterable[dict]) -> Dict[str, Dict[str, Any]]:
+        """Group stored entries into the exact/phrase/token maps suggestions read."""
+        indexes: Dict[str, Dict[str, Any]] = {name: {} for name in INDEX_KINDS.values()}
+        for document in documents:
+            entry = cls._live_entry(document)
+            if entry:
+                indexes[INDEX_KINDS[document["kind"]]][document["key"]] = entry
+        return indexes
+
+    @classmethod
+    def _live_entry(cls, document: dict) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a stored entry for suggestions; None if nothing is left.
+
+        Counts that decrements brought to zero are dropped, and the winning
+        category and owner are resolved here once per entry, so scoring a
+        statement row is a dictionary lookup per matched key.
+        """
+        if document["kind"] not in INDEX_KINDS:
+            return None
+        category_counts = {
+            category_id: count
+            for category_id, count in document.get("category_counts", {}).items()
+            if count > 0
+        }
+        if not category_counts:
+            return None
+        owner_counts = {
+            owner: count
+            for owner, count in document.get("owner_counts", {}).items()
+            if count > 0
+        }
+        return {
+            "category_counts": category_counts,
+            "owner_counts": owner_counts,
+            "examples": document.get("examples", []),
+            "top_category": cls.top_choice(category_counts),
+            "top_owner": cls.top_choice(owner_counts),
+        }
+
+    @staticmethod
+    def top_choice(counts: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """
+        The highest count with its share of the total and lead over the runner-up.
+
+        Ties go to the key seen first.
+        """
+        if not counts:
+            return None
+
+        top_value = None
+        top_count = second_count = 0
+        total = 0
+        for value, count in counts.items():
+            total += count
+            if top_value is None or count > top_count:
+                top_value, top_count, second_count = value, count, top_count
+            elif count > second_count:
+                second_count = count
+
+        return {
+            "value": top_value,
+            "count": top_count,
+            "total": total,
+            "ratio": top_count / total if total else 0,
+            "margin": top_count - second_count,
+        }
@@ -0,0 +1,401 @@
+"""
+Rollup Service
+Maintains the budget_rollups collection: one small document per (user, month)
+holding line item sums by category type and owner slot, plus per-category sums.
+
+Document shape:
+    {
+        "user_id": "...",
+        "month": "2026-01",
+        "totals": {"expense": {"shared": 1200.0, "user1": 300.0}, ...},
+        "categories": {"<category_id>": 1500.0, ...},
+        "item_count": 12,
+        "updated_at": datetime,
+    }
+
+Every write path that inserts, updates or deletes budget line items reports
+the change through apply_changes, which folds it into the affected months
+with atomic $inc updates. A category type change moves that category's sums
+between type buckets the same way. rebuild/verify recompute rollups from the
+raw line items to repair or detect drift.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from app.database import (
+    budgets_collection,
+    budget_line_items_collection,
+    budget_rollups_collection,
+    categories_collection,
+)
+from app.services.data_version_service import DataVersionService
+
+logger = logging.getLogger(__name__)
+
+# Amount differences below this are treated as floating point noise by verify
+DRIFT_TOLERANCE = 0.005
+
+
+class RollupService:
+    """Service for maintaining and reading budget rollups"""
+
+    @staticmethod
+    async def apply_changes(
+        user_id: str,
+        added: Iterable[dict] = (),
+        removed: Iterable[dict] = (),
+        budget_months: Optional[Dict[ObjectId, str]] = None,
+    ) -> None:
+        """
+        Fold inserted and deleted line items into the user's rollups.
+
+        An update is reported as the old document in removed and the new one
+        in added. Items only need budget_id, category_id, amount and owner_slot;
+        category_type is read from the item when present and looked up otherwise.
+
+        Args:
+            user_id: The logged-in user's ID
+            added: Line item documents that were written
+            removed: Line item documents that were deleted or replaced
+            budget_months: Optional budget_id -> month map to skip the budget lookup
+        """
+        changes = [(item, 1) for item in added] + [(item, -1) for item in removed]
+        if not changes:
+            return
+
+        months = dict(budget_months or {})
+        missing_budget_ids = list({
+            item["budget_id"] for item, _ in changes if item.get("budget_id") not in months
+        })
+        if missing_budget_ids:
+            cursor = budgets_collection.find(
+                {"_id": {"$in": missing_budget_ids}, "user_id": user_id},
+                {"month": 1},
+            )
+            async for budget in cursor:
+                months[budget["_id"]] = budget["month"]
+
+        category_ids = list({
+            item["category_id"]
+            for item, _ in changes
+            if item.get("category_id") and not item.get("category_type")
+        })
+        category_types: Dict[ObjectId, str] = {}
+        if category_ids:
+            cursor = categories_collection.find({"_id": {"$in": category_ids}}, {"type": 1})
+            async for category in cursor:
+                category_types[category["_id"]] = category.get("type")
+
+        increments: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for item, sign in changes:
+            month = months.get(item.get("budget_id"))
+            category_type = item.get("category_type") or category_types.get(item.get("category_id"))
+            if not month or not category_type:
+                # Items without a budget or category never show up in analytics
+                continue
+
+            amount = sign * float(item.get("amount", 0) or 0)
+            owner_slot = item.get("owner_slot") or "user1"
+            inc = increments[month]
+            inc[f"totals.{category_type}.{owner_slot}"] += amount
+            inc[f"categories.{item['category_id']}"] += amount
+            inc["item_count"] += sign
+
+        if not increments:
+            return
+
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "month": month},
+                {"$inc": dict(inc), "$set": {"updated_at": now}},
+                upsert=True,
+            )
+            for month, inc in increments.items()
+        ]
+        await budget_rollups_collection.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def move_category_type(
+        user_id: str,
+        category_id: ObjectId,
+        old_type: str,
+        new_type: str,
+    ) -> None:
+        """
+        Move a category's sums from one type bucket to another.
+
+        Only the months the category has items in are touched, with $inc
+        updates, so line item writes landing at the same time are not lost.
+
+        Args:
+            user_id: The logged-in user's ID
+            category_id: The category whose type changed
+            old_type: Type its items were counted under
+            new_type: Type they are counted under from now on
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id, "category_id": category_id}},
+            {
+                "$group": {
+                    "_id": {"budget_id": "$budget_id", "owner_slot": "$owner_slot"},
+                    "total": {"$sum": "$amount"},
+                }
+            },
+        ]
+        groups = await budget_line_items_collection.aggregate(pipeline).to_list(length=None)
+        if not groups:
+            return
+
+        months: Dict[ObjectId, str] = {}
+        cursor = budgets_collection.find(
+            {"_id": {"$in": list({group["_id"]["budget_id"] for group in groups})}, "user_id": user_id},
+            {"month": 1},
+        )
+        async for budget in cursor:
+            months[budget["_id"]] = budget["month"]
+
+        increments: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for group in groups:
+            month = months.get(group["_id"]["budget_id"])
+            if not month:
+                continue
+            owner_slot = group["_id"].get("owner_slot") or "user1"
+            increments[month][f"totals.{old_type}.{owner_slot}"] -= group["total"]
+            increments[month][f"totals.{new_type}.{owner_slot}"] += group["total"]
+
+        if not increments:
+            return
+
+        now = datetime.now(timezone.utc)
+        await budget_rollups_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "month": month},
+                    {"$inc": dict(inc), "$set": {"updated_at": now}},
+                )
+                for month, inc in increments.items()
+            ],
+            ordered=False,
+        )
+
+    @staticmethod
+    async def rename_month(user_id: str, old_month: str, new_month: str) -> None:
+        """Move a month's rollup when its budget is re-dated."""
+        await budget_rollups_collection.update_one(
+            {"user_id": user_id, "month": old_month},
+            {"$set": {"month": new_month, "updated_at": datetime.now(timezone.utc)}},
+        )
+
+    @staticmethod
+    async def delete_month(user_id: str, month: str) -> None:
+        """Drop a month's rollup when its budget and items are deleted."""
+        await budget_rollups_collection.delete_one({"user_id": user_id, "month": month})
+
+    @staticmethod
+    async def delete_user_rollups(user_id: str) -> int:
+        """Drop every rollup for a user. Returns the number removed."""
+        result = await budget_rollups_collection.delete_many({"user_id": user_id})
+        return result.deleted_count
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def get_month_rollup(user_id: str, month: str) -> Optional[dict]:
+        """Get the rollup document for one month, if any items were ever saved."""
+        return await budget_rollups_collection.find_one({"user_id": user_id, "month": month})
+
+    @staticmethod
+    async def get_month_rollups(user_id: str, months: List[str]) -> Dict[str, dict]:
+        """Get the rollup documents for several months in one query, keyed by month."""
+        cursor = budget_rollups_collection.find({"user_id": user_id, "month": {"$in": months}})
+        return {rollup["month"]: rollup async for rollup in cursor}
+
+    @staticmethod
+    async def get_lifetime_savings(user_id: str) -> Dict[str, float]:
+        """
+        Sum shared savings and fun savings over all of the user's months.
+
+        Reads one small rollup document per month instead of every line item.
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {
+                "$group": {
+                    "_id": None,
+                    "shared": {"$sum": {"$ifNull": ["$totals.savings.shared", 0]}},
+                    "fun": {
+                        "$sum": {
+                            "$add": [
+                                {"$ifNull": ["$totals.fun.user1", 0]},
+                                {"$ifNull": ["$totals.fun.user2", 0]},
+                                {"$ifNull": ["$totals.fun.shared", 0]},
+                            ]
+                        }
+                    },
+                }
+            },
+        ]
+        result = await budget_rollups_collection.aggregate(pipeline).to_list(length=1)
+        return {
+            "shared": result[0]["shared"] if result else 0.0,
+            "fun": result[0]["fun"] if result else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Rebuild / verify
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def compute_rollups(user_id: Optional[str] = None) -> Dict[tuple, dict]:
+        """
+        Recompute rollups from raw line items.
+
+        Args:
+            user_id: Limit to one user, or None for every user
+
+        Returns:
+            Dict keyed by (user_id, month) with rollup documents (without _id)
+        """
+        match: Dict[str, Any] = {"user_id": user_id} if user_id else {}
+        budget_months: Dict[ObjectId, str] = {}
+        async for budget in budgets_collection.find(match, {"month": 1}):
+            budget_months[budget["_id"]] = budget["month"]
+
+        # Line items carry their category's type, so no join is needed.
+        # Items whose category no longer exists have no type and are skipped.
+        pipeline = [
+            {"$match": {**match, "category_type": {"$ne": None}}},
+            {
+                "$group": {
+                    "_id": {
+                        "user_id": "$user_id",
+                        "budget_id": "$budget_id",
+                        "type": "$category_type",
+                        "owner_slot": "$owner_slot",
+                        "category_id": "$category_id",
+                    },
+                    "total": {"$sum": "$amount"},
+                    "count": {"$sum": 1},
+                }
+            },
+        ]
+
+        rollups: Dict[tuple, dict] = {}
+        async for group in budget_line_items_collection.aggregate(pipeline):
+            key = group["_id"]
+            month = budget_months.get(key["budget_id"])
+            if not month:
+                # Orphaned items never show up in analytics
+                continue
+            doc = rollups.setdefault(
+                (key["user_id"], month),
+                {
+                    "user_id": key["user_id"],
+                    "month": month,
+                    "totals": {},
+                    "categories": {},
+                    "item_count": 0,
+                },
+            )
+            owner_slot = key.get("owner_slot") or "user1"
+            type_totals = doc["totals"].setdefault(key["type"], {})
+            type_totals[owner_slot] = type_totals.get(owner_slot, 0.0) + group["total"]
+            category_key = str(key["category_id"])
+            doc["categories"][category_key] = doc["categories"].get(category_key, 0.0) + group["total"]
+            doc["item_count"] += group["count"]
+
+        return rollups
+
+    @staticmethod
+    async def rebuild(user_id: Optional[str] = None) -> int:
+        """
+        Replace stored rollups with freshly computed ones.
+
+        Each month is replaced in place (upserted if missing) and months
+        with no items left are deleted, so the unique (user_id, month) index
+        never sees a second document for a month that is being written.
+
+        Args:
+            user_id: Limit to one user, or None for every user
+
+        Returns:
+            Number of rollup documents written
+        """
+        rollups = await RollupService.compute_rollups(user_id)
+
+        now = datetime.now(timezone.utc)
+        operations: List[Any] = [
+            ReplaceOne(
+                {"user_id": doc_user_id, "month": month},
+                {**doc, "updated_at": now},
+                upsert=True,
+            )
+            for (doc_user_id, month), doc in rollups.items()
+        ]
+        cursor = budget_rollups_collection.find(
+            {"user_id": user_id} if user_id else {},
+            {"user_id": 1, "month": 1},
+        )
+        async for stored in cursor:
+            if (stored["user_id"], stored["month"]) not in rollups:
+                operations.append(DeleteOne({"_id": stored["_id"]}))
+        if operations:
+            await budget_rollups_collection.bulk_write(operations, ordered=False)
+        # Repaired drift changes what the dashboard shows
+        if user_id:
+            await DataVersionService.bump(user_id)
+        else:
+            await DataVersionService.bump_all()
+        logger.info(f"Rebuilt {len(rollups)} budget rollups" + (f" for user {user_id}" if user_id else ""))
+        return len(rollups)
+
+    @staticmethod
+    async def verify(user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Compare stored rollups against raw line items.
+
+        Args:
+            user_id: Limit to one user, or None for every user
+
+        Returns:
+            One entry per drifted (user, month, field), empty when consistent
+        """
+        expected = await RollupService.compute_rollups(user_id)
+        stored: Dict[tuple, dict] = {}
+        async for doc in budget_rollups_collection.find({"user_id": user_id} if user_id else {}):
+            stored[(doc["user_id"], doc["month"])] = doc
+
+        drift: List[Dict[str, Any]] = []
+        for key in sorted(set(expected) | set(stored)):
+            want = RollupService._flatten(expected.get(key, {}))
+            have = RollupService._flatten(stored.get(key, {}))
+            for field in sorted(set(want) | set(have)):
+                if abs(want.get(field, 0.0) - have.get(field, 0.0)) > DRIFT_TOLERANCE:
+                    drift.append({
+                        "user_id": key[0],
+                        "month": key[1],
+                        "field": field,
+                        "expected": want.get(field, 0.0),
+                        "stored": have.get(field, 0.0),
+                    })
+        return drift
+
+    @staticmethod
+    def _flatten(doc: dict) -> Dict[str, float]:
+        """Flatten a rollup document's numeric fields into dotted paths."""
+        flat: Dict[str, float] = {}
+        for category_type, slots in (doc.get("totals") or {}).items():
+            for owner_slot, amount in slots.items():
+                flat[f"totals.{category_type}.{owner_slot}"] = amount
+        for category_id, amount in (doc.get("categories") or {}).items():
+            flat[f"categories.{category_id}"] = amount
+        flat["item_count"] = doc.get("item_count", 0)
+        return flat
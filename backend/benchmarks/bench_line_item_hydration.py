@@ -0,0 +1,128 @@
+"""
+Benchmark category hydration in BudgetLineItemService.get_line_items.
+
+Seeds one budget with N line items spread over 20 categories, then times
+get_line_items(include_category=True) and counts the category queries it
+issues. With batched hydration the category round trips stay at one for every
+N, so latency only grows with the cost of decoding and serializing the items
+themselves, not with one MongoDB round trip per item.
+
+Needs a running MongoDB. Point it at a scratch database:
+
+    DATABASE_NAME=pocketflow_bench python -m benchmarks.bench_line_item_hydration [--runs 5]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.database import (
+    budget_line_items_collection,
+    budgets_collection,
+    categories_collection,
+)
+from app.services.budget_line_item_service import BudgetLineItemService
+
+BENCH_USER_ID = "bench_line_item_hydration"
+SIZES = (10, 100, 1000, 5000)
+CATEGORY_COUNT = 20
+
+
+class _CountingCategories:
+    """Counts find/find_one calls on the categories collection."""
+
+    def __init__(self, counter: Counter):
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(categories_collection, name)
+        if name not in ("find", "find_one"):
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter[name] += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+async def _cleanup() -> None:
+    for collection in (budget_line_items_collection, budgets_collection, categories_collection):
+        await collection.delete_many({"user_id": BENCH_USER_ID})
+
+
+async def _seed(size: int) -> str:
+    """Create a budget with size items and return its ID."""
+    now = datetime.now(timezone.utc)
+    categories = await categories_collection.insert_many([
+        {
+            "user_id": BENCH_USER_ID,
+            "name": f"Bench {index}",
+            "type": "expense",
+            "icon": "",
+            "color": "",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(CATEGORY_COUNT)
+    ])
+    budget = await budgets_collection.insert_one({
+        "user_id": BENCH_USER_ID,
+        "month": "2000-01",
+        "created_at": now,
+        "updated_at": now,
+    })
+    await budget_line_items_collection.insert_many([
+        {
+            "user_id": BENCH_USER_ID,
+            "budget_id": budget.inserted_id,
+            "name": f"Item {index}",
+            "category_id": categories.inserted_ids[index % CATEGORY_COUNT],
+            "category_type": "expense",
+            "amount": 10.0,
+            "owner_slot": "shared",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(size)
+    ])
+    return str(budget.inserted_id)
+
+
+async def _measure(budget_id: str, runs: int) -> tuple[float, int]:
+    """Return the median latency in ms and the category queries per call."""
+    timings = []
+    counter: Counter = Counter()
+    with patch(
+        "app.services.budget_line_item_service.categories_collection",
+        _CountingCategories(counter),
+    ):
+        for _ in range(runs):
+            started = time.perf_counter()
+            await BudgetLineItemService.get_line_items(
+                BENCH_USER_ID, budget_id=budget_id, include_category=True
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), sum(counter.values()) // runs
+
+
+async def main():
+    runs = int(sys.argv[sys.argv.index("--runs") + 1]) if "--runs" in sys.argv else 5
+
+    print(f"{'items':>6}  {'median ms':>10}  {'ms / 1k items':>13}  {'category queries':>16}")
+    try:
+        for size in SIZES:
+            await _cleanup()
+            budget_id = await _seed(size)
+            median_ms, queries = await _measure(budget_id, runs)
+            print(f"{size:>6}  {median_ms:>10.1f}  {median_ms / size * 1000:>13.1f}  {queries:>16}")
+    finally:
+        await _cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark the suggestion process pool in ImportService.suggest_batches.
+
+Suggests a 50k-row statement against a 50k-item history three ways:
+
+- in-loop: the whole pass on the event loop, as small uploads still run,
+- pooled with 1, 2, 4, ... workers up to the core count.
+
+While each pass runs, a probe coroutine sleeps PROBE_INTERVAL and records how
+late it wakes up, standing in for the other requests on the worker. In-loop
+scoring shows lag in the size of a batch's scoring time. Pooled passes should
+keep lag near zero and cut wall time roughly by the worker count until the
+per-batch index lookups on the loop dominate.
+
+No MongoDB is needed: MerchantIndexService.load is patched to serve entries
+from an index built in memory. Run from backend/:
+
+    python -m benchmarks.bench_suggestion_pool [--rows 50000] [--runs 3]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from app.services import import_service
+from app.services.import_service import ImportService
+from app.services.merchant_index_service import INDEX_KINDS, MerchantIndexService
+from benchmarks.test_bench_import_suggestions import (
+    HISTORY_ITEMS,
+    SEED,
+    _description,
+    _merchants,
+)
+
+PROBE_INTERVAL = 0.005
+
+
+def _dataset(rows: int):
+    rng = random.Random(SEED)
+    merchants = _merchants(rng)
+    history = []
+    for _ in range(HISTORY_ITEMS):
+        name, category_id, owner_slot = rng.choice(merchants)
+        history.append({"name": _description(rng, name), "category_id": category_id, "owner_slot": owner_slot})
+    statement = [
+        {"description": _description(rng, rng.choice(merchants)[0]), "category_id": None}
+        for _ in range(rows)
+    ]
+    return MerchantIndexService.build_entries(history), statement
+
+
+def _patched_load(entries):
+    index = MerchantIndexService.index_from_entries(entries)
+
+    async def load(user_id, descriptions, requested=None):
+        loaded = {name: {} for name in INDEX_KINDS.values()}
+        for description in descriptions:
+            for kind, key in MerchantIndexService.entry_keys(description):
+                if requested is not None:
+                    if (kind, key) in requested:
+                        continue
+                    requested.add((kind, key))
+                entry = index[INDEX_KINDS[kind]].get(key)
+                if entry:
+                    loaded[INDEX_KINDS[kind]][key] = entry
+        # Stand in for the MongoDB round trip
+        await asyncio.sleep(0)
+        return loaded
+
+    return load
+
+
+async def _probe(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def _timed_pass(statement):
+    MerchantIndexService.clear_cache()
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    started = time.perf_counter()
+    await ImportService.apply_historical_suggestions("bench_user", statement)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return elapsed, max(lags, default=0.0), statistics.median(lags) if lags else 0.0
+
+
+async def _run(label, statement, runs):
+    results = [await _timed_pass(statement) for _ in range(runs)]
+    elapsed = statistics.median(result[0] for result in results)
+    max_lag = max(result[1] for result in results)
+    median_lag = statistics.median(result[2] for result in results)
+    print(f"{label:>12} {elapsed * 1000:>10.0f} {median_lag * 1000:>14.2f} {max_lag * 1000:>11.2f}")
+    return elapsed
+
+
+async def main(rows: int, runs: int):
+    entries, statement = _dataset(rows)
+    worker_counts = sorted({1, 2, 4, 8, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+
+    print(f"{rows} rows, {runs} runs each, {os.cpu_count()} cores")
+    print(f"{'mode':>12} {'wall ms':>10} {'p50 lag ms':>14} {'max lag ms':>11}")
+    with patch.object(MerchantIndexService, "load", _patched_load(entries)):
+        with patch.object(import_service, "PARALLEL_SUGGESTION_MIN_ROWS", rows + 1):
+            baseline = await _run("in-loop", statement, runs)
+
+        for workers in worker_counts:
+            import_service.shutdown_suggestion_pool()
+            with patch.object(import_service, "SUGGESTION_WORKERS", workers):
+                # Start the workers before timing; spawning is a one-off cost
+                await asyncio.gather(*[
+                    asyncio.get_running_loop().run_in_executor(
+                        import_service._suggestion_executor(), time.sleep, 0.1
+                    )
+                    for _ in range(workers)
+                ])
+                elapsed = await _run(f"{workers} worker(s)", statement, runs)
+            print(f"{'':>12} speedup vs in-loop: {baseline / elapsed:.2f}x")
+    import_service.shutdown_suggestion_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.runs))
@@ -0,0 +1,111 @@
+"""
+Benchmark CSV statement parsing.
+
+Generates 100k-row synthetic statements in the two shapes we see most and
+times the parsing paths that share ImportService's engine:
+
+- ImportService.parse_csv with column and delimiter detection,
+- ImportService.parse_csv with a compiled bank profile (Nordea layout), and
+- the AI parse_csv_data tool, which runs the same engine.
+
+Merchants repeat the way they do in real exports, so the memoized description
+normalization used for fingerprints is part of what is measured. No MongoDB
+is needed; profile lookup in the AI tool is patched out. Run with
+pytest-benchmark:
+
+    python -m pytest benchmarks/test_bench_csv_parsing.py --benchmark-columns=mean,stddev,rounds
+
+Divide a mean by STATEMENT_ROWS for the per-row cost.
+"""
+
+import asyncio
+import random
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.ai.tools import parse_csv_data
+from app.services.bank_profile_service import DANISH_BANK_PROFILES, BankProfileService
+from app.services.import_service import ImportService
+from app.services.merchant_index_service import MerchantIndexService
+
+STATEMENT_ROWS = 100_000
+MERCHANT_COUNT = 2_000
+SEED = 7
+
+CITIES = ["AALBORG", "AARHUS", "KØBENHAVN", "ODENSE", "ESBJERG", "RANDERS", "KOLDING", "VEJLE"]
+PREFIXES = ["", "VISA ", "MOBILEPAY ", "DK ", "KORT "]
+SYLLABLES = ["net", "fø", "lid", "bil", "ka", "rem", "ma", "kvi", "ick", "dan", "sal", "tog", "bo", "ler", "hus"]
+
+NORDEA = next(profile for profile in DANISH_BANK_PROFILES if profile["name"] == "Nordea")
+
+
+def _danish_amount(value: float) -> str:
+    """1234.5 -> '1.234,50'"""
+    return f"{value:,.2f}".translate(str.maketrans(",.", ".,"))
+
+
+def _merchants(rng: random.Random) -> list[str]:
+    merchants = set()
+    while len(merchants) < MERCHANT_COUNT:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).upper()
+        store = f" {rng.randint(1000, 9999)}" if rng.random() < 0.6 else ""
+        merchants.add(f"{rng.choice(PREFIXES)}{name}{store} {rng.choice(CITIES)}")
+    return sorted(merchants)
+
+
+@pytest.fixture(scope="module")
+def statements():
+    rng = random.Random(SEED)
+    merchants = _merchants(rng)
+
+    detected = ["Dato;Tekst;Beløb;Saldo"]
+    nordea = [";".join(NORDEA["header"])]
+    balance = 25_000.0
+    for index in range(STATEMENT_ROWS):
+        day = f"{index % 28 + 1:02d}"
+        merchant = rng.choice(merchants)
+        amount = -round(rng.uniform(5, 2500), 2) if rng.random() < 0.95 else round(rng.uniform(1000, 30000), 2)
+        balance += amount
+        detected.append(f"{day}.01.2026;{merchant};{_danish_amount(amount)} kr.;{_danish_amount(balance)}")
+        nordea.append(
+            f"2026/01/{day};{_danish_amount(amount)};;{merchant};;{merchant};{_danish_amount(balance)};DKK;"
+        )
+
+    return {
+        "detected": "\n".join(detected) + "\n",
+        "nordea": "\n".join(nordea) + "\n",
+    }
+
+
+def _parse(content, profile=None):
+    # Start every round without memoized descriptions, as a fresh worker would
+    MerchantIndexService.clear_cache()
+    return ImportService.parse_csv(content, profile)
+
+
+def test_parse_detected_columns(benchmark, statements):
+    benchmark.extra_info["statement_rows"] = STATEMENT_ROWS
+    result = benchmark.pedantic(_parse, args=(statements["detected"],), rounds=3, iterations=1)
+    assert result["count"] == STATEMENT_ROWS
+
+
+def test_parse_with_profile(benchmark, statements):
+    profile = BankProfileService.compile({
+        **NORDEA,
+        "signature": BankProfileService.signature(NORDEA["header"], NORDEA["delimiter"]),
+    })
+    benchmark.extra_info["statement_rows"] = STATEMENT_ROWS
+    result = benchmark.pedantic(_parse, args=(statements["nordea"], profile), rounds=3, iterations=1)
+    assert result["count"] == STATEMENT_ROWS
+
+
+def test_ai_parse_csv_data(benchmark, statements):
+    def run():
+        MerchantIndexService.clear_cache()
+        return asyncio.run(parse_csv_data("bench_user", csv_content=statements["detected"]))
+
+    benchmark.extra_info["statement_rows"] = STATEMENT_ROWS
+    with patch.object(BankProfileService, "match", AsyncMock(return_value=None)):
+        result = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert result["ok"] and result["data"]["count"] == STATEMENT_ROWS
@@ -0,0 +1,125 @@
+"""
+Benchmark the CSV import suggestion engine.
+
+Builds a synthetic 50k-item line item history and a 10k-row bank statement,
+then times the two CPU-bound halves of a suggestion pass:
+
+- building the in-memory match index from the history, and
+- suggesting a category and owner for every statement row.
+
+No MongoDB is needed; the index is built from the same entries
+MerchantIndexService stores. Run with pytest-benchmark:
+
+    python -m pytest benchmarks/test_bench_import_suggestions.py --benchmark-columns=mean,stddev,rounds
+
+Divide the suggestion mean by STATEMENT_ROWS for the per-row cost.
+"""
+
+import random
+
+import pytest
+
+from app.services.import_service import ImportService
+from app.services.merchant_index_service import MerchantIndexService
+
+HISTORY_ITEMS = 50_000
+STATEMENT_ROWS = 10_000
+MERCHANT_COUNT = 400
+CATEGORY_COUNT = 25
+SEED = 42
+
+CITIES = ["AALBORG", "AARHUS", "KOBENHAVN", "ODENSE", "ESBJERG", "RANDERS", "KOLDING", "VEJLE"]
+PREFIXES = ["", "VISA ", "MOBILEPAY ", "DK ", "KORT "]
+SUFFIXES = ["", " APS", " A/S", " DK", " ONLINE"]
+SYLLABLES = ["net", "fo", "lid", "bil", "ka", "rem", "ma", "kvi", "ick", "dan", "sal", "tog", "bo", "ler", "hus"]
+
+
+def _merchants(rng: random.Random) -> list[tuple[str, str, str]]:
+    """Merchant names, each with a usual category and owner."""
+    merchants = []
+    seen = set()
+    while len(merchants) < MERCHANT_COUNT:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).upper()
+        if name in seen:
+            continue
+        seen.add(name)
+        merchants.append((
+            name,
+            f"{rng.randrange(CATEGORY_COUNT):024x}",
+            rng.choice(["user1", "user2", "shared"]),
+        ))
+    return merchants
+
+
+def _description(rng: random.Random, merchant: str) -> str:
+    """A bank-statement style description for a merchant."""
+    store = str(rng.randint(1000, 9999)) if rng.random() < 0.6 else ""
+    city = rng.choice(CITIES) if rng.random() < 0.5 else ""
+    parts = [rng.choice(PREFIXES) + merchant + rng.choice(SUFFIXES), store, city]
+    return " ".join(part for part in parts if part)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = random.Random(SEED)
+    merchants = _merchants(rng)
+
+    history = []
+    for _ in range(HISTORY_ITEMS):
+        name, category_id, owner_slot = rng.choice(merchants)
+        if rng.random() < 0.1:
+            # Some merchants get recategorized now and then
+            category_id = f"{rng.randrange(CATEGORY_COUNT):024x}"
+        history.append({
+            "name": _description(rng, name),
+            "category_id": category_id,
+            "owner_slot": owner_slot,
+        })
+
+    statement = []
+    for _ in range(STATEMENT_ROWS):
+        if rng.random() < 0.85:
+            name = rng.choice(merchants)[0]
+        else:
+            # Merchants the user has never seen
+            name = "".join(rng.choice(SYLLABLES) for _ in range(4)).upper()
+        statement.append(_description(rng, name))
+
+    return {"history": history, "statement": statement}
+
+
+@pytest.fixture(scope="module")
+def indexes(dataset):
+    return MerchantIndexService.index_from_entries(
+        MerchantIndexService.build_entries(dataset["history"])
+    )
+
+
+def _suggest_all(statement, indexes):
+    return [
+        ImportService._suggest_mapping_for_description(description, indexes)
+        for description in statement
+    ]
+
+
+def test_build_index(benchmark, dataset):
+    benchmark.extra_info["history_items"] = HISTORY_ITEMS
+    benchmark.pedantic(
+        lambda: MerchantIndexService.index_from_entries(
+            MerchantIndexService.build_entries(dataset["history"])
+        ),
+        rounds=3,
+        iterations=1,
+    )
+
+
+def test_suggest_statement(benchmark, dataset, indexes):
+    benchmark.extra_info["statement_rows"] = STATEMENT_ROWS
+    suggestions = benchmark.pedantic(
+        _suggest_all,
+        args=(dataset["statement"], indexes),
+        rounds=5,
+        iterations=1,
+    )
+    # Guard against benchmarking a pass that suggests nothing
+    assert sum(1 for suggestion in suggestions if suggestion) > STATEMENT_ROWS // 2
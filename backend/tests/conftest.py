@@ -4,8 +4,21 @@ import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from datetime import datetime, timezone
 from app.main import app
-from app.database import database, categories_collection, budgets_collection, budget_line_items_collection
+from app.database import (
+    database,
+    categories_collection,
+    budgets_collection,
+    budget_line_items_collection,
+    budget_rollups_collection,
+    user_data_versions_collection,
+    merchant_match_index_collection,
+    import_jobs_collection,
+    import_job_rows_collection,
+    bank_format_profiles_collection,
+    merchant_categorizations_collection,
+)
 from app.dependencies import get_current_user_id
+from app.services.bank_profile_service import BankProfileService
 
 
 @pytest.fixture(scope="session")
@@ -33,6 +46,14 @@ async def db_session():
     await categories_collection.delete_many({})
     await budgets_collection.delete_many({})
     await budget_line_items_collection.delete_many({})
+    await budget_rollups_collection.delete_many({})
+    await user_data_versions_collection.delete_many({})
+    await merchant_match_index_collection.delete_many({})
+    await import_jobs_collection.delete_many({})
+    await import_job_rows_collection.delete_many({})
+    await bank_format_profiles_collection.delete_many({})
+    await merchant_categorizations_collection.delete_many({})
+    BankProfileService.clear_cache()
     
     yield database
     
@@ -40,6 +61,14 @@ async def db_session():
     await categories_collection.delete_many({})
     await budgets_collection.delete_many({})
     await budget_line_items_collection.delete_many({})
+    await budget_rollups_collection.delete_many({})
+    await user_data_versions_collection.delete_many({})
+    await merchant_match_index_collection.delete_many({})
+    await import_jobs_collection.delete_many({})
+    await import_job_rows_collection.delete_many({})
+    await bank_format_profiles_collection.delete_many({})
+    await merchant_categorizations_collection.delete_many({})
+    BankProfileService.clear_cache()
 
 
 @pytest.fixture
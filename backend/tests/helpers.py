@@ -0,0 +1,40 @@
+"""
+Shared helpers for tests
+"""
+
+from collections import Counter
+
+QUERY_METHODS = {
+    "find",
+    "find_one",
+    "aggregate",
+    "count_documents",
+    "insert_one",
+    "insert_many",
+    "update_one",
+    "update_many",
+    "delete_one",
+    "delete_many",
+    "bulk_write",
+    "find_one_and_update",
+    "find_one_and_delete",
+}
+
+
+class CountingCollection:
+    """Proxy around a Motor collection that counts query-issuing calls."""
+
+    def __init__(self, collection, counter: Counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in QUERY_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter[f"{self._collection.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+
+        return counted
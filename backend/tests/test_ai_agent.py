@@ -0,0 +1,355 @@
+"""
+Tests for the AI agent's ReAct loop
+
+Tests cover:
+- Read-only tool calls from one turn running concurrently
+- Mutating tool calls acting as barriers between read-only ones
+- Tool messages keeping the order the model asked for them
+- Bounded concurrency
+- Streaming events from stream_request and /api/ai/chat/stream
+- The system prompt's static prefix and cached user names
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.ai import agent as agent_module
+from app.ai.agent import AIAgent
+from app.ai.client import LLMClient
+from app.ai.schemas import AIChatMessage, AIChatRequest
+from app.ai.tools import read_only_tools, tools_registry
+from app.database import database
+from app.dependencies import get_current_user
+from app.main import app
+from app.routes import ai as ai_routes
+
+
+def _tool_call(call_id: str, name: str, arguments: dict = None):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments or {})),
+    )
+
+
+class FakeClient:
+    """Asks for the given tool calls once, then answers with text."""
+
+    def __init__(self, tool_calls):
+        self.tool_calls = tool_calls
+        self.requests = []
+
+    async def chat(self, messages, tools=None):
+        self.requests.append(list(messages))
+        if len(self.requests) == 1:
+            return SimpleNamespace(content=None, tool_calls=self.tool_calls)
+        return SimpleNamespace(content="Done", tool_calls=None)
+
+    async def chat_stream(self, messages, tools=None):
+        message = await self.chat(messages, tools)
+        if message.content:
+            yield {"type": "token", "content": message.content}
+        yield {"type": "message", "message": message}
+
+
+class ToolRecorder:
+    """Fake tools that log when they start and finish and track overlap."""
+
+    def __init__(self):
+        self.events = []
+        self.running = 0
+        self.peak = 0
+
+    def tool(self, name: str, delay: float = 0.02):
+        async def run(user_id: str, **kwargs):
+            self.events.append(("start", name))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await asyncio.sleep(delay)
+            self.running -= 1
+            self.events.append(("end", name))
+            return {"ok": True, "data": {"tool": name}}
+        return run
+
+
+async def _run_turn(tool_calls, recorder, read_only, mutating=()):
+    registry = {name: recorder.tool(name) for name in (*read_only, *mutating)}
+    agent = AIAgent()
+    agent.client = FakeClient(tool_calls)
+    request = AIChatRequest(messages=[AIChatMessage(role="user", content="How am I doing?")])
+
+    with patch.dict(tools_registry, registry), patch.object(agent_module, "read_only_tools", set(read_only)):
+        response = await agent.process_request(request, "test_user")
+
+    return response, _tool_messages(agent.client)
+
+
+def _tool_messages(client: FakeClient) -> list:
+    """Tool messages the model was sent back after the tool turn."""
+    return [
+        message for message in client.requests[1]
+        if isinstance(message, dict) and message.get("role") == "tool"
+    ]
+
+
+@pytest.mark.asyncio
+class TestAgentToolExecution:
+    """Test suite for tool execution in AIAgent.process_request"""
+
+    async def test_read_only_calls_run_concurrently_in_order(self):
+        recorder = ToolRecorder()
+        calls = [_tool_call(f"call_{name}", name) for name in ("summary", "expenses", "goals")]
+
+        response, tool_messages = await _run_turn(calls, recorder, read_only=("summary", "expenses", "goals"))
+
+        assert recorder.peak == 3
+        assert [message["tool_call_id"] for message in tool_messages] == ["call_summary", "call_expenses", "call_goals"]
+        assert [json.loads(message["content"])["data"]["tool"] for message in tool_messages] == ["summary", "expenses", "goals"]
+        assert [call["id"] for call in response.tool_calls] == ["call_summary", "call_expenses", "call_goals"]
+
+    async def test_mutating_call_waits_for_earlier_reads(self):
+        """A write sees every read before it finished and no read after it started"""
+        recorder = ToolRecorder()
+        calls = [
+            _tool_call("1", "summary"),
+            _tool_call("2", "goals"),
+            _tool_call("3", "create_goal", {"name": "Trip"}),
+            _tool_call("4", "goals"),
+        ]
+
+        _, tool_messages = await _run_turn(calls, recorder, read_only=("summary", "goals"), mutating=("create_goal",))
+
+        write_start = recorder.events.index(("start", "create_goal"))
+        write_end = recorder.events.index(("end", "create_goal"))
+        assert ("end", "summary") in recorder.events[:write_start]
+        assert recorder.events[:write_start].count(("end", "goals")) == 1
+        assert recorder.events[write_end + 1:] == [("start", "goals"), ("end", "goals")]
+        assert [message["tool_call_id"] for message in tool_messages] == ["1", "2", "3", "4"]
+
+    async def test_concurrency_is_bounded(self):
+        recorder = ToolRecorder()
+        names = [f"read_{index}" for index in range(5)]
+        calls = [_tool_call(name, name) for name in names]
+
+        with patch.object(agent_module, "MAX_CONCURRENT_TOOL_CALLS", 2):
+            _, tool_messages = await _run_turn(calls, recorder, read_only=names)
+
+        assert recorder.peak == 2
+        assert [message["tool_call_id"] for message in tool_messages] == names
+
+    async def test_unknown_and_failing_tools_report_errors(self):
+        async def broken(user_id: str, **kwargs):
+            raise RuntimeError("boom")
+
+        agent = AIAgent()
+        agent.client = FakeClient([_tool_call("1", "broken"), _tool_call("2", "missing")])
+        request = AIChatRequest(messages=[AIChatMessage(role="user", content="Hi")])
+
+        with patch.dict(tools_registry, {"broken": broken}), patch.object(agent_module, "read_only_tools", {"broken"}):
+            await agent.process_request(request, "test_user")
+
+        contents = [json.loads(message["content"]) for message in _tool_messages(agent.client)]
+        assert contents == [
+            {"ok": False, "error": "boom"},
+            {"ok": False, "error": "Unknown tool: missing"},
+        ]
+
+    async def test_registry_marks_reads_only(self):
+        assert {"get_budget_summary", "get_expense_breakdown", "get_goals_summary"} <= read_only_tools
+        assert not {"create_goal", "update_goal", "delete_goal", "propose_budget_entries"} & read_only_tools
+        assert read_only_tools <= set(tools_registry)
+
+
+def _parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(data=SimpleNamespace(choices=[SimpleNamespace(delta=delta)]))
+
+
+def _call_part(name, arguments, call_id=None):
+    # mistralai defaults a missing index to 0
+    return SimpleNamespace(id=call_id, index=0, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+async def _stream_chunks(*chunks) -> list:
+    """Events LLMClient.chat_stream yields for the given raw stream chunks."""
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def stream_async(**params):
+        return stream()
+
+    client = LLMClient()
+    with patch.object(client.client.chat, "stream_async", stream_async):
+        return [event async for event in client.chat_stream([{"role": "user", "content": "Hi"}])]
+
+
+@pytest.mark.asyncio
+class TestAgentStreaming:
+    """Test suite for AIAgent.stream_request and the SSE endpoint"""
+
+    async def test_stream_reports_tools_then_tokens(self):
+        recorder = ToolRecorder()
+        agent = AIAgent()
+        agent.client = FakeClient([_tool_call("1", "summary"), _tool_call("2", "goals")])
+        request = AIChatRequest(messages=[AIChatMessage(role="user", content="How am I doing?")])
+
+        with patch.dict(tools_registry, {"summary": recorder.tool("summary"), "goals": recorder.tool("goals")}), \
+                patch.object(agent_module, "read_only_tools", {"summary", "goals"}):
+            events = [event async for event in agent.stream_request(request, "test_user")]
+
+        assert [event["type"] for event in events] == [
+            "tool_call_start", "tool_call_start", "tool_call_end", "tool_call_end", "token", "done",
+        ]
+        assert [event["id"] for event in events[:4]] == ["1", "2", "1", "2"]
+        assert events[2]["ok"] is True
+        assert events[4]["content"] == "Done"
+        assert events[-1]["response"].message.content == "Done"
+
+    async def test_sse_endpoint_streams_pending_action(self, async_client):
+        proposal = {
+            "ok": True,
+            "action": "confirm",
+            "data": {
+                "entries": [{
+                    "name": "Rent", "category_name": "Housing", "category_id": "c1",
+                    "category_type": "expense", "amount": 100.0, "owner_slot": "shared", "month": "2026-01",
+                }],
+                "summary": "1 entry",
+                "preview_id": "p1",
+            },
+        }
+
+        async def propose(user_id: str, **kwargs):
+            return proposal
+
+        fake = FakeClient([_tool_call("1", "propose_budget_entries")])
+        with patch.object(ai_routes.ai_agent, "client", fake), \
+                patch.dict(tools_registry, {"propose_budget_entries": propose}):
+            response = await async_client.post("/api/ai/chat/stream", json={
+                "messages": [{"role": "user", "content": "Add rent"}],
+            })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == [
+            "tool_call_start", "tool_call_end", "pending_action", "token", "done",
+        ]
+        assert events[2][1]["preview_id"] == "p1"
+        assert events[-1][1]["pending_action"]["summary"] == "1 entry"
+        assert events[-1][1]["message"]["content"] == "Done"
+
+    async def test_sse_endpoint_reports_errors(self, async_client):
+        class FailingClient(FakeClient):
+            async def chat(self, messages, tools=None):
+                raise RuntimeError("LLM unavailable")
+
+        with patch.object(ai_routes.ai_agent, "client", FailingClient([])):
+            response = await async_client.post("/api/ai/chat/stream", json={
+                "messages": [{"role": "user", "content": "Hi"}],
+            })
+
+        assert _parse_sse(response.text) == [
+            ("error", {"detail": "Error processing AI chat request: LLM unavailable"}),
+        ]
+
+    async def test_client_assembles_streamed_tool_calls(self):
+        """Tool call arguments split across chunks come back as one call"""
+        events = await _stream_chunks(
+            _chunk(content="Let me "),
+            _chunk(content="check."),
+            _chunk(tool_calls=[_call_part("get_budget_summary", '{"month": ', "abc")]),
+            _chunk(tool_calls=[_call_part("", '"2026-01"}')]),
+        )
+
+        assert [event["content"] for event in events[:-1]] == ["Let me ", "check."]
+        message = events[-1]["message"]
+        assert message.content == "Let me check."
+        assert message.tool_calls[0].id == "abc"
+        assert message.tool_calls[0].function.name == "get_budget_summary"
+        assert json.loads(message.tool_calls[0].function.arguments) == {"month": "2026-01"}
+
+    async def test_client_keeps_parallel_streamed_calls_apart(self):
+        """Whole calls in one chunk that all report index 0 stay separate calls"""
+        events = await _stream_chunks(
+            _chunk(tool_calls=[
+                _call_part("get_budget_summary", '{"month": "2026-01"}', "call_a"),
+                _call_part("get_goals_summary", '{}', "call_b"),
+            ]),
+        )
+
+        calls = events[-1]["message"].tool_calls
+        assert [(call.id, call.function.name) for call in calls] == [
+            ("call_a", "get_budget_summary"),
+            ("call_b", "get_goals_summary"),
+        ]
+        assert json.loads(calls[0].function.arguments) == {"month": "2026-01"}
+        assert json.loads(calls[1].function.arguments) == {}
+
+
+@pytest.fixture
+async def named_user(db_session):
+    result = await database["users"].insert_one({
+        "email": "anna@example.com", "full_name": "Anna", "partner_name": "Bo",
+    })
+    user_id = str(result.inserted_id)
+    yield user_id
+    agent_module.invalidate_user_names(user_id)
+    await database["users"].delete_one({"_id": result.inserted_id})
+
+
+@pytest.mark.asyncio
+class TestSystemPrompt:
+    """Test suite for AIAgent._load_system_prompt"""
+
+    async def test_prefix_is_static_across_users_and_days(self, named_user):
+        agent = AIAgent()
+
+        anna = await agent._load_system_prompt(named_user)
+        with patch.object(agent_module, "datetime") as fake_datetime:
+            fake_datetime.now.return_value = datetime(2031, 7, 1)
+            guest = await agent._load_system_prompt("test_user")
+
+        assert anna.startswith(agent.prompt_prefix) and guest.startswith(agent.prompt_prefix)
+        assert "{" not in agent.prompt_prefix
+        assert anna.endswith("- Logged-in user (user1): Anna\n- Partner (user2): Bo\n")
+        assert "- Current month: 2031-07" in guest[len(agent.prompt_prefix):]
+
+    async def test_names_are_cached_until_profile_update(self, async_client, named_user):
+        agent = AIAgent()
+        await agent._load_system_prompt(named_user)
+        await database["users"].update_one({"email": "anna@example.com"}, {"$set": {"partner_name": "Carl"}})
+
+        assert "Partner (user2): Bo" in await agent._load_system_prompt(named_user)
+
+        app.dependency_overrides[get_current_user] = lambda: "anna@example.com"
+        try:
+            response = await async_client.patch("/auth/me", json={"partner_name": "Dag"})
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+        assert response.status_code == 200
+        assert "Partner (user2): Dag" in await agent._load_system_prompt(named_user)
+
+    async def test_names_expire(self, named_user):
+        agent = AIAgent()
+        await agent._load_system_prompt(named_user)
+        await database["users"].update_one({"email": "anna@example.com"}, {"$set": {"full_name": "Anne"}})
+
+        with patch.object(agent_module, "USER_NAMES_CACHE_SECONDS", -1):
+            prompt = await agent._load_system_prompt(named_user)
+
+        assert "Logged-in user (user1): Anne" in prompt
@@ -0,0 +1,254 @@
+"""
+Tests for AI CSV uploads
+
+Tests cover:
+- Rows with confident history matches never reaching the model
+- Unresolved merchants sent once each, in batches
+- Invalid model replies leaving rows out
+- Structured output restricted to the user's categories
+- Cached merchant decisions reused on the next statement
+- Confirming the same statement twice saving each row once
+- The upload endpoint returning a stored proposal
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+
+from app.ai import csv_import
+from app.ai.csv_import import group_unresolved, process_csv_upload
+from app.database import (
+    budget_line_items_collection,
+    budgets_collection,
+    categories_collection,
+    merchant_categorizations_collection,
+)
+from app.main import app
+from app.routes import ai as ai_routes
+from app.routes.ai import get_optional_user_id
+
+STATEMENT = (
+    "Dato;Tekst;Beløb\n"
+    "01.01.2026;NETTO 1234 AALBORG;-120,00\n"
+    "02.01.2026;Netto;-80,00\n"
+    "03.01.2026;CAFE SOLO;-45,00\n"
+    "04.01.2026;Cafe Solo;-55,00\n"
+    "05.01.2026;HUSLEJE;-6.500,00\n"
+    "06.01.2026;LØN JANUAR;25.000,00\n"
+)
+
+
+class FakeClient:
+    """Categorizes merchants with a fixed description -> assignment table."""
+
+    def __init__(self, table):
+        self.table = table
+        self.requests = []
+        self.response_formats = []
+
+    async def chat(self, messages, tools=None, response_format=None):
+        self.requests.append(messages)
+        self.response_formats.append(response_format)
+        assignments = []
+        for line in messages[-1]["content"].split("\n"):
+            n, description = line.split("|")[:2]
+            assignment = self.table.get(description.lower()) or {"category_id": None, "owner_slot": "user1"}
+            assignments.append({"n": int(n), **assignment})
+        return SimpleNamespace(content=json.dumps({"assignments": assignments}), tool_calls=None)
+
+
+@pytest.fixture
+async def categories(db_session, test_user_id, sample_category):
+    groceries = await categories_collection.insert_one({"user_id": test_user_id, "name": "Groceries", "type": "expense"})
+    salary = await categories_collection.insert_one({"user_id": test_user_id, "name": "Salary", "type": "income"})
+    budget = await budgets_collection.insert_one({"user_id": test_user_id, "month": "2025-12"})
+    await budget_line_items_collection.insert_many([
+        {
+            "user_id": test_user_id,
+            "budget_id": budget.inserted_id,
+            "name": name,
+            "category_id": groceries.inserted_id,
+            "amount": 100,
+            "owner_slot": "shared",
+        }
+        for name in ("Netto", "NETTO 9999 AARHUS")
+    ])
+    return {
+        "housing": str(sample_category["_id"]),
+        "groceries": str(groceries.inserted_id),
+        "salary": str(salary.inserted_id),
+    }
+
+
+def _table(categories):
+    return {
+        "cafe solo": {"category_id": categories["groceries"], "owner_slot": "user2"},
+        "husleje": {"category_id": categories["housing"], "owner_slot": "shared"},
+        "løn januar": {"category_id": categories["salary"], "owner_slot": "user1"},
+    }
+
+
+@pytest.mark.asyncio
+class TestAICSVImport:
+    """Test suite for app.ai.csv_import"""
+
+    async def test_only_unresolved_merchants_reach_the_model(self, test_user_id, categories):
+        client = FakeClient(_table(categories))
+
+        response = await process_csv_upload(client, test_user_id, STATEMENT)
+
+        assert len(client.requests) == 1
+        prompt = client.requests[0][-1]["content"]
+        assert "NETTO" not in prompt.upper()
+        # The two cafe rows share one line
+        assert prompt.split("\n") == [
+            "1|CAFE SOLO|expense|2|100",
+            "2|HUSLEJE|expense|1|6500",
+            "3|LØN JANUAR|income|1|25000",
+        ]
+        assert categories["groceries"] in client.requests[0][0]["content"]
+
+        entries = response.pending_action.entries
+        assert [(entry.name, entry.owner_slot) for entry in entries] == [
+            ("NETTO 1234 AALBORG", "shared"),
+            ("Netto", "shared"),
+            ("CAFE SOLO", "user2"),
+            ("Cafe Solo", "user2"),
+            ("HUSLEJE", "shared"),
+            ("LØN JANUAR", "user1"),
+        ]
+        assert entries[-1].category_type == "income"
+        assert response.pending_action.preview_id
+        assert "2 matched your earlier budgets" in response.message.content
+
+    async def test_merchants_are_sent_in_batches(self, test_user_id, categories):
+        client = FakeClient(_table(categories))
+
+        with patch.object(csv_import, "MERCHANT_BATCH_SIZE", 2):
+            response = await process_csv_upload(client, test_user_id, STATEMENT)
+
+        assert [len(request[-1]["content"].split("\n")) for request in client.requests] == [2, 1]
+        assert len(response.pending_action.entries) == 6
+
+    async def test_invalid_assignments_are_left_out(self, test_user_id, categories):
+        table = _table(categories)
+        table["cafe solo"] = {"category_id": "not-a-category", "owner_slot": "user2"}
+        table["husleje"] = None
+        client = FakeClient(table)
+
+        response = await process_csv_upload(client, test_user_id, STATEMENT)
+
+        assert [entry.name for entry in response.pending_action.entries] == ["NETTO 1234 AALBORG", "Netto", "LØN JANUAR"]
+        assert "3 couldn't be matched to a category" in response.message.content
+
+    async def test_reply_schema_only_admits_user_categories(self, test_user_id, categories):
+        client = FakeClient(_table(categories))
+
+        await process_csv_upload(client, test_user_id, STATEMENT)
+
+        response_format = client.response_formats[0]
+        assert response_format["type"] == "json_schema"
+        item = response_format["json_schema"]["schema"]["properties"]["assignments"]["items"]
+        assert set(item["properties"]["category_id"]["enum"]) == {*categories.values(), None}
+        assert item["properties"]["owner_slot"]["enum"] == ["user1", "user2", "shared"]
+
+    async def test_next_statement_reuses_cached_decisions(self, test_user_id, categories):
+        await process_csv_upload(FakeClient(_table(categories)), test_user_id, STATEMENT)
+        assert await merchant_categorizations_collection.count_documents({"user_id": test_user_id}) == 3
+
+        client = FakeClient({})
+        response = await process_csv_upload(client, test_user_id, STATEMENT.replace("01.2026", "02.2026"))
+
+        assert client.requests == []
+        assert [(entry.name, entry.owner_slot) for entry in response.pending_action.entries][2:] == [
+            ("CAFE SOLO", "user2"),
+            ("Cafe Solo", "user2"),
+            ("HUSLEJE", "shared"),
+            ("LØN JANUAR", "user1"),
+        ]
+        assert response.tool_calls[1]["arguments"] == {"merchants": 3, "cached": 3, "asked": 0, "requests": 0}
+
+    async def test_deleted_category_is_asked_again(self, test_user_id, categories):
+        table = _table(categories)
+        await process_csv_upload(FakeClient(table), test_user_id, STATEMENT)
+        await categories_collection.delete_one({"_id": ObjectId(categories["salary"])})
+
+        client = FakeClient(table)
+        await process_csv_upload(client, test_user_id, STATEMENT)
+
+        assert [request[-1]["content"] for request in client.requests] == ["1|LØN JANUAR|income|1|25000"]
+
+    async def test_group_unresolved_keeps_income_apart(self):
+        rows = [
+            {"description": "MobilePay Anna", "amount": -100.0},
+            {"description": "MOBILEPAY ANNA", "amount": 250.0},
+            {"description": "mobilepay anna", "amount": -50.0},
+        ]
+
+        merchants = group_unresolved(rows)
+
+        assert [(m["description"], m["is_income"], m["count"], m["total"]) for m in merchants] == [
+            ("MobilePay Anna", False, 2, 150.0),
+            ("MOBILEPAY ANNA", True, 1, 250.0),
+        ]
+
+    async def test_upload_endpoint_returns_stored_proposal(self, async_client, test_user_id, categories):
+        client = FakeClient(_table(categories))
+        app.dependency_overrides[get_optional_user_id] = lambda: test_user_id
+        try:
+            with patch.object(ai_routes.ai_agent, "client", client):
+                response = await async_client.post(
+                    "/api/ai/upload-csv",
+                    files={"file": ("statement.csv", STATEMENT.encode("utf-8"), "text/csv")},
+                )
+                bad = await async_client.post(
+                    "/api/ai/upload-csv",
+                    files={"file": ("statement.csv", b"Dato;Tekst;Bel\xc3\xb8b\n", "text/csv")},
+                )
+        finally:
+            app.dependency_overrides.pop(get_optional_user_id, None)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["pending_action"]["preview_id"]
+        assert len(body["pending_action"]["entries"]) == 6
+        assert bad.status_code == 400
+
+    async def test_confirming_same_statement_twice_saves_rows_once(self, async_client, test_user_id, categories):
+        client = FakeClient(_table(categories))
+        app.dependency_overrides[get_optional_user_id] = lambda: test_user_id
+        try:
+            with patch.object(ai_routes.ai_agent, "client", client):
+                uploads = [
+                    (await async_client.post(
+                        "/api/ai/upload-csv",
+                        files={"file": ("statement.csv", STATEMENT.encode("utf-8"), "text/csv")},
+                    )).json()
+                    for _ in range(2)
+                ]
+                confirms = [
+                    (await async_client.post(
+                        "/api/ai/confirm", json={"preview_id": upload["pending_action"]["preview_id"]},
+                    )).json()
+                    for upload in uploads
+                ]
+                again = (await async_client.post(
+                    "/api/ai/upload-csv",
+                    files={"file": ("statement.csv", STATEMENT.encode("utf-8"), "text/csv")},
+                )).json()
+        finally:
+            app.dependency_overrides.pop(get_optional_user_id, None)
+
+        assert confirms[0]["tool_calls"][0]["arguments"] == {"count": 6}
+        assert confirms[1]["tool_calls"][0]["arguments"] == {"count": 0}
+        assert "6 entries were already in your budget" in confirms[1]["message"]["content"]
+        items = await budget_line_items_collection.find(
+            {"user_id": test_user_id, "fingerprint": {"$exists": True}}
+        ).to_list(None)
+        assert len(items) == 6
+        assert len({item["fingerprint"] for item in items}) == 6
+        assert again["pending_action"] is None
+        assert "6 were already imported and were skipped" in again["message"]["content"]
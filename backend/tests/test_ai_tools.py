@@ -0,0 +1,92 @@
+"""
+Tests for saving confirmed AI proposals
+
+Tests cover:
+- Confirmed entries written in one batch with rollups kept in step
+- Entries with unknown categories reported without stopping the rest
+- Rollups updated for inserted items even when a later step fails
+- Rows with an already stored fingerprint skipped, including concurrent imports
+"""
+
+from unittest.mock import patch
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.ai import tools
+from app.ai.tools import execute_save_budget_entries
+from app.database import budget_line_items_collection
+from app.services.rollup_service import RollupService
+
+
+def _entries(category_id, *amounts):
+    return [
+        {
+            "name": f"Item {index}",
+            "category_id": category_id,
+            "category_name": "Housing",
+            "amount": amount,
+            "owner_slot": "shared",
+            "month": "2026-03",
+        }
+        for index, amount in enumerate(amounts, start=1)
+    ]
+
+
+@pytest.mark.asyncio
+class TestExecuteSaveBudgetEntries:
+    """Test suite for app.ai.tools.execute_save_budget_entries"""
+
+    async def test_saves_entries_and_rollups(self, db_session, test_user_id, sample_category):
+        entries = _entries(str(sample_category["_id"]), 100.0, 250.0)
+        entries.append({**entries[0], "name": "Stray", "category_id": "not-a-category"})
+
+        result = await execute_save_budget_entries(test_user_id, entries)
+
+        assert result["ok"] is True
+        assert result["data"]["saved_count"] == 2
+        assert result["data"]["errors"] == ["Category not found for 'Stray'"]
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-03")
+        assert rollup["totals"]["expense"]["shared"] == 350.0
+        assert await RollupService.verify(test_user_id) == []
+
+    async def test_rollups_follow_inserts_when_a_later_step_fails(
+        self, db_session, test_user_id, sample_category
+    ):
+        async def fail(user_id):
+            raise RuntimeError("version store down")
+
+        with patch.object(tools.DataVersionService, "bump", fail):
+            result = await execute_save_budget_entries(
+                test_user_id, _entries(str(sample_category["_id"]), 100.0, 250.0)
+            )
+
+        assert result["ok"] is False
+        assert result["saved_count"] == 2
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 2
+        assert await RollupService.verify(test_user_id) == []
+
+    async def test_stored_and_concurrent_fingerprints_are_skipped(
+        self, db_session, test_user_id, sample_category
+    ):
+        """Stored fingerprints are skipped up front; one stored meanwhile fails with E11000 and is skipped too"""
+        entries = _entries(str(sample_category["_id"]), 100.0, 250.0, 75.0)
+        for index, entry in enumerate(entries):
+            entry["fingerprint"] = f"2026-03-0{index + 1}|item {index + 1}|0"
+        await execute_save_budget_entries(test_user_id, entries[:1])
+
+        insert_many = budget_line_items_collection.insert_many
+
+        async def insert_racing(documents, ordered=True):
+            # Another request saved the first row between the $in check and this insert
+            await insert_many(documents[1:], ordered=ordered)
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]})
+
+        with patch.object(tools.budget_line_items_collection, "insert_many", insert_racing):
+            result = await execute_save_budget_entries(test_user_id, entries)
+
+        assert result["data"]["saved_count"] == 1
+        assert result["data"]["skipped_count"] == 2
+        assert result["data"]["errors"] == []
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 2
+        assert await RollupService.verify(test_user_id) == []
@@ -0,0 +1,110 @@
+"""
+Tests for BankProfileService
+
+Tests cover:
+- Header signatures
+- Parsing with a compiled profile instead of detection
+- User profiles taking precedence over global ones
+- Saving a profile through the API and re-uploading
+"""
+
+import pytest
+
+from app.services.bank_profile_service import DANISH_BANK_PROFILES, BankProfileService
+from app.services.import_service import ImportService
+
+NORDEA = next(profile for profile in DANISH_BANK_PROFILES if profile["name"] == "Nordea")
+
+NORDEA_CSV = (
+    "Bogføringsdato;Beløb;Afsender;Modtager;Navn;Beskrivelse;Saldo;Valuta;Afstemt\n"
+    "2026/01/05;-1.234,50;;Netto A/S;;NETTO 1234 AALBORG;10.000,00;DKK;\n"
+    "2026/01/06;25.000;;;;LØN JANUAR;35.000,00;DKK;\n"
+    "Saldo pr. 31.01.2026;;;;;;35.000,00;DKK;\n"
+)
+
+
+def _compiled(profile: dict) -> dict:
+    return BankProfileService.compile({
+        **profile,
+        "signature": BankProfileService.signature(profile["header"], profile["delimiter"]),
+    })
+
+
+@pytest.mark.asyncio
+class TestBankProfileService:
+    """Test suite for BankProfileService"""
+
+    async def test_signature_ignores_case_and_padding(self):
+        header = NORDEA["header"]
+        assert BankProfileService.signature(header, ";") == BankProfileService.signature(
+            [f" {field.upper()} " for field in header], ";"
+        )
+        assert BankProfileService.signature(header, ";") != BankProfileService.signature(header, ",")
+
+    async def test_profile_replaces_detection(self):
+        """A known format reads the right columns, locale and skips footer lines"""
+        detected = ImportService.parse_csv(NORDEA_CSV)
+        parsed = ImportService.parse_csv(NORDEA_CSV, _compiled(NORDEA))
+
+        # Keyword detection picks the counterparty column
+        assert detected["rows"][0]["description"] == "Netto A/S"
+        assert detected["profile"] is None
+
+        assert parsed["profile"] == "Nordea"
+        assert parsed["columns"] == {"date": 0, "description": 5, "amount": 1}
+        assert [row["description"] for row in parsed["rows"]] == ["NETTO 1234 AALBORG", "LØN JANUAR"]
+        # "25.000" is twenty-five thousand in a Danish export
+        assert [row["amount"] for row in parsed["rows"]] == [-1234.5, 25000.0]
+
+    async def test_user_profile_wins_over_global(self, db_session, test_user_id):
+        await BankProfileService.register_default_profiles()
+        header_line = NORDEA_CSV.split("\n", 1)[0]
+
+        assert (await BankProfileService.match(test_user_id, header_line))["name"] == "Nordea"
+
+        await BankProfileService.save_user_profile(
+            test_user_id,
+            header=NORDEA["header"],
+            delimiter=";",
+            columns={"date": 0, "description": 4, "amount": 1},
+            name="My Nordea",
+        )
+
+        assert (await BankProfileService.match(test_user_id, header_line))["name"] == "My Nordea"
+        assert (await BankProfileService.match("someone_else", header_line))["name"] == "Nordea"
+
+    async def test_validate_rejects_bad_mappings(self):
+        with pytest.raises(ValueError):
+            BankProfileService.validate(["Date", "Text"], {"date": 0, "description": 1, "amount": 2}, None, "da")
+        with pytest.raises(ValueError):
+            BankProfileService.validate(["Date", "Text", "Amount"], {"date": 0, "description": 1, "amount": 2}, "%Y", "da")
+        with pytest.raises(ValueError):
+            BankProfileService.validate(["Date", "Text", "Amount"], {"date": 0, "description": 1, "amount": 2}, None, "fr")
+
+    async def test_saved_profile_applies_to_next_upload(self, async_client, db_session):
+        """Fixing a mapping once makes re-uploads of that format parse correctly"""
+        csv_content = "Date,Counterparty,Note,Amount\n01/02/2026,Netto,Groceries,\"1,234.50\"\n"
+
+        first = (await async_client.post("/api/import/upload-text", json={"csv_content": csv_content})).json()
+        assert first["profile"] is None
+
+        response = await async_client.post("/api/import/profiles", json={
+            "name": "Card export",
+            "header": first["header"],
+            "delimiter": first["delimiter"],
+            "columns": {"date": 0, "description": 2, "amount": 3},
+            "date_format": "%d/%m/%Y",
+            "amount_locale": "en",
+        })
+        assert response.status_code == 201
+
+        second = (await async_client.post("/api/import/upload-text", json={"csv_content": csv_content})).json()
+        assert second["profile"] == "Card export"
+        assert second["rows"][0]["description"] == "Groceries"
+        assert second["rows"][0]["amount"] == 1234.5
+
+        profiles = (await async_client.get("/api/import/profiles")).json()
+        assert [profile["name"] for profile in profiles] == ["Card export"]
+
+        response = await async_client.delete(f"/api/import/profiles/{profiles[0]['id']}")
+        assert response.status_code == 204
@@ -9,6 +9,7 @@ Tests cover:
 - Category population
 """
 
+import json
 import pytest
 from datetime import datetime, timezone
 from bson import ObjectId
@@ -580,6 +581,107 @@ class TestBudgetLineItemsAPI:
         # Should include categories by default
         assert all("category" in item for item in data)
 
+    # -------------------------------------------------------------------------
+    # Pagination & Streaming Tests
+    # -------------------------------------------------------------------------
+
+    async def _seed_items(self, budget, category, user_id, count):
+        """Insert items directly, sharing timestamps in pairs to exercise ties."""
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        await budget_line_items_collection.insert_many([
+            {
+                "user_id": user_id,
+                "budget_id": budget["_id"],
+                "name": f"Item {index}",
+                "category_id": category["_id"],
+                "category_type": category["type"],
+                "amount": float(index),
+                "owner_slot": "shared",
+                "created_at": base.replace(minute=index // 2),
+                "updated_at": base,
+            }
+            for index in range(count)
+        ])
+
+    @patch("app.dependencies.get_current_user_id")
+    async def test_get_line_items_cursor_pagination(
+        self,
+        mock_get_user,
+        async_client,
+        db_session,
+        test_user_id,
+        sample_budget,
+        sample_category
+    ):
+        """Test walking all pages with limit/after, including timestamp ties"""
+        mock_get_user.return_value = test_user_id
+        await self._seed_items(sample_budget, sample_category, test_user_id, 7)
+
+        full = await async_client.get(
+            f"/api/budget-line-items/?budget_id={sample_budget['_id']}"
+        )
+        expected = [item["id"] for item in full.json()]
+
+        seen = []
+        after = None
+        pages = 0
+        while True:
+            url = f"/api/budget-line-items/?budget_id={sample_budget['_id']}&limit=3"
+            if after:
+                url += f"&after={after}"
+            response = await async_client.get(url)
+            assert response.status_code == 200
+            seen.extend(item["id"] for item in response.json())
+            pages += 1
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+
+        assert pages == 3
+        assert seen == expected
+        assert len(set(seen)) == 7
+
+    @patch("app.dependencies.get_current_user_id")
+    async def test_get_line_items_invalid_cursor(
+        self,
+        mock_get_user,
+        async_client,
+        db_session,
+        test_user_id
+    ):
+        """Test that a malformed cursor is rejected"""
+        mock_get_user.return_value = test_user_id
+
+        response = await async_client.get("/api/budget-line-items/?limit=10&after=garbage")
+        assert response.status_code == 400
+
+        response = await async_client.get("/api/budget-line-items/?format=ndjson&after=garbage")
+        assert response.status_code == 400
+
+    @patch("app.dependencies.get_current_user_id")
+    async def test_get_line_items_ndjson(
+        self,
+        mock_get_user,
+        async_client,
+        db_session,
+        test_user_id,
+        sample_budget,
+        sample_category
+    ):
+        """Test streaming line items as newline-delimited JSON"""
+        mock_get_user.return_value = test_user_id
+        await self._seed_items(sample_budget, sample_category, test_user_id, 5)
+
+        full = await async_client.get("/api/budget-line-items/?include_category=true")
+        response = await async_client.get(
+            "/api/budget-line-items/?include_category=true&format=ndjson"
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == full.json()
+
     # -------------------------------------------------------------------------
     # Update Tests
     # -------------------------------------------------------------------------
@@ -7,14 +7,26 @@ Tests cover:
 - Budget validation
 - User isolation
 - Include category feature
+- Batched category hydration
+- Draft saving
 """
 
 import pytest
+from collections import Counter
 from datetime import datetime
+from unittest.mock import patch
 from bson import ObjectId
 
+from app.database import budget_line_items_collection, categories_collection
 from app.services.budget_line_item_service import BudgetLineItemService
-from app.models import BudgetLineItemCreate, BudgetLineItemUpdate
+from app.services.rollup_service import RollupService
+from app.models import (
+    BudgetDraftRow,
+    BudgetLineItemCreate,
+    BudgetLineItemUpdate,
+    SaveBudgetDraftRequest,
+)
+from tests.helpers import CountingCollection
 
 
 @pytest.mark.asyncio
@@ -220,6 +232,48 @@ class TestBudgetLineItemService:
         assert result[0].category.name == sample_category["name"]
         assert result[0].category.type == sample_category["type"]
 
+    async def test_get_line_items_hydrates_categories_in_one_query(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Category hydration costs one query however many items there are"""
+        other = await categories_collection.insert_one({
+            "user_id": test_user_id,
+            "name": "Utilities",
+            "type": "expense",
+            "icon": "bolt",
+            "color": "#FFFF00",
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        })
+        category_ids = [sample_category["_id"], other.inserted_id]
+        await budget_line_items_collection.insert_many([
+            {
+                "user_id": test_user_id,
+                "budget_id": sample_budget["_id"],
+                "name": f"Item {index}",
+                "category_id": category_ids[index % 2],
+                "category_type": "expense",
+                "amount": 10.0,
+                "owner_slot": "shared",
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }
+            for index in range(60)
+        ])
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.budget_line_item_service.categories_collection",
+            CountingCollection(categories_collection, counter),
+        ):
+            result = await BudgetLineItemService.get_line_items_by_budget(
+                str(sample_budget["_id"]), test_user_id
+            )
+
+        assert len(result) == 60
+        assert {item.category.name for item in result} == {"Housing", "Utilities"}
+        assert counter == Counter({"categories.find": 1})
+
     async def test_get_line_items_filter_by_budget(
         self, db_session, test_user_id, sample_category
     ):
@@ -555,3 +609,111 @@ class TestBudgetLineItemService:
         assert len(result) == 2
         # All items should have category populated (default True)
         assert all(item.category is not None for item in result)
+
+    # -------------------------------------------------------------------------
+    # Draft Tests
+    # -------------------------------------------------------------------------
+
+    def _draft_row(self, category, name, amount, item_id=None):
+        return BudgetDraftRow(
+            id=item_id,
+            name=name,
+            category_id=str(category["_id"]),
+            amount=amount,
+            owner_slot="shared",
+            include=True,
+            source="existing" if item_id else "manual",
+            needs_review=False,
+        )
+
+    async def test_save_budget_draft_single_bulk_write(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Deletes, updates and inserts go out as one bulk_write"""
+        now = datetime.utcnow()
+        existing = await budget_line_items_collection.insert_many([
+            {
+                "user_id": test_user_id,
+                "budget_id": sample_budget["_id"],
+                "name": f"Item {index}",
+                "category_id": sample_category["_id"],
+                "category_type": "expense",
+                "amount": 10.0,
+                "owner_slot": "shared",
+                "created_at": now,
+                "updated_at": now
+            }
+            for index in range(50)
+        ])
+        # Seeded directly, so bring the rollups in line before the save
+        await RollupService.rebuild(test_user_id)
+        kept_ids = existing.inserted_ids[:40]
+        deleted_ids = existing.inserted_ids[40:]
+
+        rows = [
+            self._draft_row(sample_category, f"Updated {index}", 20.0, str(item_id))
+            for index, item_id in enumerate(kept_ids)
+        ] + [
+            self._draft_row(sample_category, f"New {index}", 5.0)
+            for index in range(30)
+        ]
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.budget_line_item_service.budget_line_items_collection",
+            CountingCollection(budget_line_items_collection, counter),
+        ):
+            result = await BudgetLineItemService.save_budget_draft(
+                test_user_id,
+                SaveBudgetDraftRequest(
+                    month=sample_budget["month"],
+                    rows=rows,
+                    deleted_ids=[str(item_id) for item_id in deleted_ids],
+                ),
+            )
+
+        # One read of the touched rows, one write, one read of the result
+        assert counter == Counter({
+            "budget_line_items.find": 2,
+            "budget_line_items.bulk_write": 1,
+        })
+        assert len(result.rows) == 70
+        assert sorted(result.removed_ids) == sorted(str(item_id) for item_id in deleted_ids)
+
+        rollup = await RollupService.get_month_rollup(test_user_id, sample_budget["month"])
+        assert rollup["totals"]["expense"]["shared"] == 40 * 20.0 + 30 * 5.0
+
+    async def test_save_budget_draft_invalid_row_writes_nothing(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """A bad row anywhere in the draft leaves the stored items untouched"""
+        now = datetime.utcnow()
+        existing = await budget_line_items_collection.insert_one({
+            "user_id": test_user_id,
+            "budget_id": sample_budget["_id"],
+            "name": "Rent",
+            "category_id": sample_category["_id"],
+            "category_type": "expense",
+            "amount": 1000.0,
+            "owner_slot": "shared",
+            "created_at": now,
+            "updated_at": now
+        })
+
+        with pytest.raises(ValueError):
+            await BudgetLineItemService.save_budget_draft(
+                test_user_id,
+                SaveBudgetDraftRequest(
+                    month=sample_budget["month"],
+                    rows=[
+                        self._draft_row(sample_category, "Groceries", 50.0),
+                        self._draft_row(sample_category, "Broken", 0.0),
+                    ],
+                    deleted_ids=[str(existing.inserted_id)],
+                ),
+            )
+
+        items = await budget_line_items_collection.find(
+            {"user_id": test_user_id}
+        ).to_list(length=None)
+        assert [item["name"] for item in items] == ["Rent"]
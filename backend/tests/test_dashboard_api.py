@@ -0,0 +1,349 @@
+"""
+API tests for dashboard endpoints
+
+Tests cover:
+- Stats totals by category type and owner slot
+- Constant number of MongoDB round trips per request
+- Cumulative balance trends with a from/to window
+- Overview matching the individual endpoints from one shared snapshot
+- Month-over-month changes and the multi-month range view
+"""
+
+import pytest
+import pytest_asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.database import (
+    budgets_collection,
+    budget_line_items_collection,
+    budget_rollups_collection,
+    categories_collection,
+    goals_collection,
+)
+from app.services.rollup_service import RollupService
+from tests.helpers import CountingCollection
+
+async def _seed_month(user_id: str, month: str, categories: dict, item_count: int) -> None:
+    """Create a budget for the month and spread item_count items over the categories."""
+    now = datetime.now(timezone.utc)
+    budget = await budgets_collection.insert_one({
+        "user_id": user_id,
+        "month": month,
+        "created_at": now,
+        "updated_at": now,
+    })
+    plan = [
+        ("income", "user1", 100.0),
+        ("expense", "shared", 10.0),
+        ("savings", "shared", 5.0),
+        ("savings", "user1", 7.0),
+        ("fun", "user2", 1.0),
+    ]
+    docs = []
+    for index in range(item_count):
+        category_type, owner_slot, amount = plan[index % len(plan)]
+        docs.append({
+            "user_id": user_id,
+            "budget_id": budget.inserted_id,
+            "name": f"Item {index}",
+            "category_id": categories[category_type],
+            "category_type": category_type,
+            "amount": amount,
+            "owner_slot": owner_slot,
+            "created_at": now,
+            "updated_at": now,
+        })
+    if docs:
+        await budget_line_items_collection.insert_many(docs)
+        await RollupService.apply_changes(user_id, added=docs)
+
+
+@pytest_asyncio.fixture
+async def typed_categories(db_session, test_user_id):
+    """One category per category type."""
+    now = datetime.now(timezone.utc)
+    categories = {}
+    for category_type in ("income", "expense", "savings", "fun"):
+        result = await categories_collection.insert_one({
+            "user_id": test_user_id,
+            "name": category_type.title(),
+            "type": category_type,
+            "icon": "",
+            "color": "",
+            "created_at": now,
+            "updated_at": now,
+        })
+        categories[category_type] = result.inserted_id
+    await goals_collection.delete_many({"user_id": test_user_id})
+    yield categories
+    await goals_collection.delete_many({"user_id": test_user_id})
+
+
+@pytest.mark.asyncio
+class TestDashboardStatsAPI:
+    """Test suite for GET /api/dashboard/stats"""
+
+    async def test_stats_sums_by_type_and_owner_slot(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """Income, expenses and savings follow the owner slot rules"""
+        await _seed_month(test_user_id, "2026-02", typed_categories, 5)
+
+        response = await async_client.get("/api/dashboard/stats?month=2026-02")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["net_income"] == 90.0
+        assert data["expenses"] == 10.0
+        # Shared savings (5) plus all fun (1); personal savings are excluded
+        assert data["savings"] == 6.0
+
+    async def test_stats_changes_from_previous_month(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """*_change fields compare against the adjacent month"""
+        await _seed_month(test_user_id, "2026-01", typed_categories, 5)
+        await _seed_month(test_user_id, "2026-02", typed_categories, 10)
+
+        response = await async_client.get("/api/dashboard/stats?month=2026-02")
+
+        data = response.json()
+        # Every amount doubled from January to February
+        assert data["income_change"] == 100.0
+        assert data["expenses_change"] == 100.0
+        assert data["savings_change"] == 100.0
+
+        first = await async_client.get("/api/dashboard/stats?month=2026-01")
+        # No December budget, so there is no baseline
+        assert first.json()["income_change"] == 0.0
+
+    async def test_stats_for_month_without_budget(
+        self, async_client, typed_categories
+    ):
+        """Missing months report zero totals"""
+        response = await async_client.get("/api/dashboard/stats?month=1999-01")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["net_income"] == 0
+        assert data["expenses"] == 0
+        assert data["savings"] == 0
+
+    async def test_stats_query_count_is_constant(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """The number of round trips does not grow with the number of items"""
+        await _seed_month(test_user_id, "2026-03", typed_categories, 5)
+        await _seed_month(test_user_id, "2026-04", typed_categories, 150)
+
+        counts = {}
+        for month in ("2026-03", "2026-04"):
+            counter: Counter = Counter()
+            with patch(
+                "app.services.rollup_service.budget_rollups_collection",
+                CountingCollection(budget_rollups_collection, counter),
+            ), patch(
+                "app.services.dashboard_service.goals_collection",
+                CountingCollection(goals_collection, counter),
+            ), patch(
+                "app.services.dashboard_service.categories_collection",
+                CountingCollection(categories_collection, counter),
+            ):
+                response = await async_client.get(f"/api/dashboard/stats?month={month}")
+            assert response.status_code == 200
+            counts[month] = counter
+
+        assert counts["2026-03"] == counts["2026-04"]
+        assert sum(counts["2026-04"].values()) <= 3
+        assert counts["2026-04"]["categories.find_one"] == 0
+
+
+@pytest.mark.asyncio
+class TestBalanceTrendsAPI:
+    """Test suite for GET /api/dashboard/balance-trends"""
+
+    async def test_trends_are_cumulative(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """Each month carries the running shared savings and fun totals"""
+        await _seed_month(test_user_id, "2026-01", typed_categories, 5)
+        await _seed_month(test_user_id, "2026-02", typed_categories, 10)
+        await _seed_month(test_user_id, "2026-03", typed_categories, 0)
+
+        response = await async_client.get("/api/dashboard/balance-trends")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["month"] for row in data] == ["Jan. 2026", "Feb. 2026", "Mar. 2026"]
+        assert [row["shared"] for row in data] == [5.0, 15.0, 15.0]
+        assert [row["personal"] for row in data] == [1.0, 3.0, 3.0]
+
+    async def test_trends_window_keeps_earlier_history(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """A from/to window limits the months but not the running totals"""
+        await _seed_month(test_user_id, "2025-11", typed_categories, 5)
+        await _seed_month(test_user_id, "2025-12", typed_categories, 5)
+        await _seed_month(test_user_id, "2026-01", typed_categories, 5)
+
+        response = await async_client.get(
+            "/api/dashboard/balance-trends?from=2025-12&to=2025-12"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["month"] == "Dec. 2025"
+        assert data[0]["shared"] == 10.0
+
+    async def test_trends_query_count_is_constant(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """The chart is served by a single aggregation"""
+        for month in ("2025-10", "2025-11", "2025-12", "2026-01"):
+            await _seed_month(test_user_id, month, typed_categories, 25)
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.dashboard_service.budgets_collection",
+            CountingCollection(budgets_collection, counter),
+        ):
+            response = await async_client.get("/api/dashboard/balance-trends")
+
+        assert response.status_code == 200
+        assert counter == Counter({"budgets.aggregate": 1})
+
+    async def test_trends_rejects_inverted_range(self, async_client):
+        """from after to is a client error"""
+        response = await async_client.get(
+            "/api/dashboard/balance-trends?from=2026-02&to=2026-01"
+        )
+
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+class TestDashboardOverviewAPI:
+    """Test suite for GET /api/dashboard/overview"""
+
+    async def test_overview_matches_individual_endpoints(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """Overview returns the same payloads as /stats, /balance-trends and /expense-breakdown"""
+        await _seed_month(test_user_id, "2026-01", typed_categories, 10)
+        await _seed_month(test_user_id, "2026-02", typed_categories, 5)
+
+        overview = await async_client.get("/api/dashboard/overview?month=2026-02")
+        stats = await async_client.get("/api/dashboard/stats?month=2026-02")
+        trends = await async_client.get("/api/dashboard/balance-trends")
+        breakdown = await async_client.get("/api/dashboard/expense-breakdown?month=2026-02")
+
+        assert overview.status_code == 200
+        data = overview.json()
+        assert data["stats"] == stats.json()
+        assert data["balance_trends"] == trends.json()
+        assert data["expense_breakdown"] == breakdown.json()
+        assert data["expense_breakdown"] == [{
+            "category": "Expense",
+            "amount": 10.0,
+            "percentage": 100.0,
+            "icon": "",
+            "color": "",
+        }]
+
+    async def test_overview_reads_each_source_once(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """Stats and breakdown share one rollup read and one category read"""
+        await _seed_month(test_user_id, "2026-01", typed_categories, 50)
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.rollup_service.budget_rollups_collection",
+            CountingCollection(budget_rollups_collection, counter),
+        ), patch(
+            "app.services.dashboard_service.goals_collection",
+            CountingCollection(goals_collection, counter),
+        ), patch(
+            "app.services.dashboard_service.categories_collection",
+            CountingCollection(categories_collection, counter),
+        ), patch(
+            "app.services.dashboard_service.budgets_collection",
+            CountingCollection(budgets_collection, counter),
+        ):
+            response = await async_client.get("/api/dashboard/overview?month=2026-01")
+
+        assert response.status_code == 200
+        assert counter == Counter({
+            "budget_rollups.find": 1,
+            "budget_rollups.aggregate": 1,
+            "categories.find": 1,
+            "goals.find": 1,
+            "budgets.aggregate": 1,
+        })
+
+
+@pytest.mark.asyncio
+class TestDashboardRangeAPI:
+    """Test suite for GET /api/dashboard/range"""
+
+    async def test_range_returns_every_month_and_category_series(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """Months without a budget are zero-filled and series align with months"""
+        await _seed_month(test_user_id, "2025-12", typed_categories, 5)
+        await _seed_month(test_user_id, "2026-02", typed_categories, 10)
+
+        response = await async_client.get("/api/dashboard/range?from=2025-12&to=2026-02")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["month"] for row in data["months"]] == ["2025-12", "2026-01", "2026-02"]
+        assert data["months"][0] == {
+            "month": "2025-12",
+            "income": 100.0,
+            "expenses": 10.0,
+            "savings": 12.0,
+            "fun": 1.0,
+            "net_income": 90.0,
+        }
+        assert data["months"][1]["income"] == 0
+        assert data["months"][2]["income"] == 200.0
+
+        series = {category["name"]: category for category in data["categories"]}
+        assert series["Expense"]["amounts"] == [10.0, 0.0, 20.0]
+        assert series["Expense"]["total"] == 30.0
+        assert series["Income"]["type"] == "income"
+
+    async def test_range_is_one_aggregation(
+        self, async_client, typed_categories, test_user_id
+    ):
+        """A year view costs one rollup aggregation and one category read"""
+        for month in ("2025-01", "2025-06", "2025-12"):
+            await _seed_month(test_user_id, month, typed_categories, 20)
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.dashboard_service.budget_rollups_collection",
+            CountingCollection(budget_rollups_collection, counter),
+        ), patch(
+            "app.services.dashboard_service.categories_collection",
+            CountingCollection(categories_collection, counter),
+        ):
+            response = await async_client.get("/api/dashboard/range?from=2025-01&to=2025-12")
+
+        assert response.status_code == 200
+        assert len(response.json()["months"]) == 12
+        assert counter == Counter({"budget_rollups.aggregate": 1, "categories.find": 1})
+
+    async def test_range_validation(self, async_client, db_session):
+        """Missing, inverted and oversized ranges are rejected"""
+        missing = await async_client.get("/api/dashboard/range?from=2026-01")
+        inverted = await async_client.get("/api/dashboard/range?from=2026-02&to=2026-01")
+        oversized = await async_client.get("/api/dashboard/range?from=2000-01&to=2026-01")
+
+        assert missing.status_code == 422
+        assert inverted.status_code == 400
+        assert oversized.status_code == 400
@@ -0,0 +1,76 @@
+"""
+API tests for ETag / 304 handling on read endpoints
+
+Tests cover:
+- Strong ETags derived from the user's data version
+- 304 Not Modified for a matching If-None-Match
+- Writes through the API invalidate earlier ETags
+"""
+
+import pytest
+
+from app.services.data_version_service import DataVersionService
+
+
+@pytest.mark.asyncio
+class TestETagAPI:
+    """Test suite for conditional GETs"""
+
+    async def test_matching_etag_returns_304(self, async_client, db_session):
+        """Repeating a request with its ETag returns an empty 304"""
+        first = await async_client.get("/api/categories/")
+        etag = first.headers["ETag"]
+
+        second = await async_client.get("/api/categories/", headers={"If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert etag.startswith('"') and not etag.startswith('W/')
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    async def test_etag_differs_per_endpoint_and_query(self, async_client, db_session):
+        """Different resources never share an ETag"""
+        stats_jan = await async_client.get("/api/dashboard/stats?month=2026-01")
+        stats_feb = await async_client.get("/api/dashboard/stats?month=2026-02")
+        budgets = await async_client.get("/api/budgets/")
+
+        etags = {
+            stats_jan.headers["ETag"],
+            stats_feb.headers["ETag"],
+            budgets.headers["ETag"],
+        }
+        assert len(etags) == 3
+
+    async def test_write_invalidates_etag(self, async_client, db_session, test_user_id):
+        """Creating a category through the API changes the list's ETag"""
+        before = await async_client.get("/api/categories/")
+        version_before = await DataVersionService.get_version(test_user_id)
+
+        created = await async_client.post(
+            "/api/categories/",
+            json={"name": "Groceries", "type": "expense"},
+        )
+        after = await async_client.get(
+            "/api/categories/",
+            headers={"If-None-Match": before.headers["ETag"]},
+        )
+
+        assert created.status_code == 201
+        assert await DataVersionService.get_version(test_user_id) == version_before + 1
+        assert after.status_code == 200
+        assert after.headers["ETag"] != before.headers["ETag"]
+        assert [category["name"] for category in after.json()] == ["Groceries"]
+
+    async def test_goal_writes_invalidate_dashboard(self, async_client, db_session):
+        """Goal changes invalidate cached dashboard stats"""
+        stats = await async_client.get("/api/dashboard/stats?month=2026-01")
+
+        await async_client.post("/api/goals", json={"name": "Trip", "target_amount": 0})
+        revalidated = await async_client.get(
+            "/api/dashboard/stats?month=2026-01",
+            headers={"If-None-Match": stats.headers["ETag"]},
+        )
+
+        assert revalidated.status_code == 200
+        assert revalidated.json()["goals_achieved"] == stats.json()["goals_achieved"] + 1
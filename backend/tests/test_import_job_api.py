@@ -0,0 +1,257 @@
+"""
+Tests for background import job endpoints
+
+Tests cover:
+- Upload returning a job that finishes in the background
+- Job uploads spooled to disk instead of held in memory
+- Paging through stored rows
+- Confirming a job without re-posting rows
+- Confirming stored upload previews and AI proposals with sparse overrides
+- Failed jobs and user isolation
+"""
+
+import tempfile
+
+import pytest
+from bson import ObjectId
+from unittest.mock import patch
+
+from app.ai import tools
+from app.ai.tools import propose_budget_entries
+from app.database import (
+    budget_line_items_collection,
+    import_job_rows_collection,
+    import_jobs_collection,
+)
+from app.main import app
+from app.routes import imports as import_routes
+from app.routes.ai import get_optional_user_id
+
+
+def _statement(rows: int) -> bytes:
+    lines = ["Date,Description,Amount"]
+    lines.extend(f"2026-01-{index % 28 + 1:02d},Shop {index},-{index + 1}.00" for index in range(rows))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@pytest.mark.asyncio
+class TestImportJobAPI:
+    """Test suite for /api/import/jobs"""
+
+    async def test_job_stores_rows_in_batches(self, async_client, db_session):
+        """Rows come back page by page across stored batches"""
+        with patch("app.services.import_service.SUGGESTION_BATCH_SIZE", 4), \
+                patch("app.services.import_job_service.SUGGESTION_BATCH_SIZE", 4):
+            response = await async_client.post(
+                "/api/import/jobs",
+                files={"file": ("statement.csv", _statement(10), "text/csv")},
+            )
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+
+            # The background task has run by the time the test client returns
+            response = await async_client.get(f"/api/import/jobs/{job_id}?offset=3&limit=6")
+
+        job = response.json()
+        assert job["status"] == "ready"
+        assert job["processed_rows"] == 10
+        assert job["header"] == ["Date", "Description", "Amount"]
+        assert [row["description"] for row in job["rows"]] == [f"Shop {index}" for index in range(3, 9)]
+
+        state_only = (await async_client.get(f"/api/import/jobs/{job_id}")).json()
+        assert state_only["rows"] == []
+
+    async def test_job_upload_is_spooled_and_deleted(self, async_client, db_session):
+        """A large upload goes to a temporary file that is closed once the job ends"""
+        spools = []
+        spooled_file = tempfile.SpooledTemporaryFile
+
+        def spool(max_size):
+            spools.append(spooled_file(max_size=max_size))
+            return spools[-1]
+
+        with patch.object(import_routes, "UPLOAD_SPOOL_SIZE", 256), \
+                patch.object(import_routes, "UPLOAD_CHUNK_SIZE", 100), \
+                patch.object(import_routes.tempfile, "SpooledTemporaryFile", spool):
+            response = await async_client.post(
+                "/api/import/jobs",
+                files={"file": ("statement.csv", _statement(50), "text/csv")},
+            )
+
+        job = (await async_client.get(f"/api/import/jobs/{response.json()['id']}")).json()
+        assert job["status"] == "ready"
+        assert job["processed_rows"] == 50
+        assert len(spools) == 1
+        assert spools[0]._rolled
+        assert spools[0].closed
+
+    async def test_confirm_job_saves_included_rows(
+        self, async_client, db_session, test_user_id, sample_category
+    ):
+        """Confirm reads the stored rows; a second confirm is rejected"""
+        response = await async_client.post(
+            "/api/import/jobs",
+            files={"file": ("statement.csv", _statement(3), "text/csv")},
+        )
+        job_id = response.json()["id"]
+
+        # Map the stored rows the way a review would before confirming
+        async for document in import_job_rows_collection.find({"job_id": ObjectId(job_id)}):
+            rows = [{**row, "category_id": str(sample_category["_id"])} for row in document["rows"]]
+            await import_job_rows_collection.update_one({"_id": document["_id"]}, {"$set": {"rows": rows}})
+
+        response = await async_client.post(f"/api/import/jobs/{job_id}/confirm", json={"month": "2026-01"})
+        assert response.status_code == 200
+        assert response.json()["saved_count"] == 3
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 3
+
+        job = (await async_client.get(f"/api/import/jobs/{job_id}")).json()
+        assert job["status"] == "confirmed"
+        assert job["result"]["saved_count"] == 3
+
+        response = await async_client.post(f"/api/import/jobs/{job_id}/confirm", json={"month": "2026-01"})
+        assert response.status_code == 400
+
+    async def test_job_reports_parse_errors(self, async_client, db_session):
+        """A statement without data rows ends the job as failed"""
+        response = await async_client.post(
+            "/api/import/jobs",
+            files={"file": ("statement.csv", b"Date,Description,Amount\n", "text/csv")},
+        )
+        job = (await async_client.get(f"/api/import/jobs/{response.json()['id']}")).json()
+
+        assert job["status"] == "failed"
+        assert "data row" in job["error"]
+
+    async def test_jobs_are_private(self, async_client, db_session, auth_override):
+        """Another user cannot read or confirm a job"""
+        response = await async_client.post(
+            "/api/import/jobs",
+            files={"file": ("statement.csv", _statement(1), "text/csv")},
+        )
+        job_id = response.json()["id"]
+
+        auth_override["user_id"] = "other_user"
+        assert (await async_client.get(f"/api/import/jobs/{job_id}")).status_code == 404
+        response = await async_client.post(f"/api/import/jobs/{job_id}/confirm", json={"month": "2026-01"})
+        assert response.status_code == 404
+        assert (await async_client.get("/api/import/jobs/not-an-id")).status_code == 404
+        assert await import_jobs_collection.count_documents({"user_id": "other_user"}) == 0
+
+    async def test_confirm_preview_with_sparse_overrides(
+        self, async_client, db_session, test_user_id, sample_category
+    ):
+        """Confirm sends the preview ID and only the rows the user changed"""
+        response = await async_client.post(
+            "/api/import/upload-text", json={"csv_content": _statement(4).decode("utf-8")}
+        )
+        preview_id = response.json()["preview_id"]
+        category_id = str(sample_category["_id"])
+
+        response = await async_client.post("/api/import/confirm", json={
+            "month": "2026-01",
+            "preview_id": preview_id,
+            "overrides": [
+                {"index": index, "category_id": category_id, "owner_slot": "shared"}
+                for index in (0, 2, 3)
+            ] + [{"index": 3, "include": False}],
+        })
+        assert response.status_code == 200
+        result = response.json()
+        # Row 1 kept no category, row 3 was left out
+        assert result["saved_count"] == 2
+        assert result["errors"] == ["Invalid category for 'Shop 1'"]
+
+        items = await budget_line_items_collection.find({"user_id": test_user_id}).to_list(None)
+        assert sorted(item["name"] for item in items) == ["Shop 0", "Shop 2"]
+        assert {item["owner_slot"] for item in items} == {"shared"}
+
+        response = await async_client.post("/api/import/confirm", json={
+            "month": "2026-01", "preview_id": preview_id,
+        })
+        assert response.status_code == 400
+
+    async def test_confirm_preview_rejects_unknown_rows(self, async_client, db_session):
+        """An override past the end of the preview leaves it confirmable"""
+        response = await async_client.post(
+            "/api/import/upload-text", json={"csv_content": _statement(2).decode("utf-8")}
+        )
+        preview_id = response.json()["preview_id"]
+
+        response = await async_client.post("/api/import/confirm", json={
+            "month": "2026-01", "preview_id": preview_id, "overrides": [{"index": 2, "include": False}],
+        })
+        assert response.status_code == 400
+
+        job = (await async_client.get(f"/api/import/jobs/{preview_id}")).json()
+        assert job["status"] == "ready"
+
+    async def test_ai_confirm_reads_stored_proposal(
+        self, async_client, db_session, test_user_id, sample_category
+    ):
+        """The AI proposal is confirmed by preview ID instead of re-posting entries"""
+        proposal = await propose_budget_entries(test_user_id, entries=[
+            {"name": name, "category_id": str(sample_category["_id"]), "amount": 100.0, "month": "2026-01"}
+            for name in ("Rent", "Power")
+        ])
+        preview_id = proposal["data"]["preview_id"]
+
+        app.dependency_overrides[get_optional_user_id] = lambda: test_user_id
+        try:
+            response = await async_client.post("/api/ai/confirm", json={
+                "preview_id": preview_id, "overrides": [{"index": 1, "include": False}],
+            })
+        finally:
+            app.dependency_overrides.pop(get_optional_user_id, None)
+
+        assert response.status_code == 200
+        items = await budget_line_items_collection.find({"user_id": test_user_id}).to_list(None)
+        assert [item["name"] for item in items] == ["Rent"]
+
+    async def test_ai_confirm_keeps_partly_saved_proposal(
+        self, async_client, db_session, test_user_id, sample_category
+    ):
+        """A save that fails after inserting rows cannot be confirmed again"""
+        proposal = await propose_budget_entries(test_user_id, entries=[
+            {"name": "Rent", "category_id": str(sample_category["_id"]), "amount": 100.0, "month": "2026-01"}
+        ])
+        preview_id = proposal["data"]["preview_id"]
+
+        async def fail(user_id):
+            raise RuntimeError("version store down")
+
+        app.dependency_overrides[get_optional_user_id] = lambda: test_user_id
+        try:
+            with patch.object(tools.DataVersionService, "bump", fail):
+                await async_client.post("/api/ai/confirm", json={"preview_id": preview_id})
+            retry = await async_client.post("/api/ai/confirm", json={"preview_id": preview_id})
+        finally:
+            app.dependency_overrides.pop(get_optional_user_id, None)
+
+        job = await import_jobs_collection.find_one({"_id": ObjectId(preview_id)})
+        assert job["status"] == "confirmed"
+        assert retry.status_code == 400
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 1
+
+    async def test_ai_confirm_releases_proposal_when_nothing_saved(
+        self, async_client, db_session, test_user_id, sample_category
+    ):
+        """A save that wrote nothing can be confirmed again"""
+        proposal = await propose_budget_entries(test_user_id, entries=[
+            {"name": "Rent", "category_id": str(sample_category["_id"]), "amount": 100.0, "month": "2026-01"}
+        ])
+        preview_id = proposal["data"]["preview_id"]
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("database down")
+
+        app.dependency_overrides[get_optional_user_id] = lambda: test_user_id
+        try:
+            with patch.object(tools.budget_line_items_collection, "insert_many", fail):
+                await async_client.post("/api/ai/confirm", json={"preview_id": preview_id})
+            retry = await async_client.post("/api/ai/confirm", json={"preview_id": preview_id})
+        finally:
+            app.dependency_overrides.pop(get_optional_user_id, None)
+
+        assert retry.status_code == 200
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 1
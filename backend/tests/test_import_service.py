@@ -1,9 +1,14 @@
+from collections import Counter
 from datetime import datetime, timezone
+from unittest.mock import patch
 
 import pytest
+from bson import ObjectId
 
+from app.ai.tools import parse_csv_data
 from app.database import budget_line_items_collection, budgets_collection, categories_collection
 from app.services.import_service import ImportService
+from tests.helpers import CountingCollection
 
 
 @pytest.mark.asyncio
@@ -161,3 +166,202 @@ class TestImportServiceSuggestions:
         assert enriched[0]["category_id"] is None
         assert enriched[0]["suggestion_basis"] is None
         assert enriched[0]["matched_terms"] == []
+
+    async def test_large_uploads_are_scored_in_the_pool(self, db_session, test_user_id, sample_category):
+        """Pooled batches come back in order with the same suggestions as in-loop scoring"""
+        budget = await budgets_collection.insert_one({"user_id": test_user_id, "month": "2026-01"})
+        await budget_line_items_collection.insert_many([
+            {
+                "user_id": test_user_id,
+                "budget_id": budget.inserted_id,
+                "name": name,
+                "category_id": sample_category["_id"],
+                "amount": 100,
+                "owner_slot": "shared",
+            }
+            for name in ("Netto", "NETTO 1234 AALBORG", "Foetex")
+        ])
+        descriptions = ["NETTO 8877 CITY", "Unknown shop", "FOETEX AARHUS", "Netto"] * 5
+        rows = [{"description": description, "category_id": None} for description in descriptions]
+
+        in_loop = await ImportService.apply_historical_suggestions(test_user_id, rows)
+        with patch("app.services.import_service.PARALLEL_SUGGESTION_MIN_ROWS", 6), \
+                patch("app.services.import_service.SUGGESTION_BATCH_SIZE", 3), \
+                patch("app.services.import_service.SUGGESTION_WORKERS", 2):
+            pooled = await ImportService.apply_historical_suggestions(test_user_id, rows)
+
+            async def stream():
+                for row in rows:
+                    yield row
+
+            streamed = await ImportService.apply_historical_suggestions(test_user_id, stream())
+
+        assert pooled == streamed == in_loop
+        assert in_loop[0]["category_id"] == str(sample_category["_id"])
+        assert in_loop[1]["category_id"] is None
+
+
+async def _byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _parse_stream(data: bytes, size: int):
+    parsed = await ImportService.parse_csv_stream(
+        ImportService.decode_chunks(_byte_chunks(data, size))
+    )
+    return parsed, [row async for row in parsed["rows"]]
+
+
+@pytest.mark.asyncio
+class TestImportServiceStreaming:
+    CSV = (
+        "\r\nDato;Tekst;Beløb\r\n"
+        "01-01-2026;\"NETTO\nAALBORG\";-1.234,50\r\n"
+        "02-01-2026;\"Løn; januar\";25.000,00\r\n"
+        "03-01-2026;;0\r\n"
+    )
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 16, 65536])
+    async def test_stream_matches_parse_csv(self, chunk_size):
+        expected = ImportService.parse_csv(self.CSV)
+
+        parsed, rows = await _parse_stream(self.CSV.encode("utf-8"), chunk_size)
+
+        assert parsed["header"] == ["Dato", "Tekst", "Beløb"] == expected["header"]
+        assert parsed["delimiter"] == ";"
+        assert rows == expected["rows"]
+        assert [row["description"] for row in rows] == ["NETTO\nAALBORG", "Løn; januar"]
+
+    async def test_stream_falls_back_to_latin1(self):
+        parsed, rows = await _parse_stream(self.CSV.encode("latin-1"), 7)
+
+        assert parsed["header"][2] == "Beløb"
+        assert rows[1]["description"] == "Løn; januar"
+
+    async def test_stream_rejects_empty_and_header_only(self):
+        with pytest.raises(ValueError):
+            await _parse_stream(b"  \n", 4)
+        with pytest.raises(ValueError):
+            await _parse_stream(b"Date,Description,Amount\n", 4)
+
+    async def test_fingerprints_survive_reupload(self):
+        statement = (
+            "Date,Description,Amount\n"
+            "2026-01-01,Netto,-50.00\n"
+            "2026-01-01,NETTO,-50.00\n"
+            "2026-01-02,Netto,-50.00\n"
+        )
+        first = ImportService.parse_csv(statement)["rows"]
+        # Same export with a later row appended and different delimiters
+        second = ImportService.parse_csv(
+            statement.replace(",", ";").replace("-50.00", "-50,00") + "2026-01-03;Netto;-50,00\n"
+        )["rows"]
+
+        fingerprints = [row["fingerprint"] for row in first]
+        # Identical purchases on the same day stay distinct
+        assert len(set(fingerprints)) == 3
+        assert [row["fingerprint"] for row in second[:3]] == fingerprints
+        assert second[3]["fingerprint"] not in fingerprints
+
+
+    @pytest.mark.parametrize("amount, expected", [
+        ("-1.234,50", -1234.5),
+        ("1 234,50 kr.", 1234.5),
+        ("-12,5kr", -12.5),
+        ("99.95", 99.95),
+        ("n/a", 0.0),
+    ])
+    async def test_parse_amount(self, amount, expected):
+        assert ImportService._parse_amount(amount) == expected
+
+
+@pytest.mark.asyncio
+class TestParseCsvDataTool:
+    async def test_tool_uses_import_parser(self, db_session, test_user_id):
+        """The AI tool reads the same columns as the import page, first keyword match wins"""
+        csv_content = (
+            "Dato;Tekst;Beløb;Beløb i EUR;Modtager\n"
+            "05.01.2026;NETTO 1234;-1.234,50;-165,60;Netto A/S\n"
+        )
+
+        result = await parse_csv_data(test_user_id, csv_content=csv_content)
+
+        assert result["ok"]
+        assert result["data"]["columns"] == ImportService.parse_csv(csv_content)["columns"]
+        assert result["data"]["rows"] == [
+            {"date": "05.01.2026", "description": "NETTO 1234", "amount": -1234.5, "is_income": False}
+        ]
+
+    async def test_tool_reports_missing_rows(self, db_session, test_user_id):
+        result = await parse_csv_data(test_user_id, csv_content="Date,Description,Amount\n")
+
+        assert not result["ok"]
+        assert "data row" in result["error"]
+
+
+@pytest.mark.asyncio
+class TestImportServiceConfirm:
+    async def test_confirm_import_batches_queries(self, db_session, test_user_id, sample_category):
+        entries = [
+            {
+                "name": f"Row {index}",
+                "category_id": str(sample_category["_id"]),
+                "amount": -10.0 * (index + 1),
+                "owner_slot": "shared",
+            }
+            for index in range(120)
+        ]
+        entries.insert(5, {"name": "No category", "category_id": "", "amount": 5.0})
+        entries.insert(50, {"name": "Foreign", "category_id": str(ObjectId()), "amount": 5.0})
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.import_service.categories_collection",
+            CountingCollection(categories_collection, counter),
+        ), patch(
+            "app.services.import_service.budget_line_items_collection",
+            CountingCollection(budget_line_items_collection, counter),
+        ):
+            result = await ImportService.confirm_import(test_user_id, "2026-04", entries)
+
+        assert counter == Counter({
+            "categories.find": 1,
+            "budget_line_items.insert_many": 1,
+        })
+        assert result["saved_count"] == 120
+        assert result["saved"][0]["name"] == "Row 0"
+        assert result["saved"][0]["amount"] == 10.0
+        assert result["saved"][0]["category"] == "Housing"
+        assert result["errors"] == [
+            "Invalid category for 'No category'",
+            "Category not found for 'Foreign'",
+        ]
+
+        budget = await budgets_collection.find_one({"user_id": test_user_id, "month": "2026-04"})
+        stored = await budget_line_items_collection.count_documents({"budget_id": budget["_id"]})
+        assert stored == 120
+
+    async def test_confirm_import_skips_imported_fingerprints(self, db_session, test_user_id, sample_category):
+        rows = ImportService.parse_csv(
+            "Date,Description,Amount\n2026-01-01,Netto,-50.00\n2026-01-02,Rent,-6500.00\n"
+        )["rows"]
+        entries = [
+            {
+                "name": row["description"],
+                "category_id": str(sample_category["_id"]),
+                "amount": row["abs_amount"],
+                "fingerprint": row["fingerprint"],
+            }
+            for row in rows
+        ]
+
+        first = await ImportService.confirm_import(test_user_id, "2026-04", entries[:1])
+        flagged = await ImportService.flag_imported_rows(test_user_id, [dict(row) for row in rows])
+        second = await ImportService.confirm_import(test_user_id, "2026-04", entries + entries[1:])
+
+        assert (first["saved_count"], first["skipped_count"]) == (1, 0)
+        assert [row["already_imported"] for row in flagged] == [True, False]
+        assert flagged[0]["include"] is False
+        assert (second["saved_count"], second["skipped_count"], second["error_count"]) == (1, 2, 0)
+        assert await budget_line_items_collection.count_documents({"user_id": test_user_id}) == 2
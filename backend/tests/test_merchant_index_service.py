@@ -0,0 +1,139 @@
+"""
+Tests for MerchantIndexService
+
+Tests cover:
+- Lazy build from existing line items
+- Incremental updates from line item writes
+- Loading only the keys a statement needs
+- Resolving top choices at load time
+"""
+
+import pytest
+from collections import Counter
+from unittest.mock import patch
+
+from app.database import budget_line_items_collection, merchant_match_index_collection
+from app.models import BudgetLineItemCreate, BudgetLineItemUpdate
+from app.services.budget_line_item_service import BudgetLineItemService
+from app.services.merchant_index_service import MerchantIndexService
+from tests.helpers import CountingCollection
+
+
+async def _stored_entries(user_id: str) -> dict:
+    """Every live entry for a user keyed by (kind, key), examples excluded."""
+    entries = {}
+    async for document in merchant_match_index_collection.find({"user_id": user_id}):
+        entry = MerchantIndexService._live_entry(document)
+        if entry:
+            entries[(document["kind"], document["key"])] = (
+                entry["category_counts"],
+                entry["owner_counts"],
+            )
+    return entries
+
+
+@pytest.mark.asyncio
+class TestMerchantIndexService:
+    """Test suite for MerchantIndexService"""
+
+    async def test_load_builds_missing_index(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """A user's first load builds the index from their line items"""
+        await budget_line_items_collection.insert_one({
+            "user_id": test_user_id,
+            "budget_id": sample_budget["_id"],
+            "name": "NETTO 1234 AALBORG",
+            "category_id": sample_category["_id"],
+            "amount": 100.0,
+            "owner_slot": "user1",
+        })
+
+        indexes = await MerchantIndexService.load(test_user_id, ["Netto City"])
+
+        category_key = str(sample_category["_id"])
+        assert indexes["token_map"]["netto"]["category_counts"] == {category_key: 1}
+        assert indexes["phrase_map"]["netto"]["owner_counts"] == {"user1": 1}
+        # Only keys the descriptions map to are loaded
+        assert "aalborg" not in indexes["token_map"]
+        assert indexes["exact_map"] == {}
+
+    async def test_incremental_updates_match_rebuild(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Creates, updates and deletes leave the same index a rebuild would"""
+        await MerchantIndexService.rebuild(test_user_id)
+
+        budget_id = str(sample_budget["_id"])
+        category_id = str(sample_category["_id"])
+        netto = await BudgetLineItemService.create_line_item(
+            BudgetLineItemCreate(
+                budget_id=budget_id, name="Netto", category_id=category_id,
+                amount=100.0, owner_slot="user1",
+            ),
+            test_user_id,
+        )
+        rent = await BudgetLineItemService.create_line_item(
+            BudgetLineItemCreate(
+                budget_id=budget_id, name="Himmerland Boligforening", category_id=category_id,
+                amount=6500.0, owner_slot="shared",
+            ),
+            test_user_id,
+        )
+        await BudgetLineItemService.update_line_item(
+            netto.id, BudgetLineItemUpdate(name="Netto 1234 Aalborg", owner_slot="user2"), test_user_id
+        )
+        await BudgetLineItemService.delete_line_item(rent.id, test_user_id)
+
+        incremental = await _stored_entries(test_user_id)
+        await MerchantIndexService.rebuild(test_user_id)
+        rebuilt = await _stored_entries(test_user_id)
+
+        assert incremental == rebuilt
+        assert ("token", "himmerland") not in incremental
+        assert incremental[("token", "netto")] == ({category_id: 1}, {"user2": 1})
+
+    async def test_load_is_one_query_once_built(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """A suggestion pass reads the index once instead of scanning line items"""
+        await BudgetLineItemService.create_line_item(
+            BudgetLineItemCreate(
+                budget_id=str(sample_budget["_id"]), name="Netto",
+                category_id=str(sample_category["_id"]), amount=100.0, owner_slot="user1",
+            ),
+            test_user_id,
+        )
+        await MerchantIndexService.rebuild(test_user_id)
+
+        counter: Counter = Counter()
+        with patch(
+            "app.services.merchant_index_service.merchant_match_index_collection",
+            CountingCollection(merchant_match_index_collection, counter),
+        ), patch(
+            "app.services.merchant_index_service.budget_line_items_collection",
+            CountingCollection(budget_line_items_collection, counter),
+        ):
+            indexes = await MerchantIndexService.load(
+                test_user_id, [f"NETTO {index}" for index in range(500)]
+            )
+
+        assert "netto" in indexes["token_map"]
+        assert counter == Counter({"merchant_match_index.find": 1})
+
+    async def test_live_entry_resolves_top_choices(self):
+        """Winners are resolved once per entry, first-seen key winning ties"""
+        entry = MerchantIndexService._live_entry({
+            "kind": "token",
+            "key": "netto",
+            "category_counts": {"a": 2, "b": 3, "c": 3, "d": 0},
+            "owner_counts": {"user1": 0, "shared": 8},
+            "examples": ["Netto"],
+        })
+
+        assert entry["category_counts"] == {"a": 2, "b": 3, "c": 3}
+        assert entry["top_category"] == {
+            "value": "b", "count": 3, "total": 8, "ratio": 3 / 8, "margin": 0,
+        }
+        assert entry["top_owner"]["value"] == "shared"
+        assert entry["top_owner"]["ratio"] == 1
@@ -0,0 +1,232 @@
+"""
+Tests for RollupService
+
+Tests cover:
+- Incremental $inc maintenance from line item writes
+- Budget month rename and delete
+- Verify and rebuild for drift
+- category_type copied onto line items, kept in sync and backfilled
+"""
+
+import pytest
+from datetime import datetime, timezone
+from bson import ObjectId
+
+from app.database import budget_line_items_collection, budget_rollups_collection
+from app.migrations.backfill_line_item_category_type import backfill
+from app.models import (
+    BudgetLineItemCreate,
+    BudgetLineItemUpdate,
+    BudgetUpdate,
+    CategoryUpdate,
+)
+from app.services.budget_line_item_service import BudgetLineItemService
+from app.services.budget_service import BudgetService
+from app.services.category_service import CategoryService
+from app.services.rollup_service import RollupService
+
+
+async def _create_item(user_id, budget, category, amount, owner_slot="shared"):
+    return await BudgetLineItemService.create_line_item(
+        BudgetLineItemCreate(
+            budget_id=str(budget["_id"]),
+            name="Rent",
+            category_id=str(category["_id"]),
+            amount=amount,
+            owner_slot=owner_slot,
+        ),
+        user_id,
+    )
+
+
+@pytest.mark.asyncio
+class TestRollupService:
+    """Test suite for RollupService"""
+
+    async def test_create_update_delete_maintain_rollup(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Line item writes keep the month's rollup in step"""
+        item = await _create_item(test_user_id, sample_budget, sample_category, 1500.0)
+
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["shared"] == 1500.0
+        assert rollup["categories"][str(sample_category["_id"])] == 1500.0
+        assert rollup["item_count"] == 1
+
+        await BudgetLineItemService.update_line_item(
+            item.id,
+            BudgetLineItemUpdate(amount=900.0, owner_slot="user1"),
+            test_user_id,
+        )
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["shared"] == 0
+        assert rollup["totals"]["expense"]["user1"] == 900.0
+        assert rollup["item_count"] == 1
+
+        await BudgetLineItemService.delete_line_item(item.id, test_user_id)
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["user1"] == 0
+        assert rollup["item_count"] == 0
+        assert await RollupService.verify(test_user_id) == []
+
+    async def test_budget_month_change_and_delete(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Re-dating a budget moves its rollup; deleting it drops the rollup"""
+        await _create_item(test_user_id, sample_budget, sample_category, 200.0)
+
+        await BudgetService.update_budget(
+            test_user_id, str(sample_budget["_id"]), BudgetUpdate(month="2026-02")
+        )
+        assert await RollupService.get_month_rollup(test_user_id, "2026-01") is None
+        moved = await RollupService.get_month_rollup(test_user_id, "2026-02")
+        assert moved["totals"]["expense"]["shared"] == 200.0
+
+        await BudgetService.delete_budget(test_user_id, str(sample_budget["_id"]))
+        assert await RollupService.get_month_rollup(test_user_id, "2026-02") is None
+
+    async def test_category_type_change_moves_amounts(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Changing a category's type re-buckets its amounts"""
+        await _create_item(test_user_id, sample_budget, sample_category, 300.0)
+
+        await CategoryService.update_category(
+            test_user_id, str(sample_category["_id"]), CategoryUpdate(type="savings")
+        )
+
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["shared"] == 0.0
+        assert rollup["totals"]["savings"]["shared"] == 300.0
+        assert rollup["categories"][str(sample_category["_id"])] == 300.0
+        assert await RollupService.verify(test_user_id) == []
+
+    async def test_category_type_change_only_touches_its_months(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Months without the category keep their rollup, drift and all"""
+        await _create_item(test_user_id, sample_budget, sample_category, 300.0)
+        await budget_rollups_collection.insert_one({
+            "user_id": test_user_id,
+            "month": "2025-06",
+            "totals": {"expense": {"user1": 99.0}},
+            "categories": {},
+            "item_count": 1,
+        })
+
+        await CategoryService.update_category(
+            test_user_id, str(sample_category["_id"]), CategoryUpdate(type="savings")
+        )
+
+        untouched = await RollupService.get_month_rollup(test_user_id, "2025-06")
+        assert untouched["totals"] == {"expense": {"user1": 99.0}}
+
+    async def test_lifetime_savings_reads_rollups(self, db_session, test_user_id):
+        """Lifetime savings sum shared savings and every fun slot"""
+        await budget_rollups_collection.insert_many([
+            {
+                "user_id": test_user_id,
+                "month": "2025-12",
+                "totals": {"savings": {"shared": 100.0, "user1": 50.0}, "fun": {"user2": 20.0}},
+                "categories": {},
+                "item_count": 3,
+            },
+            {
+                "user_id": test_user_id,
+                "month": "2026-01",
+                "totals": {"savings": {"shared": 25.0}, "fun": {"user1": 5.0}},
+                "categories": {},
+                "item_count": 2,
+            },
+        ])
+
+        lifetime = await RollupService.get_lifetime_savings(test_user_id)
+
+        assert lifetime == {"shared": 125.0, "fun": 25.0}
+
+    async def test_verify_detects_and_rebuild_repairs_drift(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Writes that bypass the services are reported and repaired"""
+        await _create_item(test_user_id, sample_budget, sample_category, 100.0)
+        now = datetime.now(timezone.utc)
+        await budget_line_items_collection.insert_one({
+            "user_id": test_user_id,
+            "budget_id": sample_budget["_id"],
+            "name": "Direct insert",
+            "category_id": sample_category["_id"],
+            "category_type": "expense",
+            "amount": 50.0,
+            "owner_slot": "shared",
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        drift = await RollupService.verify(test_user_id)
+        fields = {entry["field"] for entry in drift}
+        assert "totals.expense.shared" in fields
+        assert "item_count" in fields
+
+        stale = await budget_rollups_collection.insert_one({
+            "user_id": test_user_id, "month": "2025-06", "totals": {}, "categories": {}, "item_count": 0,
+        })
+        rollup_id = (await RollupService.get_month_rollup(test_user_id, "2026-01"))["_id"]
+
+        rebuilt = await RollupService.rebuild(test_user_id)
+
+        assert rebuilt == 1
+        # Months are replaced in place, and months without items are dropped
+        assert (await RollupService.get_month_rollup(test_user_id, "2026-01"))["_id"] == rollup_id
+        assert await budget_rollups_collection.find_one({"_id": stale.inserted_id}) is None
+        assert await RollupService.verify(test_user_id) == []
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["shared"] == 150.0
+
+    async def test_category_type_copied_and_synced(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """Line items carry their category's type and follow type changes"""
+        item = await _create_item(test_user_id, sample_budget, sample_category, 120.0)
+
+        stored = await budget_line_items_collection.find_one({"_id": ObjectId(item.id)})
+        assert stored["category_type"] == "expense"
+
+        await CategoryService.update_category(
+            test_user_id, str(sample_category["_id"]), CategoryUpdate(type="fun")
+        )
+
+        stored = await budget_line_items_collection.find_one({"_id": ObjectId(item.id)})
+        assert stored["category_type"] == "fun"
+        assert await RollupService.verify(test_user_id) == []
+
+    async def test_backfill_sets_missing_category_type(
+        self, db_session, test_user_id, sample_budget, sample_category
+    ):
+        """The backfill migration fills in items written before the field existed"""
+        now = datetime.now(timezone.utc)
+        result = await budget_line_items_collection.insert_one({
+            "user_id": test_user_id,
+            "budget_id": sample_budget["_id"],
+            "name": "Legacy item",
+            "category_id": sample_category["_id"],
+            "amount": 75.0,
+            "owner_slot": "shared",
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        dry_run = await backfill(dry_run=True)
+        assert dry_run["items_updated"] == 1
+        untouched = await budget_line_items_collection.find_one({"_id": result.inserted_id})
+        assert "category_type" not in untouched
+
+        stats = await backfill(batch_size=1)
+
+        assert stats["items_updated"] == 1
+        assert stats["orphaned"] == 0
+        stored = await budget_line_items_collection.find_one({"_id": result.inserted_id})
+        assert stored["category_type"] == "expense"
+        await RollupService.rebuild(test_user_id)
+        rollup = await RollupService.get_month_rollup(test_user_id, "2026-01")
+        assert rollup["totals"]["expense"]["shared"] == 75.0
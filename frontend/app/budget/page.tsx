@@ -483,6 +483,7 @@ export default function BudgetPage() {
           include: row.include,
           source: row.source,
           needs_review: row.needs_review,
+          fingerprint: row.fingerprint,
         })),
       });
 
@@ -7,7 +7,7 @@ import Header from "@/components/Header";
 import { Button } from "@/components/ui/button";
 import { Card } from "@/components/ui/card";
 import { Textarea } from "@/components/ui/textarea";
-import { uploadCSVFile, uploadCSVText } from "@/lib/import-api";
+import { createImportJob, uploadCSVText, waitForImportJob } from "@/lib/import-api";
 import { useBudgetDrafts } from "@/contexts/BudgetDraftContext";
 import { useMonth } from "@/contexts/MonthContext";
 import { makeDraftRow } from "@/lib/budget-draft";
@@ -26,11 +26,13 @@ export default function ImportPage() {
   const [info, setInfo] = useState<string | null>(null);
 
   const routeRowsToBudget = async (rows: Awaited<ReturnType<typeof uploadCSVText>>["rows"]) => {
-    const suggestedCount = rows.filter((row) => !!row.category_id).length;
+    const newRows = rows.filter((row) => !row.already_imported);
+    const skippedCount = rows.length - newRows.length;
+    const suggestedCount = newRows.filter((row) => !!row.category_id).length;
 
     mergeRows(
       targetMonth,
-      rows.map((row) =>
+      newRows.map((row) =>
         makeDraftRow({
           name: row.description || "Imported item",
           amount: row.abs_amount || "",
@@ -39,6 +41,7 @@ export default function ImportPage() {
           include: true,
           source: "import",
           needs_review: !row.category_id,
+          fingerprint: row.fingerprint || undefined,
         }),
       ),
     );
@@ -46,10 +49,14 @@ export default function ImportPage() {
     hydrateMonth(targetMonth, {
       initialized: true,
     });
+    const skippedNote =
+      skippedCount > 0
+        ? ` Skipped ${skippedCount} row${skippedCount === 1 ? "" : "s"} you already imported.`
+        : "";
     setInfo(
-      suggestedCount > 0
+      (suggestedCount > 0
         ? `Matched ${suggestedCount} imported row${suggestedCount === 1 ? "" : "s"} from your previous categorized budget history.`
-        : "Imported rows are ready for review in the budget draft table.",
+        : "Imported rows are ready for review in the budget draft table.") + skippedNote,
     );
     setSelectedMonth(targetMonth);
     router.push("/budget");
@@ -64,8 +71,11 @@ export default function ImportPage() {
     setLoading(true);
 
     try {
-      const data = await uploadCSVFile(file);
-      await routeRowsToBudget(data.rows);
+      const job = await createImportJob(file);
+      const rows = await waitForImportJob(job.id, (progress) =>
+        setInfo(`Parsed ${progress.processed_rows} row${progress.processed_rows === 1 ? "" : "s"} so far...`),
+      );
+      await routeRowsToBudget(rows);
     } catch (err: unknown) {
       setError(err instanceof Error ? err.message : "Upload failed");
     } finally {
@@ -5,27 +5,28 @@ import StatCard from "@/components/StatCard";
 import LifetimeSavingsChart from "@/components/LifetimeSavingsChart";
 import ExpenseBreakdown from "@/components/ExpenseBreakdown";
 import Header from "@/components/Header";
-import { getDashboardStats, DashboardStats } from "@/lib/dashboard-api";
+import { getDashboardOverview, DashboardOverview } from "@/lib/dashboard-api";
 import { useAuth } from "@/contexts/AuthContext";
 import { useMonth } from "@/contexts/MonthContext";
 
 export default function Dashboard() {
   const { user } = useAuth();
   const { selectedMonth } = useMonth();
-  const [stats, setStats] = useState<DashboardStats | null>(null);
+  const [overview, setOverview] = useState<DashboardOverview | null>(null);
   const [loading, setLoading] = useState(true);
+  const stats = overview?.stats ?? null;
 
   useEffect(() => {
-    loadDashboardStats();
+    loadDashboardOverview();
   }, [selectedMonth]);
 
-  const loadDashboardStats = async () => {
+  const loadDashboardOverview = async () => {
     try {
       setLoading(true);
-      const data = await getDashboardStats(selectedMonth);
-      setStats(data);
+      const data = await getDashboardOverview(selectedMonth);
+      setOverview(data);
     } catch (error) {
-      console.error("Error loading dashboard stats:", error);
+      console.error("Error loading dashboard overview:", error);
     } finally {
       setLoading(false);
     }
@@ -94,10 +95,10 @@ export default function Dashboard() {
         {/* Charts Grid */}
         <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
           <div className="lg:col-span-2">
-            <LifetimeSavingsChart />
+            <LifetimeSavingsChart data={overview?.balance_trends ?? []} loading={loading} />
           </div>
           <div className="lg:col-span-1">
-            <ExpenseBreakdown />
+            <ExpenseBreakdown data={overview?.expense_breakdown ?? []} loading={loading} />
           </div>
         </div>
       </div>
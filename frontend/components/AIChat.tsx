@@ -78,7 +78,7 @@ export default function AIChat({ initialMessage }: AIChatProps) {
     setIsConfirming(true);
 
     try {
-      const response = await confirmBudgetEntries(pendingAction.entries);
+      const response = await confirmBudgetEntries(pendingAction);
 
       setMessages((prev) => [
         ...prev,
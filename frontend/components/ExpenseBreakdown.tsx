@@ -1,31 +1,15 @@
 "use client";
 
-import { useEffect, useState } from "react";
 import { Card } from "@/components/ui/card";
-import { getExpenseBreakdown, ExpenseBreakdown as ExpenseBreakdownType } from "@/lib/dashboard-api";
-import { useMonth } from "@/contexts/MonthContext";
+import { ExpenseBreakdown as ExpenseBreakdownType } from "@/lib/dashboard-api";
 import { isEmojiIcon, isHexColor, getIconComponent, getColorClass } from "@/lib/category-utils";
 
-export default function ExpenseBreakdown() {
-  const { selectedMonth } = useMonth();
-  const [data, setData] = useState<ExpenseBreakdownType[]>([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    async function loadData() {
-      try {
-        setLoading(true);
-        const breakdown = await getExpenseBreakdown(selectedMonth);
-        setData(breakdown);
-      } catch (error) {
-        console.error("Failed to load expense breakdown:", error);
-      } finally {
-        setLoading(false);
-      }
-    }
-    loadData();
-  }, [selectedMonth]);
+interface ExpenseBreakdownProps {
+  data: ExpenseBreakdownType[];
+  loading: boolean;
+}
 
+export default function ExpenseBreakdown({ data, loading }: ExpenseBreakdownProps) {
   const formatCurrency = (amount: number) => {
     return new Intl.NumberFormat('da-DK', {
       style: 'decimal',
@@ -1,8 +1,7 @@
 "use client";
 
-import { useEffect, useState } from "react";
 import { Card } from "@/components/ui/card";
-import { getBalanceTrends, BalanceTrend } from "@/lib/dashboard-api";
+import { BalanceTrend } from "@/lib/dashboard-api";
 import {
   AreaChart,
   Area,
@@ -14,24 +13,12 @@ import {
   Legend,
 } from "recharts";
 
-export default function LifetimeSavingsChart() {
-  const [data, setData] = useState<BalanceTrend[]>([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    async function loadData() {
-      try {
-        const trends = await getBalanceTrends();
-        setData(trends);
-      } catch (error) {
-        console.error("Failed to load balance trends:", error);
-      } finally {
-        setLoading(false);
-      }
-    }
-    loadData();
-  }, []);
+interface LifetimeSavingsChartProps {
+  data: BalanceTrend[];
+  loading: boolean;
+}
 
+export default function LifetimeSavingsChart({ data, loading }: LifetimeSavingsChartProps) {
   // Calculate totals from the latest data point (which represents accumulated value)
   const latest = data.length > 0 ? data[data.length - 1] : { personal: 0, shared: 0 };
   const totalPersonal = latest.personal;
@@ -27,12 +27,21 @@ export interface ProposedEntry {
   month: string;
   source?: "ai";
   needs_review?: boolean;
+  fingerprint?: string | null;
 }
 
 export interface PendingAction {
   action_type: string;
   entries: ProposedEntry[];
   summary: string;
+  preview_id?: string | null;
+}
+
+export interface ProposalOverride {
+  index: number;
+  category_id?: string;
+  owner_slot?: "user1" | "user2" | "shared";
+  include?: boolean;
 }
 
 export interface ChatResponse {
@@ -57,14 +66,94 @@ export async function sendChatMessage(request: ChatRequest): Promise<ChatRespons
   return response.json();
 }
 
+export type ChatStreamEvent =
+  | { type: 'token'; content: string }
+  | { type: 'tool_call_start'; id: string; name: string; arguments: Record<string, unknown> }
+  | { type: 'tool_call_end'; id: string; name: string; ok: boolean }
+  | { type: 'pending_action'; pending_action: PendingAction }
+  | { type: 'done'; response: ChatResponse };
+
+/**
+ * Send a chat message and receive the reply as server-sent events.
+ *
+ * onEvent sees tool progress and assistant text as it arrives. Text is
+ * streamed for every model turn; the resolved response (also delivered as
+ * the final 'done' event) holds the authoritative final message.
+ */
+export async function streamChatMessage(
+  request: ChatRequest,
+  onEvent: (event: ChatStreamEvent) => void,
+): Promise<ChatResponse> {
+  const response = await fetch(`${API_BASE_URL}/api/ai/chat/stream`, {
+    method: 'POST',
+    headers: buildAuthHeaders(),
+    body: JSON.stringify(request),
+  });
+
+  await throwIfUnauthorized(response, 'Failed to send chat message');
+  if (!response.body) {
+    throw new Error('Streaming is not supported by this browser');
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let result: ChatResponse | null = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let eventName = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) eventName = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : {};
+
+      if (eventName === 'error') {
+        throw new Error(payload.detail || 'Failed to send chat message');
+      } else if (eventName === 'done') {
+        result = payload as ChatResponse;
+        onEvent({ type: 'done', response: result });
+      } else if (eventName === 'pending_action') {
+        onEvent({ type: 'pending_action', pending_action: payload as PendingAction });
+      } else {
+        onEvent({ type: eventName, ...payload } as ChatStreamEvent);
+      }
+    }
+  }
+
+  if (!result) {
+    throw new Error('Chat stream ended before the response was complete');
+  }
+  return result;
+}
+
 /**
- * Confirm a pending action (save proposed budget entries)
+ * Confirm a pending action (save proposed budget entries).
+ *
+ * Proposals stored on the server are confirmed by ID plus any overrides;
+ * older responses without a preview_id send the entries in full.
  */
-export async function confirmBudgetEntries(entries: ProposedEntry[]): Promise<ChatResponse> {
+export async function confirmBudgetEntries(
+  pendingAction: PendingAction,
+  overrides: ProposalOverride[] = [],
+): Promise<ChatResponse> {
+  const body = pendingAction.preview_id
+    ? { preview_id: pendingAction.preview_id, overrides }
+    : pendingAction.entries;
   const response = await fetch(`${API_BASE_URL}/api/ai/confirm`, {
     method: 'POST',
     headers: buildAuthHeaders(),
-    body: JSON.stringify(entries),
+    body: JSON.stringify(body),
   });
 
   await throwIfUnauthorized(response, 'Failed to confirm entries');
@@ -22,6 +22,7 @@ export interface BudgetDraftRow {
   include: boolean;
   source: BudgetDraftSource;
   needs_review: boolean;
+  fingerprint?: string;
   category?: BudgetDraftCategory;
 }
 
@@ -46,6 +47,7 @@ export function makeDraftRow(
     include: partial.include ?? true,
     source: partial.source || "manual",
     needs_review: partial.needs_review ?? false,
+    fingerprint: partial.fingerprint,
     category: partial.category,
   };
 }
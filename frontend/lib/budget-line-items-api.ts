@@ -51,6 +51,7 @@ export interface BudgetDraftRowPayload {
   include: boolean;
   source: 'existing' | 'manual' | 'ai' | 'import' | 'copied';
   needs_review: boolean;
+  fingerprint?: string;
 }
 
 export interface SaveBudgetDraftRequest {
@@ -26,6 +26,49 @@ export interface ExpenseBreakdown {
   color: string;
 }
 
+export interface RangeMonthTotals {
+  month: string;
+  income: number;
+  expenses: number;
+  savings: number;
+  fun: number;
+  net_income: number;
+}
+
+export interface CategorySeries {
+  category_id: string;
+  name: string;
+  type: string;
+  icon: string;
+  color: string;
+  amounts: number[];
+  total: number;
+}
+
+export interface DashboardRange {
+  months: RangeMonthTotals[];
+  categories: CategorySeries[];
+}
+
+export interface DashboardOverview {
+  stats: DashboardStats;
+  balance_trends: BalanceTrend[];
+  expense_breakdown: ExpenseBreakdown[];
+}
+
+/**
+ * Fetch stats, balance trends and expense breakdown for the dashboard page in one request
+ */
+export async function getDashboardOverview(month?: string): Promise<DashboardOverview> {
+  const params = month ? `?month=${month}` : '';
+  const response = await fetch(`${API_BASE_URL}/api/dashboard/overview${params}`, {
+    headers: buildAuthHeaders(),
+  });
+
+  await throwIfUnauthorized(response, "Failed to fetch dashboard overview");
+  return response.json();
+}
+
 /**
  * Fetch dashboard statistics
  */
@@ -40,10 +83,14 @@ export async function getDashboardStats(month?: string): Promise<DashboardStats>
 }
 
 /**
- * Fetch balance trends for chart
+ * Fetch balance trends for chart, optionally limited to a from/to month window
  */
-export async function getBalanceTrends(): Promise<BalanceTrend[]> {
-  const response = await fetch(`${API_BASE_URL}/api/dashboard/balance-trends`, {
+export async function getBalanceTrends(from?: string, to?: string): Promise<BalanceTrend[]> {
+  const query = new URLSearchParams();
+  if (from) query.set("from", from);
+  if (to) query.set("to", to);
+  const params = query.toString() ? `?${query.toString()}` : '';
+  const response = await fetch(`${API_BASE_URL}/api/dashboard/balance-trends${params}`, {
     headers: buildAuthHeaders(),
   });
 
@@ -63,3 +110,16 @@ export async function getExpenseBreakdown(month?: string): Promise<ExpenseBreakd
   await throwIfUnauthorized(response, "Failed to fetch expense breakdown");
   return response.json();
 }
+
+/**
+ * Fetch per-month totals and per-category series for a range of months (YYYY-MM)
+ */
+export async function getDashboardRange(from: string, to: string): Promise<DashboardRange> {
+  const params = new URLSearchParams({ from, to });
+  const response = await fetch(`${API_BASE_URL}/api/dashboard/range?${params.toString()}`, {
+    headers: buildAuthHeaders(),
+  });
+
+  await throwIfUnauthorized(response, "Failed to fetch dashboard range");
+  return response.json();
+}
@@ -19,6 +19,8 @@ export interface ParsedRow {
   suggestion_basis?: string | null;
   matched_terms?: string[];
   matched_example?: string | null;
+  fingerprint?: string | null;
+  already_imported?: boolean;
 }
 
 export interface UploadResponse {
@@ -26,6 +28,37 @@ export interface UploadResponse {
   count: number;
   header: string[];
   delimiter: string;
+  columns?: ProfileColumns;
+  profile?: string | null;
+  preview_id?: string | null;
+}
+
+export interface ProfileColumns {
+  date: number | null;
+  description: number | null;
+  amount: number | null;
+}
+
+export interface BankProfile {
+  id: string;
+  scope: 'user' | 'global';
+  name: string | null;
+  signature: string;
+  header: string[];
+  delimiter: string;
+  columns: ProfileColumns;
+  date_format: string | null;
+  amount_locale: 'da' | 'en';
+  updated_at: string;
+}
+
+export interface BankProfileCreate {
+  name?: string;
+  header: string[];
+  delimiter: string;
+  columns: { date: number; description: number; amount: number };
+  date_format?: string | null;
+  amount_locale: 'da' | 'en';
 }
 
 export interface CategoryOption {
@@ -41,15 +74,44 @@ export interface ConfirmEntry {
   category_id: string;
   amount: number;
   owner_slot: 'user1' | 'user2' | 'shared';
+  fingerprint?: string | null;
+}
+
+export interface RowOverride {
+  index: number;
+  category_id?: string;
+  owner_slot?: 'user1' | 'user2' | 'shared';
+  include?: boolean;
 }
 
 export interface ConfirmResponse {
   saved_count: number;
   error_count: number;
+  skipped_count: number;
   saved: Array<{ id: string; name: string; amount: number; category: string }>;
   errors: string[];
 }
 
+export type ImportJobStatus = 'processing' | 'ready' | 'failed' | 'confirming' | 'confirmed';
+
+export interface ImportJob {
+  id: string;
+  status: ImportJobStatus;
+  filename: string | null;
+  header: string[];
+  delimiter: string | null;
+  processed_rows: number;
+  error: string | null;
+  result: { saved_count: number; error_count: number; skipped_count: number } | null;
+  rows: ParsedRow[];
+  created_at: string;
+  updated_at: string;
+  expires_at: string;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_ROWS_PAGE_SIZE = 5000;
+
 // ---------- API calls ----------
 
 /**
@@ -96,6 +158,24 @@ export async function getImportCategories(): Promise<CategoryOption[]> {
   return response.json();
 }
 
+/**
+ * Confirm a stored upload preview, sending only the rows the user changed.
+ */
+export async function confirmImportPreview(
+  month: string,
+  previewId: string,
+  overrides: RowOverride[] = [],
+): Promise<ConfirmResponse> {
+  const response = await fetch(`${API_BASE_URL}/api/import/confirm`, {
+    method: 'POST',
+    headers: buildAuthHeaders(),
+    body: JSON.stringify({ month, preview_id: previewId, overrides }),
+  });
+
+  await throwIfUnauthorized(response, 'Import failed');
+  return response.json();
+}
+
 /**
  * Confirm and save mapped entries as budget line items.
  */
@@ -112,3 +192,117 @@ export async function confirmImport(
   await throwIfUnauthorized(response, 'Import failed');
   return response.json();
 }
+
+/**
+ * Upload a CSV file to be parsed in the background.
+ */
+export async function createImportJob(file: File): Promise<ImportJob> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${API_BASE_URL}/api/import/jobs`, {
+    method: 'POST',
+    headers: buildAuthHeaders(false),
+    body: formData,
+  });
+
+  await throwIfUnauthorized(response, 'Upload failed');
+  return response.json();
+}
+
+/**
+ * Get an import job's state, optionally with a page of its rows.
+ */
+export async function getImportJob(jobId: string, offset = 0, limit = 0): Promise<ImportJob> {
+  const params = new URLSearchParams({ offset: String(offset), limit: String(limit) });
+  const response = await fetch(`${API_BASE_URL}/api/import/jobs/${jobId}?${params}`, {
+    method: 'GET',
+    headers: buildAuthHeaders(),
+  });
+
+  await throwIfUnauthorized(response, 'Failed to fetch import job');
+  return response.json();
+}
+
+/**
+ * Poll an import job until it is parsed, then fetch all of its rows.
+ */
+export async function waitForImportJob(
+  jobId: string,
+  onProgress?: (job: ImportJob) => void,
+): Promise<ParsedRow[]> {
+  let job = await getImportJob(jobId);
+  while (job.status === 'processing') {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    job = await getImportJob(jobId);
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Upload failed');
+  }
+
+  const rows: ParsedRow[] = [];
+  while (rows.length < job.processed_rows) {
+    const page = await getImportJob(jobId, rows.length, JOB_ROWS_PAGE_SIZE);
+    if (page.rows.length === 0) break;
+    rows.push(...page.rows);
+  }
+  return rows;
+}
+
+/**
+ * Save a parsed job's included rows as budget line items.
+ */
+export async function confirmImportJob(
+  jobId: string,
+  month: string,
+  overrides: RowOverride[] = [],
+): Promise<ConfirmResponse> {
+  const response = await fetch(`${API_BASE_URL}/api/import/jobs/${jobId}/confirm`, {
+    method: 'POST',
+    headers: buildAuthHeaders(),
+    body: JSON.stringify({ month, overrides }),
+  });
+
+  await throwIfUnauthorized(response, 'Import failed');
+  return response.json();
+}
+
+/**
+ * List the user's saved bank formats followed by the built-in ones.
+ */
+export async function getBankProfiles(): Promise<BankProfile[]> {
+  const response = await fetch(`${API_BASE_URL}/api/import/profiles`, {
+    method: 'GET',
+    headers: buildAuthHeaders(),
+  });
+
+  await throwIfUnauthorized(response, 'Failed to fetch bank formats');
+  return response.json();
+}
+
+/**
+ * Remember the correct column mapping for a bank's CSV header.
+ */
+export async function saveBankProfile(profile: BankProfileCreate): Promise<BankProfile> {
+  const response = await fetch(`${API_BASE_URL}/api/import/profiles`, {
+    method: 'POST',
+    headers: buildAuthHeaders(),
+    body: JSON.stringify(profile),
+  });
+
+  await throwIfUnauthorized(response, 'Failed to save bank format');
+  return response.json();
+}
+
+/**
+ * Forget a saved bank format.
+ */
+export async function deleteBankProfile(profileId: string): Promise<void> {
+  const response = await fetch(`${API_BASE_URL}/api/import/profiles/${profileId}`, {
+    method: 'DELETE',
+    headers: buildAuthHeaders(),
+  });
+
+  await throwIfUnauthorized(response, 'Failed to delete bank format');
+}